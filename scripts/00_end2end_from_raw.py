@@ -1,44 +1,34 @@
-﻿import os, sys, subprocess, argparse
+﻿import os, sys, argparse
 
-p = argparse.ArgumentParser()
-p.add_argument("--proj", required=True)
+p = argparse.ArgumentParser(description="raw queries -> structured -> hybrid run, in one process "
+                                        "(same as: python -m graphcorag end2end)")
+p.add_argument("--proj", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 p.add_argument("--dict", required=True)
+p.add_argument("--overlay", default=None)
 p.add_argument("--kg", required=True)
 p.add_argument("--schema", required=True)
 p.add_argument("--corpus", required=True)
 p.add_argument("--raw", required=True)
 p.add_argument("--outdir", required=True)
 p.add_argument("--topk", type=int, default=80)
+p.add_argument("--mode", choices=["text", "kg", "both"], default="both")
 args = p.parse_args()
 
+sys.path.insert(0, os.path.join(args.proj, "src"))
+from graphcorag.fileio import iter_jsonl, write_jsonl
+from graphcorag.pipeline import Pipeline
+
 os.makedirs(args.outdir, exist_ok=True)
 structured = os.path.join(args.outdir, "queries.structured.jsonl")
 
-# 1) analyze raw → structured
-subprocess.check_call([
-    sys.executable,
-    os.path.join(args.proj, "scripts", "03_analyze_queries_sapbert.py"),
-    "--dict", args.dict,
-    "--input", args.raw,
-    "--out", structured,
-])
+# KG + dictionary surface index and the retriever indexes are loaded once and
+# shared by both steps
+pipe = Pipeline(args.corpus, args.kg, dict_path=args.dict, overlay_path=args.overlay,
+                schema_path=args.schema, mode=args.mode, topk=args.topk)
+
+# 1) analyze raw -> structured
+write_jsonl(structured, pipe.iter_analyze(iter_jsonl(args.raw, on_error="warn")))
 
-# 2) run hybrid
-subprocess.check_call([
-    sys.executable,
-    os.path.join(args.proj, "scripts", "rl", "scrape_run_verbose.py"),
-    "--proj",    os.path.join(args.proj, "hybridkg_minimal"),
-    "--corpus",  args.corpus,
-    "--kg",      args.kg,
-    "--dict",    args.dict,
-    "--schema",  args.schema,
-    "--queries", structured,
-    "--out",     args.outdir,
-    "--topk",    str(args.topk),
-    "--min_constraints", "1",
-    "--mode", "both",
-    "--bm25_mod_path",  os.path.join(args.proj, "src", "hybridkg", "text_retriever.py"),
-    "--dense_mod_path", os.path.join(args.proj, "src", "hybridkg", "dense_retriever.py"),
-    "--kg_mod_path",    os.path.join(args.proj, "src", "hybridkg", "kg_loader.py"),
-])
+# 2) run hybrid (streams the structured file back)
+pipe.run(iter_jsonl(structured), args.outdir)
 print("Done. Output dir:", args.outdir)
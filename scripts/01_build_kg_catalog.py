@@ -1,56 +1,57 @@
-﻿import json, csv, re, os, sys
+﻿import argparse, json, re, os, sys
 from collections import defaultdict
 
 PROJ   = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(PROJ, "src"))
+from graphcorag.alias_store import file_sha256
+from graphcorag.dict_snapshot import load_lexicon
+from graphcorag.kg_snapshot import iter_kg_nodes, snapshot_path_for
+
 DICT   = os.path.join(PROJ, "config", "umls_dict.txt")
 OVER   = os.path.join(PROJ, "config", "umls_dict.overlay.json")
 KGCSV  = os.path.join(PROJ, "data", "kg_edges.merged.csv")
 OUTJS  = os.path.join(PROJ, "out", "kg_catalog.aliases.json")
+MANIF  = os.path.join(PROJ, "out", "kg_catalog.manifest.json")
+
+ap = argparse.ArgumentParser(description="Build the KG alias catalog (skipped when its inputs are unchanged)")
+ap.add_argument("--force", action="store_true", help="rebuild even if the inputs are unchanged")
+args = ap.parse_args()
 
 os.makedirs(os.path.join(PROJ,"out"), exist_ok=True)
 
-def load_dict():
-    # dict is a JSON (CUI -> [aliases]) stored as .txt in your repo
-    with open(DICT, "r", encoding="utf-8") as f:
-        d = json.load(f)
-    return d
+def input_hashes():
+    kg = KGCSV if os.path.exists(KGCSV) else snapshot_path_for(KGCSV)
+    files = (("dict", DICT), ("overlay", OVER), ("kg", kg), ("script", os.path.abspath(__file__)))
+    return {name: file_sha256(p) for name, p in files if os.path.exists(p)}
 
-def load_overlay():
+def load_manifest():
     try:
-        with open(OVER, "r", encoding="utf-8") as f:
+        with open(MANIF, "r", encoding="utf-8") as f:
             return json.load(f)
-    except FileNotFoundError:
+    except (OSError, ValueError):
         return {}
 
+inputs = input_hashes()
+prev = load_manifest()
+if (not args.force and prev.get("inputs") == inputs and os.path.exists(OUTJS)
+        and file_sha256(OUTJS) == prev.get("catalog_sha256")):
+    print(f"[catalog] {OUTJS} is up to date | nodes={prev.get('nodes')} total_aliases={prev.get('total_aliases')}")
+    sys.exit(0)
+
 def normalize(s):
     return re.sub(r"\s+", " ", s).strip()
 
-keep_nodes = set()
-with open(KGCSV, newline="", encoding="utf-8") as f:
-    rdr = csv.reader(f)
-    for row in rdr:
-        if len(row) < 3: 
-            continue
-        h, r, t = [c.strip().strip('"') for c in row[:3]]
-        keep_nodes.add(h); keep_nodes.add(t)
+keep_nodes = set(iter_kg_nodes(KGCSV))
 
-base = load_dict()
-overlay = load_overlay()
+# dict is a JSON (CUI -> [aliases]) stored as .txt in your repo; merged with the overlay
+# once (compiled snapshot when present, see graphcorag.dict_snapshot)
+lex = load_lexicon(DICT, OVER)
 
 aliases = {}
-for cui, names in base.items():
+for cui in lex.cuis:
     if cui not in keep_nodes: 
         continue
-    cand = set(n for n in names if n and isinstance(n, str))
-    # overlay merges
-    for extra in overlay.get(cui, []):
-        if isinstance(extra, str): cand.add(extra)
-        elif isinstance(extra, dict):
-            for v in extra.values():
-                if isinstance(v, str): cand.add(v)
-                elif isinstance(v, list):
-                    for s in v:
-                        if isinstance(s, str): cand.add(s)
+    cand = lex.surfaces(cui)
     # small heuristics
     norm = set()
     for s in cand:
@@ -63,4 +64,10 @@ for cui, names in base.items():
 with open(OUTJS, "w", encoding="utf-8") as f:
     json.dump(aliases, f, ensure_ascii=False, indent=2)
 
-print(f"[catalog] wrote {OUTJS} | nodes={len(aliases)} total_aliases={sum(len(v) for v in aliases.values())}")
+# inputs fingerprint + catalog hash: the next run (and 02's store) can tell nothing changed
+total = sum(len(v) for v in aliases.values())
+with open(MANIF, "w", encoding="utf-8") as f:
+    json.dump({"inputs": inputs, "catalog_sha256": file_sha256(OUTJS), "nodes": len(aliases),
+               "total_aliases": total}, f, indent=2)
+
+print(f"[catalog] wrote {OUTJS} | nodes={len(aliases)} total_aliases={total}")
@@ -1,27 +1,62 @@
-﻿import os, json, torch
-from sentence_transformers import SentenceTransformer
-import numpy as np
+﻿import os, sys, argparse
 
 PROJ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(PROJ, "src"))
+from graphcorag.alias_store import AliasStore, catalog_rows, file_sha256, read_manifest, write_store
+from graphcorag.fileio import load_json
+
 ALIASES = os.path.join(PROJ, "out", "kg_catalog.aliases.json")
-OUT = os.path.join(PROJ, "out", "kg_catalog.sbert.npz")
+OUT = os.path.join(PROJ, "out", "kg_catalog.sbert")
 
-model_name = "cambridgeltl/SapBERT-from-PubMedBERT-fulltext"
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model = SentenceTransformer(model_name, device=device)
+ap = argparse.ArgumentParser(description="Embed the KG alias catalog (only aliases not embedded yet)")
+ap.add_argument("--aliases", default=ALIASES)
+ap.add_argument("--out", default=OUT, help="alias store directory (see graphcorag.alias_store)")
+ap.add_argument("--model", default="cambridgeltl/SapBERT-from-PubMedBERT-fulltext")
+ap.add_argument("--batch", type=int, default=128)
+ap.add_argument("--force", action="store_true", help="re-encode every alias")
+args = ap.parse_args()
 
-with open(ALIASES, "r", encoding="utf-8") as f:
-    aliases = json.load(f)
+catalog_sha = file_sha256(args.aliases)
+manifest = None if args.force else read_manifest(args.out)
+if manifest is not None and manifest.get("model") != args.model:
+    manifest = None  # vectors of another model cannot be reused
+if manifest is not None and manifest.get("catalog_sha256") == catalog_sha:
+    print(f"[embed] {args.out} is up to date (catalog {catalog_sha[:12]}, {manifest['n_aliases']} aliases)")
+    sys.exit(0)
 
-rows = []
-keys = []
-for cui, names in aliases.items():
-    for s in names:
-        keys.append((cui, s))
-        rows.append(s)
+nodes, strings, pairs = catalog_rows(load_json(args.aliases))
+prev = AliasStore.open(args.out) if manifest is not None else None
+reuse, todo = [], []   # (row, previous row) / rows to encode
+for i, s in enumerate(strings):
+    j = None if prev is None else prev.alias_row(s)
+    if j is None:
+        todo.append(i)
+    else:
+        reuse.append((i, j))
+
+import numpy as np
+emb = None
+if todo:
+    # torch / sentence-transformers load only when there is something to encode
+    import torch
+    from sentence_transformers import SentenceTransformer
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(args.model, device=device)
+    print(f"[embed] encoding {len(todo)} new alias strings ({len(reuse)} reused) with SapBERT on {device}…")
+    emb = model.encode([strings[i] for i in todo], convert_to_numpy=True, normalize_embeddings=True,
+                       batch_size=args.batch, show_progress_bar=True)
+dim = emb.shape[1] if emb is not None else (prev.vectors.shape[1] if prev is not None else 0)
 
-print(f"[embed] encoding {len(rows)} alias strings with SapBERT on {device}…")
-emb = model.encode(rows, convert_to_numpy=True, normalize_embeddings=True, batch_size=128, show_progress_bar=True)
+vectors = np.empty((len(strings), dim), dtype=np.float32)
+if reuse:
+    new_rows, old_rows = (np.asarray(x, dtype=np.int64) for x in zip(*reuse))
+    vectors[new_rows] = prev.vectors[old_rows]
+if todo:
+    vectors[np.asarray(todo, dtype=np.int64)] = emb
+del prev  # release the old generation's memory maps before it is removed
 
-np.savez_compressed(OUT, emb=emb, keys=np.array(keys, dtype=object))
-print(f"[embed] wrote {OUT} | shape={emb.shape}")
+m = write_store(args.out, nodes, strings, pairs, vectors,
+                {"model": args.model, "normalize": True, "catalog": os.path.basename(args.aliases),
+                 "catalog_sha256": catalog_sha, "encoded": len(todo), "reused": len(reuse)})
+print(f"[embed] wrote {args.out} | aliases={m['n_aliases']} pairs={m['n_pairs']} dim={m['dim']} "
+      f"(encoded {len(todo)}, reused {len(reuse)})")
@@ -1,6 +1,10 @@
-﻿import io, os, re, json, argparse
+﻿import io, os, re, sys, argparse
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from graphcorag.cues import CueEngine
+from graphcorag.fileio import JsonlWriter, iter_jsonl
+
 def load_umls_dict(path):
     # Expect "surface<tab>cui" per line (surface examples: "adalimumab", "hidradenitis suppurativa")
     entries = []
@@ -21,11 +25,19 @@ REL_PATTERNS = [
     ("INTERACTS_WITH",      r"\b(interact|interaction|ddi|co-?admin(?:istration)?)\b"),
 ]
 
-def detect_relation(text: str) -> str:
-    t = text.lower()
-    for rel, pat in REL_PATTERNS:
-        if re.search(pat, t): return rel
-    if re.search(r"\b(do|does|is|are|can)\b.*\b(with|together|interact)\b", t.lower()):
+# relation and intent cues, all found in one scan per question
+CUES = CueEngine({
+    **{rel: [pat] for rel, pat in REL_PATTERNS},
+    "ddi_fallback": [r"\b(do|does|is|are|can)\b.*\b(with|together|interact)\b"],
+    "yesno": [r"^\s*(do|does|is|are|can)\b"],
+    "list": [r"\b(what|which|list).*(effect|effects|adverse|side)"],
+})
+
+def detect_relation(text: str, signals=None) -> str:
+    sig = CUES.scan(text) if signals is None else signals
+    for rel, _ in REL_PATTERNS:
+        if rel in sig: return rel
+    if "ddi_fallback" in sig:
         return "INTERACTS_WITH"
     return ""
 
@@ -66,10 +78,10 @@ def choose_head_tail(question, rel, umls_entries):
     d = dis[0] if dis else ""
     return h, d
 
-def detect_intent(text):
-    t = text.strip().lower()
-    if re.match(r"^\s*(do|does|is|are|can)\b", t): return "yesno"
-    if re.search(r"\b(what|which|list).*(effect|effects|adverse|side)", t): return "list"
+def detect_intent(text, signals=None):
+    sig = CUES.scan(text) if signals is None else signals
+    if "yesno" in sig: return "yesno"
+    if "list" in sig: return "list"
     return "lookup"
 
 def main():
@@ -82,18 +94,15 @@ def main():
     umls_entries = load_umls_dict(args.dict)
     n_in, n_out = 0,0
 
-    with io.open(args.input, "r", encoding="utf-8") as fin, \
-         io.open(args.out, "w", encoding="utf-8") as fout:
-        for line in fin:
-            line=line.strip()
-            if not line: continue
-            obj = json.loads(line)
+    with JsonlWriter(args.out) as fout:
+        for obj in iter_jsonl(args.input):
             qid = obj.get("qid") or obj.get("id") or f"q{n_in+1}"
             q   = obj.get("question") or obj.get("text") or ""
             if not q: continue
             n_in += 1
 
-            rel = detect_relation(q)
+            sig = CUES.scan(q)
+            rel = detect_relation(q, sig)
             head_cui, tail_cui = choose_head_tail(q, rel, umls_entries)
 
             # backfill relation from entity types if needed
@@ -109,7 +118,7 @@ def main():
             if rel == "ADVERSE_EFFECT" and not tail_cui:
                 tail_cui = "disease_adverse_effects"
 
-            intent = detect_intent(q)
+            intent = detect_intent(q, sig)
             out = {
                 "qid": qid,
                 "question": q,
@@ -119,7 +128,7 @@ def main():
                 "head_cui": head_cui,
                 "tail_cui": tail_cui
             }
-            fout.write(json.dumps(out, ensure_ascii=False) + "\n")
+            fout.write(out)
             n_out += 1
 
     print(f"Analyzed {n_in} raw lines -> {n_out} structured lines: {args.out}")
@@ -1,9 +1,9 @@
 ﻿# -*- coding: utf-8 -*-
-import os, csv, json, argparse, numpy as np
-from tqdm import tqdm
-from collections import defaultdict
-from sentence_transformers import SentenceTransformer
-import nmslib
+import os, sys, json, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from graphcorag.dict_snapshot import load_lexicon
+from graphcorag.kg_snapshot import iter_kg_nodes
 
 ap = argparse.ArgumentParser()
 ap.add_argument("--kg", required=True)
@@ -16,38 +16,17 @@ args = ap.parse_args()
 
 os.makedirs(args.out_dir, exist_ok=True)
 
-# 1) Load KG nodes
-kg_nodes=set()
-with open(args.kg, newline="", encoding="utf-8") as f:
-    r=csv.reader(f)
-    rows=list(r)
-    if rows and rows[0] and rows[0][0].lower() in ("h","head","source"):
-        rows=rows[1:]
-    for h,rel,t in rows:
-        kg_nodes.add(h.strip()); kg_nodes.add(t.strip())
-
-# 2) Load dict + overlay
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f: return json.load(f)
+# 1) Load KG nodes (compiled snapshot when present, else CSV)
+kg_nodes=set(iter_kg_nodes(args.kg))
 
-cui2surfs = load_json(args.dict)
-overlay   = load_json(args.overlay)
-
-# merge overlay
-for cui, surfs in overlay.items():
-    base = cui2surfs.setdefault(cui, [])
-    seen = set(s.strip() for s in base)
-    for s in surfs:
-        s = (s or "").strip()
-        if s and s not in seen:
-            base.append(s); seen.add(s)
+# 2) Merged dict + overlay (compiled snapshot when present, else the JSON files)
+lex = load_lexicon(args.dict, args.overlay)
 
 # filter to KG nodes only, build (node -> surfaces)
 node2surfs = {}
 for cui in kg_nodes:
-    surfs = cui2surfs.get(cui, [])
-    # keep unique, non-empty, >=3 chars
-    surfs = sorted({s.strip() for s in surfs if s and len(s.strip())>=3})
+    # merged forms are stripped and unique; keep >=3 chars
+    surfs = sorted(s for s in lex.surfaces(cui) if len(s) >= 3)
     if surfs:
         node2surfs[cui] = surfs
 
@@ -62,7 +41,11 @@ for node, surfs in node2surfs.items():
 
 texts = [s for _, s in pairs]
 
-# 4) Encode with SapBERT
+# 4) Encode with SapBERT (model stack imported only once there is something to encode)
+import numpy as np
+import nmslib
+from tqdm import tqdm
+from sentence_transformers import SentenceTransformer
 model = SentenceTransformer(args.model)
 embs = []
 for i in tqdm(range(0, len(texts), args.batch), desc="Encoding"):
@@ -1,20 +1,15 @@
-﻿import csv, json, io, argparse, os
+﻿import csv, json, io, argparse, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from graphcorag.kg_loader import KG
+from graphcorag.kg_paths import PathFinder, format_path
+from graphcorag.kg_reach2 import TwoHopIndex
+from graphcorag.evaluation import EXPLAIN_BOOL_FIELDS, kg_support, maybe_write_parquet, to_columns
 
 def load_overlay(path):
     with io.open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def load_kg(path):
-    edges = set()
-    with io.open(path, "r", encoding="utf-8") as f:
-        rdr = csv.reader(f)
-        for row in rdr:
-            if len(row) != 3: 
-                continue
-            h, r, t = [x.strip() for x in row]
-            edges.add((h, r, t))
-    return edges
-
 def first_surface(overlay, eid):
     arr = overlay.get(eid) or []
     return arr[0] if arr else ""
@@ -25,22 +20,32 @@ def main():
     ap.add_argument("--kg", required=True)
     ap.add_argument("--overlay", required=True)
     ap.add_argument("--out_csv", required=True)
+    ap.add_argument("--out_parquet", default=None, help="rows as Parquet too (needs pyarrow)")
+    ap.add_argument("--path_budget_ms", type=float, default=0.0,
+                    help="per-query chain search budget (<=0: unlimited); a budget makes chain_path_present load-dependent")
+    ap.add_argument("--two_hop_index", action="store_true", help="precompute 2-hop reachability; chain checks become lookups")
     args = ap.parse_args()
 
     overlay = load_overlay(args.overlay)
-    kg = load_kg(args.kg)
+    # one KG for the edge checks and the composite reading head -rel1-> x -rel2-> tail2 (2-hop chain)
+    kg = KG(args.kg)
+    finder = PathFinder(kg, time_budget_s=(args.path_budget_ms / 1000.0 if args.path_budget_ms > 0 else None),
+                        reach2=(TwoHopIndex(kg) if args.two_hop_index else None))
 
     rows = []
     with io.open(args.queries, "r", encoding="utf-8") as f:
         for i, line in enumerate(f, 1):
             q = json.loads(line)
             head, r1, t1, r2, t2 = q["head"], q["rel1"], q["tail1"], q["rel2"], q["tail2"]
-            e1 = (head, r1, t1)
-            e2 = (head, r2, t2)
+            # normalized lookups (nodes lowercased, relations uppercased, both stripped), as in
+            # the chain search; the raw edge set used before matched the CSV strings exactly
+            e1_present = kg.has_edge(head, r1, t1)
+            e2_present = kg.has_edge(head, r2, t2)
 
             hs = first_surface(overlay, head)
             t1s = first_surface(overlay, t1)
             t2s = first_surface(overlay, t2)
+            chain = finder.find_paths(head, t2, relations=[r1, r2], k=1) if (r2 and t2) else None
 
             row = dict(
                 qid=i,
@@ -54,14 +59,16 @@ def main():
                 tail1_surface=t1s,
                 tail1_surface_links=t1 if t1s else "",
                 tail1_surface_link_ok=bool(t1s),
-                edge1_present=e1 in kg,
+                edge1_present=e1_present,
                 rel2=r2,
                 tail2=t2,
                 tail2_surface=t2s,
                 tail2_surface_links=t2 if t2s else "",
                 tail2_surface_link_ok=bool(t2s),
-                edge2_present=e2 in kg,
-                both_edges_present=(e1 in kg and e2 in kg),
+                edge2_present=e2_present,
+                both_edges_present=(e1_present and e2_present),
+                chain_path_present=bool(chain),
+                chain_path=(format_path(chain.paths[0]) if chain else ""),
             )
             rows.append(row)
 
@@ -71,12 +78,13 @@ def main():
         w.writeheader()
         w.writerows(rows)
 
-    total = len(rows)
-    both = sum(1 for r in rows if r["both_edges_present"])
-    one  = sum(1 for r in rows if (r["edge1_present"] or r["edge2_present"]) and not r["both_edges_present"])
-    none = total - both - one
+    cols = to_columns(rows, {n: (bool if n in EXPLAIN_BOOL_FIELDS else str) for n in rows[0]})
+    maybe_write_parquet(cols, args.out_parquet)
+    sup = kg_support(cols)
+    total, both, one, none, chained = sup["total"], sup["both"], sup["one"], sup["none"], sup["chained"]
     print(f"[explain] wrote {total} rows -> {args.out_csv}")
     print(f"[KG support] total={total}  both={both}  one={one}  none={none}  both%={100.0*both/total:.1f}%")
+    print(f"[KG chain]   head-rel1->x-rel2->tail2 present={chained} ({100.0*chained/total:.1f}%)")
 
 if __name__ == "__main__":
     main()
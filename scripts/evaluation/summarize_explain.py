@@ -1,15 +1,16 @@
-﻿import csv, argparse, io
+﻿import argparse, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from graphcorag.evaluation import EXPLAIN_BOOL_FIELDS, kg_support, read_csv_columns
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--explain_csv", required=True)
     args = ap.parse_args()
 
-    rows = list(csv.DictReader(io.open(args.explain_csv, "r", encoding="utf-8")))
-    total = len(rows)
-    both  = sum(1 for r in rows if r["both_edges_present"] == "True")
-    e1    = sum(1 for r in rows if r["edge1_present"] == "True")
-    e2    = sum(1 for r in rows if r["edge2_present"] == "True")
-    link_ok = sum(1 for r in rows if r["head_surface_link_ok"] == "True" and r["tail1_surface_link_ok"] == "True" and r["tail2_surface_link_ok"] == "True")
+    sup = kg_support(read_csv_columns(args.explain_csv, bool_fields=EXPLAIN_BOOL_FIELDS))
+    total = sup["total"]
+    both, e1, e2, link_ok = sup["both"], sup["edge1"], sup["edge2"], sup["link_ok"]
 
     print(f"[summary] queries={total}")
     print(f"          both_edges_present={both} ({both/total:.1%})")
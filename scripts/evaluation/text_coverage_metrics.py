@@ -1,37 +1,36 @@
-﻿import argparse, io, json, csv, re, os
+﻿import argparse, io, csv, re, os, sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+import numpy as np
+from graphcorag.fileio import iter_jsonl
+from graphcorag.matcher import Matcher
+from graphcorag.evaluation import coverage_at_k, coverage_status, maybe_write_parquet, rank_matrix, to_columns
+
 def load_queries(path):
     qs = []
-    with io.open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip(): continue
-            j = json.loads(line)
-            # tolerate older query format (no qid)
-            j["_qid"] = j.get("qid") or len(qs) + 1
-            # prefer require_entities if present; else fall back to boost_terms or surface strings
-            req = j.get("require_entities") or j.get("boost_terms") or []
-            # normalize to unique, non-empty
-            seen = set(); req_clean=[]
-            for s in req:
-                s2 = (s or "").strip()
-                if s2 and s2.lower() not in seen:
-                    seen.add(s2.lower()); req_clean.append(s2)
-            j["_require"] = req_clean
-            qs.append(j)
+    for j in iter_jsonl(path):
+        # tolerate older query format (no qid)
+        j["_qid"] = j.get("qid") or len(qs) + 1
+        # prefer require_entities if present; else fall back to boost_terms or surface strings
+        req = j.get("require_entities") or j.get("boost_terms") or []
+        # normalize to unique, non-empty
+        seen = set(); req_clean=[]
+        for s in req:
+            s2 = (s or "").strip()
+            if s2 and s2.lower() not in seen:
+                seen.add(s2.lower()); req_clean.append(s2)
+        j["_require"] = req_clean
+        qs.append(j)
     return qs
 
-def load_corpus(path):
-    """Expect docs.jsonl with at least {id, text} or {doc_id, text}."""
-    m = {}
-    with io.open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            if not line.strip(): continue
-            j = json.loads(line)
-            did = j.get("id") or j.get("doc_id")
-            if not did: continue
-            m[did] = j.get("text","")
-    return m
+def iter_corpus(path, wanted=None):
+    """Stream (doc_id, text) from docs.jsonl ({id, text} or {doc_id, text}); only ids in `wanted` when given."""
+    for j in iter_jsonl(path, errors="ignore"):
+        did = j.get("id") or j.get("doc_id")
+        if not did: continue
+        if wanted is not None and did not in wanted: continue
+        yield did, j.get("text","")
 
 def _hit_doc_id(hit):
     """Return doc_id from a hit that might look like:
@@ -45,27 +44,42 @@ def _hit_doc_id(hit):
         return hit.get("doc_id") or hit.get("id")
     return None
 
-def load_cache(path):
-    """Expect JSONL lines with at least {qid, hits} OR {query_index, hits} OR in-order with implicit qid."""
+def _top_hits(hits, limit):
+    """Shortest prefix of hits holding `limit` resolvable doc ids."""
+    n = 0
+    for i, h in enumerate(hits):
+        if _hit_doc_id(h):
+            n += 1
+            if n >= limit:
+                return hits[:i + 1]
+    return hits
+
+def load_cache(path, limit=None):
+    """
+    Expect JSONL lines with at least {qid, hits} OR {query_index, hits} OR in-order with implicit qid.
+    limit: keep only the hits up to the limit-th doc id (the rest can never count).
+    """
     records = []
-    with io.open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            if not line.strip(): continue
-            j = json.loads(line)
-            qid = j.get("qid") or j.get("query_index")
-            records.append((qid, j.get("hits") or j.get("retrieved") or []))
+    for j in iter_jsonl(path, errors="ignore"):
+        qid = j.get("qid") or j.get("query_index")
+        hits = j.get("hits") or j.get("retrieved") or []
+        records.append((qid, hits if limit is None else _top_hits(hits, limit)))
     # If qids missing, fill sequentially starting at 1
     if any(qid is None for qid,_ in records):
         records = list(enumerate([h for _,h in records], start=1))
     return records  # list of (qid, hits)
 
-def entities_in_text(text, entities):
-    t = text.lower()
-    found = set()
-    for e in entities:
-        if e.lower() in t:
-            found.add(e)
-    return found
+def doc_entity_index(corpus_path, doc_ids, entities):
+    """
+    doc_id -> frozenset of entity indexes it contains: one automaton pass per
+    distinct doc over the union of all required entities (texts are streamed
+    and dropped; docs absent from the corpus map to the empty set).
+    """
+    matcher = Matcher(entities)
+    index = dict.fromkeys(doc_ids, frozenset())
+    for did, text in iter_corpus(corpus_path, wanted=index):
+        index[did] = frozenset(matcher.find_ids(text))
+    return index
 
 def main():
     ap = argparse.ArgumentParser()
@@ -75,19 +89,20 @@ def main():
     ap.add_argument("--out_per_query", required=True)
     ap.add_argument("--out_summary", required=True)
     ap.add_argument("--ks", type=int, nargs="+", default=[1,5,10,50,150])
+    ap.add_argument("--out_parquet", default=None, help="per-query rows as Parquet too (needs pyarrow)")
     args = ap.parse_args()
 
     qs = load_queries(args.queries)
-    doc_map = load_corpus(args.corpus)
-    cache = load_cache(args.cache)
+    max_k = max(args.ks)
+    cache = load_cache(args.cache, limit=max_k)
 
     # Index queries by qid
     q_by_id = {q["_qid"]: q for q in qs}
 
-    # Prepare per-query results
-    rows = []
-    totals = {k: {"complete":0, "partial":0, "zero":0} for k in args.ks}
-
+    # Ranked doc ids (only the top max(ks) can count) and the union of required
+    # entities, matched case-insensitively like a lowercase substring check
+    work = []
+    ent_ids = {}
     for qid, hits in cache:
         q = q_by_id.get(qid)
         if not q:
@@ -96,28 +111,37 @@ def main():
         req = q["_require"]
         if not req:
             continue
-        # Resolve doc texts for the ranked list
-        ranked_docs = []
+        ranked = []
         for h in hits:
             did = _hit_doc_id(h)
             if not did: continue
-            ranked_docs.append(doc_map.get(did, ""))
+            ranked.append(did)
+            if len(ranked) >= max_k: break
+        req_ids = [ent_ids.setdefault(e.lower(), len(ent_ids)) for e in req]
+        work.append((qid, q, req, req_ids, ranked))
 
-        for k in args.ks:
-            top_text = " ".join(ranked_docs[:k])
-            found = entities_in_text(top_text, req)
-            missing = [e for e in req if e not in found]
-            status = "complete" if len(found) == len(req) else ("zero" if len(found)==0 else "partial")
-            totals[k][status] += 1
+    doc_ents = doc_entity_index(args.corpus, {d for w in work for d in w[4]}, list(ent_ids))
+
+    # coverage for every k at once: [query, k, required entity] from prefix unions
+    # of the per-doc entity sets over the rank matrix
+    mat, vocab = rank_matrix([w[4] for w in work], max_k)
+    found = coverage_at_k(mat, [doc_ents[d] for d in vocab], [w[3] for w in work], args.ks)
+    counts, status = coverage_status(found, np.array([len(w[2]) for w in work], dtype=np.int64))
+    totals = {k: {st: int((status[:, i] == st).sum()) for st in ("complete", "partial", "zero")}
+              for i, k in enumerate(args.ks)}
 
+    # Prepare per-query results
+    rows = []
+    for qi, (qid, q, req, req_ids, ranked) in enumerate(work):
+        for i, k in enumerate(args.ks):
             rows.append({
                 "qid": qid,
                 "k": k,
                 "query_text": q.get("text",""),
                 "required_total": len(req),
-                "found_count": len(found),
-                "status": status,
-                "missing": " | ".join(missing)
+                "found_count": int(counts[qi, i]),
+                "status": str(status[qi, i]),
+                "missing": " | ".join(e for j, e in enumerate(req) if not found[qi, i, j])
             })
 
     # Write per-query CSV
@@ -126,6 +150,9 @@ def main():
         writer = csv.DictWriter(f, fieldnames=["qid","k","query_text","required_total","found_count","status","missing"])
         writer.writeheader()
         writer.writerows(rows)
+    maybe_write_parquet(to_columns(rows, {"qid": str, "k": np.int32, "query_text": str, "required_total": np.int32,
+                                          "found_count": np.int32, "status": str, "missing": str}),
+                        args.out_parquet)
 
     # Write summary text
     total_qs = len({r["qid"] for r in rows}) if rows else 0
@@ -1,21 +1,16 @@
-﻿import json, sys
+﻿import os, sys
 sys.path.insert(0, r"F:\graph-corag-clean\src")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
 from graphcorag.intent_router import route_intent
-
-def iter_jsonl(p):
-    with open(p, "r", encoding="utf-8") as f:
-        for line in f:
-            line=line.strip()
-            if line:
-                yield json.loads(line)
+from graphcorag.fileio import JsonlWriter, iter_jsonl
 
 if __name__ == "__main__":
     in_p, out_p = sys.argv[1], sys.argv[2]
-    with open(out_p, "w", encoding="utf-8") as out:
+    with JsonlWriter(out_p) as out:
         for obj in iter_jsonl(in_p):
             text = obj.get("text","")
             surfaces = obj.get("extracted_surfaces") or []
             intent, cues = route_intent(text, surfaces)
             obj["intent"] = intent
             obj["relation_hint"] = cues
-            out.write(json.dumps(obj, ensure_ascii=False)+"\n")
+            out.write(obj)
@@ -1,27 +1,10 @@
 ﻿# -*- coding: utf-8 -*-
-import argparse, json, sys, importlib.util, os
-from typing import Any, Dict, List, Optional, Tuple
+import argparse, sys, importlib.util, os
 
-def _safe_cui(v: Any) -> Optional[str]:
-    if v is None:
-        return None
-    s = str(v).strip().lower()
-    if s in ("", "none", "null", "na", "n/a", "of"):  # guard "of" garbage value
-        return None
-    return str(v).strip()
-
-def _load_jsonl(path: str) -> List[Dict[str, Any]]:
-    out = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: 
-                continue
-            try:
-                out.append(json.loads(line))
-            except Exception as e:
-                print(f"[WARN] bad JSONL line: {e}", file=sys.stderr)
-    return out
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from graphcorag.__main__ import _add_resources, _add_run, _run, build_pipeline
+from graphcorag.fileio import iter_jsonl
+from graphcorag.pipeline import MODE_RETRIEVERS
 
 def _import_from_path(py_path: str, obj_name: str):
     spec = importlib.util.spec_from_file_location("mod_"+obj_name, py_path)
@@ -34,144 +17,50 @@ def _import_from_path(py_path: str, obj_name: str):
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--proj",    type=str, required=False, default="")
-    p.add_argument("--corpus",  type=str, required=True)
-    p.add_argument("--kg",      type=str, required=True)
-    p.add_argument("--dict",    type=str, required=True)
-    p.add_argument("--overlay", type=str, required=True)
-    p.add_argument("--schema",  type=str, required=True)
+    _add_resources(p)
+    _add_run(p)
     p.add_argument("--queries", type=str, required=True)
-    p.add_argument("--out",     type=str, required=True)
-
-    p.add_argument("--topk", type=int, default=80)
     p.add_argument("--min_constraints", type=int, default=2)
-    p.add_argument("--mode", choices=["text","kg","both"], default="both")
-    p.add_argument("--bm25_mod_path", type=str, required=True)
-    p.add_argument("--dense_mod_path", type=str, required=True)
+    p.add_argument("--bm25_mod_path", type=str, default=None,
+                   help="optional file defining TextRetriever (default: graphcorag.text_retriever)")
+    p.add_argument("--dense_mod_path", type=str, default=None,
+                   help="optional file defining DenseRetriever (default: graphcorag.dense_retriever)")
+    p.add_argument("--service", type=str, default=None,
+                   help="URL of a running graphcorag.service; retrieval uses its warm indexes "
+                        "(KG verdicts and paths are still computed locally)")
+    p.set_defaults(cmd="run")
 
     args = p.parse_args()
 
-    os.makedirs(args.out, exist_ok=True)
-    log_path  = os.path.join(args.out, "scrape_run_verbose.log")
-    out_path  = os.path.join(args.out, "hybrid.outputs.jsonl")
-    rl_path   = os.path.join(args.out, "rl_eval.tsv")
-
-    # Import retrievers
-    TextRetriever  = _import_from_path(args.bm25_mod_path,  "TextRetriever")
-    DenseRetriever = _import_from_path(args.dense_mod_path, "DenseRetriever")
-
-    bm25  = TextRetriever(args.corpus, args.dict, args.overlay)
-    dense = DenseRetriever(args.corpus)
-
-    # Minimal KG interface (expects CSV h,r,t headers or no header)
-    def iter_kg_edges():
-        import csv
-        with open(args.kg, "r", encoding="utf-8") as f:
-            r = csv.reader(f)
-            peek = next(r)
-            has_hdr = (len(peek)>=3 and {"h","r","t"}.issubset({x.strip().lower() for x in peek}))
-            if not has_hdr: 
-                yield tuple(peek[:3])
-            for row in r:
-                if not row: continue
-                yield tuple(row[:3])
-
-    # Build quick neighbor index for INTERACTS_WITH / ADVERSE_EFFECT
-    from collections import defaultdict
-    nbr = defaultdict(list)
-    for h,r,t in iter_kg_edges():
-        r2 = r.strip()
-        if r2 in ("INTERACTS_WITH","ADVERSE_EFFECT"):
-            nbr[(h.strip(), r2)].append(t.strip())
-
-    examples = _load_jsonl(args.queries)
-
-    with open(log_path, "w", encoding="utf-8") as log, \
-         open(out_path, "w", encoding="utf-8") as jout, \
-         open(rl_path, "w", encoding="utf-8") as rl:
-
-        rl.write("qid,qtype,rel,goal,phase,coverage,ter,top1_score,top1_id,reward,hops\n")
-
-        for qi, ex in enumerate(examples, start=1):
-            qid   = ex.get("qid", f"Q{qi}")
-            qtext = ex.get("text") or ex.get("question") or ""
-            rels  = ex.get("relations") or []
-            head  = _safe_cui(ex.get("head_cui"))
-            qtype = "unknown"
-            hop_count = 1
-
-            # TEXT side
-            if args.mode == "text":
-                bm = bm25.search(qtext, topk=args.topk)
-                de = []
-            elif args.mode == "kg":
-                bm = []
-                de = dense.search(qtext, topk=args.topk)
-            else:
-                bm = bm25.search(qtext, topk=args.topk)
-                de = dense.search(qtext, topk=args.topk)
-            # naive merge: prefer dense score if same doc id appears
-            scores = {}
-            for doc_id, score in bm:
-                scores[doc_id] = max(scores.get(doc_id, 0.0), float(score))
-            for _hit in de:
-                # accept dicts or tuples
-                if isinstance(_hit, dict):
-                    doc_id = _hit.get("id") or _hit.get("doc_id") or _hit.get("document_id")
-                    score  = float(_hit.get("score", 0.0))
-                elif isinstance(_hit, (list, tuple)) and len(_hit) >= 2:
-                    a, b = _hit[0], _hit[1]
-                    # tolerate (score, id) or (id, score)
-                    if isinstance(a, (int, float)) and not isinstance(b, (int, float)):
-                        doc_id, score = b, float(a)
-                    else:
-                        doc_id, score = a, float(b)
-                else:
-                    continue
-                if doc_id is None:
-                    continue
-                scores[doc_id] = max(scores.get(doc_id, 0.0), float(score))
-                scores[doc_id] = max(scores.get(doc_id, 0.0), float(score))
-            top_sorted = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:args.topk]
-            top1 = top_sorted[0] if top_sorted else ("N/A", 0.0)
-
-            # KG side
-            kg_verdicts = []
-            coverage = 0.0
-            if rels and head:
-                for rel in rels:
-                    rel = rel.strip()
-                    if (head, rel) in nbr:
-                        # collect neighbors briefly
-                        for t in nbr[(head, rel)][:8]:
-                            kg_verdicts.append({"edge": (head, rel, t), "present": True})
-                        coverage = 1.0 if kg_verdicts else 0.0
-                        qtype = "ddi" if rel=="INTERACTS_WITH" else "ae"
-                        break  # take the first relation that hits
-            decision = "supported" if coverage > 0 else "insufficient_text_support"
-            reward   = 1.0 if coverage > 0 else 0.0
-            ter      = float(len(top_sorted))/float(args.topk or 1)
-
-            print("="*80, file=log)
-            print(f"Query {qi}: {qtext}", file=log)
-            print(f"text_topk: {len(top_sorted)} results; top1=({top1[0]}, {top1[1]})", file=log)
-            print(f"kg_verdicts: {kg_verdicts}", file=log)
-            print(f"coverage: {coverage:.3f}", file=log)
-            print(f"decision: {decision}", file=log)
-            print(f"text_entity_recall@{args.topk}: {ter:.3f}", file=log)
-            print(f"hops: {hop_count}", file=log)
-            jrow = {
-                "qid": qid, "text": qtext, "relations": rels, "head_cui": head,
-                "kg_verdicts": kg_verdicts, "coverage": coverage,
-                "decision": decision, "text_entity_recall@k": ter, "hops": hop_count
-            }
-            jout.write(json.dumps(jrow, ensure_ascii=False) + "\n")
-            rl.write(f"{qi},{qtype},{rels[0] if rels else ''},{rels[0] if rels else ''},eval,{coverage:.3f},{ter:.3f},{top1[1]},{top1[0]},{reward},{hop_count}\n")
-
-    print(f"Log:  {log_path}")
-    print(f"Out:  {out_path}")
+    # Retrievers come from the graphcorag package; a running service or an explicit
+    # module file replaces them
+    factories, sources = {}, {}
+    if args.service:
+        # Warm server already holds the corpus, BM25 index and dense embeddings
+        from graphcorag.service import ServiceClient, RemoteRetriever
+        client = ServiceClient(args.service)
+        health = client.health()
+        print(f"[service] {health}", file=sys.stderr)
+        missing = [n for n in MODE_RETRIEVERS[args.mode] if not health.get(n)]
+        if missing:
+            # a silently empty run list would turn --mode both into BM25-only fusion
+            sys.exit(f"[service] --mode {args.mode} needs {', '.join(missing)}, which the server did not load "
+                     f"(start it with {'--dense' if 'dense' in missing else '--corpus'} or pick another --mode)")
+        factories = {"bm25": lambda: RemoteRetriever(client, "bm25"),
+                     "dense": lambda: RemoteRetriever(client, "dense")}
+        sources = {"bm25": None, "dense": None}
+    else:
+        if args.bm25_mod_path:
+            factories["bm25"] = lambda: _import_from_path(args.bm25_mod_path, "TextRetriever")(
+                args.corpus, args.dict, args.overlay)
+            sources["bm25"] = args.bm25_mod_path
+        if args.dense_mod_path:
+            factories["dense"] = lambda: _import_from_path(args.dense_mod_path, "DenseRetriever")(
+                args.corpus, model_name=args.dense_model)
+            sources["dense"] = args.dense_mod_path
+
+    pipe = build_pipeline(args, factories=factories, sources=sources)
+    _run(pipe, args, iter_jsonl(args.queries, on_error="warn"))
 
 if __name__ == "__main__":
     main()
-
-
-
@@ -1 +1,35 @@
-﻿
+# -*- coding: utf-8 -*-
+"""
+graphcorag
+Hybrid text + KG retrieval. `import graphcorag` is cheap: the names below resolve
+to their submodules on first access, and torch / sentence-transformers / faiss /
+nmslib are only imported by the code paths that use them.
+"""
+import importlib
+
+_LAZY = {
+    "KG": "graphcorag.kg_loader",
+    "PathFinder": "graphcorag.kg_paths",
+    "TwoHopIndex": "graphcorag.kg_reach2",
+    "TextRetriever": "graphcorag.text_retriever",
+    "DenseRetriever": "graphcorag.dense_retriever",
+    "NeuralReranker": "graphcorag.neural_reranker",
+    "RetrievalCache": "graphcorag.retrieval_cache",
+    "fuse": "graphcorag.fusion",
+    "Pipeline": "graphcorag.pipeline",
+    "Matcher": "graphcorag.matcher",
+    "load_lexicon": "graphcorag.dict_snapshot",
+}
+
+__all__ = sorted(_LAZY)
+
+def __getattr__(name):
+    mod = _LAZY.get(name)
+    if mod is None:
+        raise AttributeError(f"module 'graphcorag' has no attribute {name!r}")
+    value = getattr(importlib.import_module(mod), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+python -m graphcorag <command>
+
+  analyze  raw queries (qid, text) -> structured JSONL (surfaces, relations, head/tail, candidates)
+  run      structured queries -> scrape_run_verbose.log / hybrid.outputs.jsonl / rl_eval.tsv
+  end2end  analyze + run in one process (dictionaries, KG and indexes loaded once)
+  compile-dict  merge dict + overlay into a memory-mapped snapshot (<dict>.dictsnap) every stage reads
+
+  PYTHONPATH=src python -m graphcorag end2end --corpus data/corpus.jsonl --kg data/kg_edges.merged.csv \
+      --dict config/umls_dict.txt --overlay config/umls_dict.overlay.json --schema config/relation_schema.json \
+      --raw queries.raw.jsonl --out out/e2e
+"""
+import argparse, os, sys
+
+from graphcorag.fusion import METHODS as FUSION_METHODS, parse_weights
+
+def _add_resources(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--kg",      type=str, required=True)
+    p.add_argument("--dict",    type=str, default=None)
+    p.add_argument("--overlay", type=str, default=None)
+    p.add_argument("--schema",  type=str, default=None)
+
+def _add_analyze(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--kg_bloom", action="store_true", help="Bloom filters in front of the KG checks of analyze candidates")
+    p.add_argument("--prune_candidates", action="store_true", help="analyze keeps only the candidate triples the KG holds")
+
+def _add_run(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--corpus", type=str, required=True)
+    p.add_argument("--out",    type=str, required=True)
+    p.add_argument("--topk", type=int, default=80)
+    p.add_argument("--mode", choices=["text", "kg", "both"], default="both")
+    p.add_argument("--fusion", choices=FUSION_METHODS, default="rrf",
+                   help="how BM25 and dense hits are merged (max = legacy raw-score max)")
+    p.add_argument("--fusion_weights", type=parse_weights, default=None, help="e.g. bm25=0.4,dense=0.6")
+    p.add_argument("--rrf_k", type=float, default=60.0)
+    p.add_argument("--dense_model", type=str, default="sentence-transformers/all-MiniLM-L6-v2")
+    p.add_argument("--rerank_model", type=str, default=None,
+                   help="cross-encoder applied to the fused top-N (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2)")
+    p.add_argument("--rerank_top_n", type=int, default=50)
+    p.add_argument("--rerank_budget_ms", type=float, default=0.0,
+                   help="rerank budget per call, i.e. per --concurrency batch (<=0: unlimited)")
+    p.add_argument("--retrieval_cache", type=str, default=None,
+                   help="SQLite file caching retrieval results across runs (e.g. out/.retrieval_cache.sqlite)")
+    p.add_argument("--retrieval_cache_mb", type=float, default=512.0)
+    p.add_argument("--max_hops", type=int, default=3, help="longest KG path searched between head and tail")
+    p.add_argument("--path_k", type=int, default=5, help="supporting paths kept per query")
+    p.add_argument("--path_fanout", type=int, default=256)
+    p.add_argument("--path_budget_ms", type=float, default=0.0,
+                   help="per-query path search time budget (<=0: unlimited); outputs then depend on machine load")
+    p.add_argument("--path_max_expanded", type=int, default=0,
+                   help="per-query cap on nodes expanded by the path search (<=0: unlimited); reproducible")
+    p.add_argument("--neighbor_rank", type=str, default="specificity",
+                   help="edge weight ranking the verdict neighbors: specificity, sources, cooccurrence or name=coef,...")
+    p.add_argument("--neighbor_weights", type=str, default=None, help="head,relation,tail,weight CSV (cooccurrence)")
+    p.add_argument("--profile", action="store_true",
+                   help="write per-query stage timings and p50/p95/p99 to hybrid.profile.json")
+    p.add_argument("--profile_hook", choices=["cprofile", "pyinstrument"], default=None,
+                   help="also profile the query loop (main thread) to hybrid.profile.prof / .html")
+    p.add_argument("--concurrency", type=int, default=1,
+                   help=">1: asyncio runner overlapping BM25/dense/KG stages across queries (outputs stay in query order)")
+
+def build_pipeline(args, factories=None, sources=None):
+    """factories / sources: as in Pipeline (e.g. run_hybrid's --service / *_mod_path retrievers)."""
+    from graphcorag.pipeline import Pipeline
+    kg_bloom, prune = getattr(args, "kg_bloom", False), getattr(args, "prune_candidates", False)
+    if args.cmd == "analyze":
+        return Pipeline(None, args.kg, dict_path=args.dict, overlay_path=args.overlay, schema_path=args.schema,
+                        kg_bloom=kg_bloom, prune_candidates=prune)
+    return Pipeline(args.corpus, args.kg, dict_path=args.dict, overlay_path=args.overlay, schema_path=args.schema,
+                    kg_bloom=kg_bloom, prune_candidates=prune,
+                    mode=args.mode, topk=args.topk, fusion=args.fusion, fusion_weights=args.fusion_weights,
+                    rrf_k=args.rrf_k, dense_model=args.dense_model, rerank_model=args.rerank_model,
+                    rerank_top_n=args.rerank_top_n, rerank_budget_ms=args.rerank_budget_ms,
+                    retrieval_cache=args.retrieval_cache, retrieval_cache_mb=args.retrieval_cache_mb,
+                    max_hops=args.max_hops, path_k=args.path_k, path_fanout=args.path_fanout,
+                    path_budget_ms=args.path_budget_ms, path_max_expanded=args.path_max_expanded,
+                    neighbor_rank=args.neighbor_rank,
+                    neighbor_weights=args.neighbor_weights, factories=factories, sources=sources)
+
+def _run(pipe, args, rows):
+    paths = pipe.run(rows, args.out, concurrency=args.concurrency, profile=args.profile, hook=args.profile_hook)
+    print(f"Log:  {paths['log']}")
+    print(f"Out:  {paths['out']}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m graphcorag", description="graphcorag in-process pipeline")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    a = sub.add_parser("analyze", help="raw queries -> structured JSONL")
+    _add_resources(a)
+    _add_analyze(a)
+    a.add_argument("--raw", type=str, required=True)
+    a.add_argument("--out", type=str, required=True, help="structured JSONL")
+    a.add_argument("--no_preview", action="store_true", help="skip the batched KG check of candidates")
+
+    r = sub.add_parser("run", help="structured queries -> hybrid outputs")
+    _add_resources(r)
+    _add_run(r)
+    r.add_argument("--queries", type=str, required=True)
+
+    e = sub.add_parser("end2end", help="analyze + run in one process")
+    _add_resources(e)
+    _add_analyze(e)
+    _add_run(e)
+    e.add_argument("--raw", type=str, required=True)
+
+    c = sub.add_parser("compile-dict", help="dict + overlay -> compiled dictionary snapshot")
+    c.add_argument("--dict", type=str, required=True, help="CUI -> [surfaces] JSON (umls_dict.txt)")
+    c.add_argument("--overlay", type=str, default=None)
+    c.add_argument("--out", type=str, default=None, help="snapshot path (default: <dict>.dictsnap)")
+
+    args = ap.parse_args(argv)
+    if args.cmd == "compile-dict":
+        from graphcorag.dict_snapshot import compile_dict
+        compile_dict(args.dict, args.overlay, args.out)
+        return
+    from graphcorag.fileio import iter_jsonl, write_jsonl
+    pipe = build_pipeline(args)
+
+    if args.cmd == "analyze":
+        write_jsonl(args.out, pipe.iter_analyze(iter_jsonl(args.raw, on_error="warn"), preview=not args.no_preview))
+        print(f"Structured: {args.out}")
+    elif args.cmd == "run":
+        _run(pipe, args, iter_jsonl(args.queries, on_error="warn"))
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        structured = os.path.join(args.out, "queries.structured.jsonl")
+        # streamed through the structured file, so memory does not grow with the query set
+        write_jsonl(structured, pipe.iter_analyze(iter_jsonl(args.raw, on_error="warn")))
+        print(f"Structured: {structured}", file=sys.stderr)
+        _run(pipe, args, iter_jsonl(structured))
+
+if __name__ == "__main__":
+    main()
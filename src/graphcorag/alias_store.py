@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.alias_store
+Embedded alias catalog on disk (written by scripts/02_embed_kg_aliases_sapbert.py):
+string tables for nodes and distinct aliases, an int32 (node, alias) pair table and
+one float32 vector per distinct alias, as plain .npy files memory-mapped on load,
+described by a JSON manifest.
+
+  out/kg_catalog.sbert/
+    manifest.json                  model, dim, counts, catalog sha256, current file names
+    nodes.<h>.txt  aliases.<h>.txt  pairs.<h>.npy  vectors.<h>.npy
+
+Data files are tagged with the catalog hash and the manifest is replaced last, so a
+reader never sees a half-written store. Re-embedding reuses the vectors of every
+alias already in the store (same model) and encodes only the new ones.
+
+API:
+  store = AliasStore.open("out/kg_catalog.sbert")
+  store.vectors[store.alias_row("adalimumab")]
+  store.node_aliases("drug_adalimumab")
+"""
+from __future__ import annotations
+import hashlib, io, json, os, time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MANIFEST = "manifest.json"
+STORE_VERSION = 1
+
+def file_sha256(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def read_manifest(store_dir: str) -> Optional[Dict[str, Any]]:
+    """The store's manifest, or None when there is no (readable, current-version) store."""
+    try:
+        with io.open(os.path.join(store_dir, MANIFEST), "r", encoding="utf-8") as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return m if m.get("version") == STORE_VERSION else None
+
+def catalog_rows(catalog: Dict[str, Iterable[str]]) -> Tuple[List[str], List[str], List[Tuple[int, int]]]:
+    """
+    Flatten a node -> [aliases] catalog into (nodes, distinct aliases, (node_idx, alias_idx) pairs),
+    all in catalog order; an alias shared by several nodes gets one row.
+    """
+    nodes: List[str] = []
+    alias_idx: Dict[str, int] = {}
+    pairs: List[Tuple[int, int]] = []
+    for node, names in catalog.items():
+        n = len(nodes)
+        nodes.append(node)
+        for s in names:
+            pairs.append((n, alias_idx.setdefault(s, len(alias_idx))))
+    return nodes, list(alias_idx), pairs
+
+def _read_lines(path: str, n: int) -> List[str]:
+    with io.open(path, "r", encoding="utf-8", newline="\n") as f:
+        return f.read().split("\n") if n else []
+
+def _write_lines(path: str, lines: Sequence[str]) -> None:
+    bad = next((s for s in lines if "\n" in s), None)
+    if bad is not None:
+        raise ValueError(f"string with an embedded newline cannot be stored: {bad!r}")
+    with io.open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(lines))
+
+class AliasStore:
+    """Read-only view; .pairs (int32, n_pairs x 2) and .vectors (float32, n_aliases x dim) are memory-mapped."""
+
+    def __init__(self, store_dir: str, manifest: Dict[str, Any]):
+        import numpy as np
+        self.store_dir = store_dir
+        self.manifest = manifest
+        files = manifest["files"]
+        path = lambda k: os.path.join(store_dir, files[k])
+        self.nodes: List[str] = _read_lines(path("nodes"), manifest["n_nodes"])
+        self.aliases: List[str] = _read_lines(path("aliases"), manifest["n_aliases"])
+        self.pairs = np.load(path("pairs"), mmap_mode="r", allow_pickle=False)
+        self.vectors = np.load(path("vectors"), mmap_mode="r", allow_pickle=False)
+        self.model: str = manifest.get("model", "")
+        self._alias_row: Optional[Dict[str, int]] = None
+        self._node_row: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def open(cls, store_dir: str) -> "AliasStore":
+        manifest = read_manifest(store_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No alias store (v{STORE_VERSION}) at {store_dir}")
+        return cls(store_dir, manifest)
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def alias_row(self, alias: str) -> Optional[int]:
+        """Row of alias in .vectors, or None."""
+        if self._alias_row is None:
+            self._alias_row = {s: i for i, s in enumerate(self.aliases)}
+        return self._alias_row.get(alias)
+
+    def node_aliases(self, node: str) -> List[str]:
+        if self._node_row is None:
+            self._node_row = {n: i for i, n in enumerate(self.nodes)}
+        i = self._node_row.get(node)
+        if i is None:
+            return []
+        rows = self.pairs[self.pairs[:, 0] == i, 1]
+        return [self.aliases[j] for j in rows.tolist()]
+
+    def pair_keys(self) -> List[Tuple[str, str]]:
+        """(node, alias) for every pair, the `keys` of the former kg_catalog.sbert.npz."""
+        nodes, aliases = self.nodes, self.aliases
+        return [(nodes[n], aliases[a]) for n, a in self.pairs.tolist()]
+
+def write_store(store_dir: str, nodes: Sequence[str], aliases: Sequence[str], pairs: Sequence[Tuple[int, int]],
+                vectors, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write a new store generation and switch the manifest to it. meta must carry
+    catalog_sha256 (used to tag the files); older generations are removed.
+    """
+    import numpy as np
+    os.makedirs(store_dir, exist_ok=True)
+    tag = meta["catalog_sha256"][:12]
+    files = {"nodes": f"nodes.{tag}.txt", "aliases": f"aliases.{tag}.txt",
+             "pairs": f"pairs.{tag}.npy", "vectors": f"vectors.{tag}.npy"}
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    _write_lines(os.path.join(store_dir, files["nodes"]), nodes)
+    _write_lines(os.path.join(store_dir, files["aliases"]), aliases)
+    np.save(os.path.join(store_dir, files["pairs"]), np.asarray(pairs, dtype=np.int32).reshape(-1, 2))
+    np.save(os.path.join(store_dir, files["vectors"]), vectors)
+
+    manifest = dict(meta, version=STORE_VERSION, dim=int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                    dtype="float32", n_nodes=len(nodes), n_aliases=len(aliases), n_pairs=len(pairs),
+                    files=files, created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    tmp = os.path.join(store_dir, MANIFEST + ".tmp")
+    with io.open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+
+    keep = set(files.values()) | {MANIFEST}
+    for name in os.listdir(store_dir):
+        if name not in keep and name.split(".", 1)[0] in files:
+            try:
+                os.remove(os.path.join(store_dir, name))
+            except OSError:
+                pass  # still mapped by a reader (Windows); removed by a later run
+    return manifest
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.async_pipeline
+Bounded asyncio runner for per-query pipelines.
+
+Each item is split into independent blocking stages (e.g. BM25 search, dense
+search, KG lookup) that run in a thread pool and are awaited together; several
+items are in flight at once, and results are handed to the sink strictly in
+input order. Stages that release the GIL (FAISS / torch, HTTP calls to
+graphcorag.service) overlap fully, so wall time approaches the slowest stage.
+
+API: run_ordered(items, stages_for, finish, sink, concurrency=8)
+"""
+from __future__ import annotations
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+async def run_stages(stages: Dict[str, Callable[[], Any]], executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """Run blocking callables concurrently in the executor; returns {stage name: result}."""
+    loop = asyncio.get_running_loop()
+    names = list(stages)
+    results = await asyncio.gather(*(loop.run_in_executor(executor, stages[n]) for n in names))
+    return dict(zip(names, results))
+
+async def ordered_map(fn: Callable[[int, T], Awaitable[R]], items: Iterable[T],
+                      concurrency: int = 8, window: Optional[int] = None) -> AsyncIterator[R]:
+    """
+    Yield fn(i, item) results in input order with at most `concurrency` calls running
+    and at most `window` results buffered (finished but waiting for an earlier item).
+    """
+    concurrency = max(1, int(concurrency))
+    window = max(concurrency, int(window or 4 * concurrency))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _guarded(i: int, item: T) -> R:
+        async with sem:
+            return await fn(i, item)
+
+    pending: deque = deque()
+    try:
+        for i, item in enumerate(items):
+            pending.append(asyncio.ensure_future(_guarded(i, item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+def run_ordered(items: Iterable[T],
+                stages_for: Callable[[int, T], Dict[str, Callable[[], Any]]],
+                finish: Callable[[int, T, Dict[str, Any]], R],
+                sink: Callable[[R], None],
+                concurrency: int = 8, workers: Optional[int] = None) -> int:
+    """
+    Synchronous entry point.
+      stages_for(i, item) -> {name: blocking callable}  (run concurrently per item)
+      finish(i, item, {name: result}) -> output         (runs on the event loop thread)
+      sink(output)                                      (called in input order)
+    Returns the number of items processed.
+    """
+    async def _main() -> int:
+        n = 0
+        with ThreadPoolExecutor(max_workers=workers or max(4, 3 * int(concurrency))) as ex:
+            async def _one(i: int, item: T) -> R:
+                res = await run_stages(stages_for(i, item), ex)
+                return finish(i, item, res)
+            async for out in ordered_map(_one, items, concurrency):
+                sink(out)
+                n += 1
+        return n
+    return asyncio.run(_main())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.cues
+Compiled relation / intent cue engine: a cue set (label -> regexes) is compiled
+once, and a query is lowercased once and scanned once for all of its signals -
+every plain-keyword cue in a single trie-shaped regex, plus one precompiled search
+per label that also has real regex cues.
+
+- scan(text) returns the frozenset of labels with at least one cue occurring in the
+  lowercased text, exactly what a per-cue re.search loop would find (overlapping
+  keywords included)
+- scan_many(texts) is the batch form the analyze loops use
+- QUERY_CUES holds the cues the analyzer runs on every query: rules keywords
+  ("rel:<REL>"), intent-router predicate cues ("pred:<REL>"), "yesno", "pregnan"
+- CueEngine.from_schema() extends them with an optional "cues" section of
+  relation_schema.json, e.g. {"cues": {"rel:TREATS": ["prescribed for"]}}
+  (regexes, written for lowercased text)
+
+Cues are ordinary `re` patterns; a leading global flag group such as (?i) is scoped
+to its cue, numbered backreferences are not supported.
+
+API:
+  eng = CueEngine.from_schema(schema)
+  signals = eng.scan("Is adalimumab safe in pregnancy?")   # {"yesno", "rel:CONTRAINDICATED_FOR", "pregnan"}
+"""
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+# rules.detect_relations: plain keywords (substring of the lowercased query)
+REL_KEYWORDS: Dict[str, List[str]] = {
+    "ADVERSE_EFFECT": [
+        "adverse effect","side effect","associated with","induces","causes","cough","nausea","toxicity"
+    ],
+    "CONTRAINDICATED_FOR": [
+        "contraindicated","avoid in","not recommended for",
+        "pregnancy","pregnant","teratogen","teratogenic","embryotoxic","fetal",
+        "safe in pregnancy"  # phrased as a question still triggers relation generation
+    ],
+    "TREATS": ["treat","treats","used for","indication","manage","management of","effective for"],
+    "FIRST_LINE": ["first line","first-line"],
+    "EFFECTIVE_IN": ["effective in","efficacy in"],
+    "REQUIRES_MONITORING": ["monitoring","requires monitoring","monitor"],
+    "INTERACTS_WITH": ["interacts with","interaction","drug interaction"],
+    "HAS_MEMBER": ["has member","includes"],
+    "MEMBER_OF": ["member of","class of","belongs to"]
+}
+
+# intent_router.detect_predicate: regexes
+PRED_CUES: Dict[str, List[str]] = {
+    "ADVERSE_EFFECT": [r"adverse effect", r"side effect", r"toxicit", r"hepatotox", r"nephrotox", r"pneumonitis"],
+    "INTERACTS_WITH": [r"interact", r"contraindicat", r"co[- ]?admin", r"drug[- ]?drug", r"increase[s]? levels", r"reduce[s]? levels"],
+    "INDICATION":    [r"indicat", r"treat[s]?|treatment", r"for \b.*\b(cancer|disease|condition|syndrome)"]
+}
+
+YESNO_CUE = r"^\s*(?:is|does|do|are|can|could|would|whether)\b"
+
+QUERY_CUES: Dict[str, List[str]] = {
+    **{f"rel:{rel}": [re.escape(kw) for kw in kws] for rel, kws in REL_KEYWORDS.items()},
+    **{f"pred:{rel}": list(pats) for rel, pats in PRED_CUES.items()},
+    "yesno": [YESNO_CUE],
+    "pregnan": ["pregnan"],
+}
+
+_GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+_LITERAL = re.compile(r"(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])+")
+_UNESCAPE = re.compile(r"\\(.)")
+
+def _scoped(pattern: str) -> str:
+    """(?i)foo -> (?i:foo): global flags are only legal at the start of the combined pattern."""
+    m = _GLOBAL_FLAGS.match(pattern)
+    return f"(?{m.group(1)}:{pattern[m.end():]})" if m else pattern
+
+def _literal(pattern: str) -> Optional[str]:
+    """The plain string a metacharacter-free cue matches, else None."""
+    return _UNESCAPE.sub(r"\1", pattern) if _LITERAL.fullmatch(pattern) else None
+
+class CueEngine:
+    """
+    One compiled cue set; labels keep their declaration order (.labels).
+    Literal cues share one prefix-trie regex, each literal ending in an empty marker
+    group (m.lastindex says which literal matched), so the scan tries one branch per
+    next character instead of every cue in turn; regex cues are searched per label.
+    """
+
+    def __init__(self, cues: Mapping[str, Sequence[str]]):
+        self.cues: Dict[str, List[str]] = {label: [pats] if isinstance(pats, str) else list(pats)
+                                           for label, pats in cues.items() if pats}
+        self.labels: List[str] = list(self.cues)
+        lit_labels: Dict[str, Set[int]] = {}
+        regex_cues: Dict[int, List[str]] = {}
+        for i, pats in enumerate(self.cues.values()):
+            for p in pats:
+                lit = _literal(p)
+                if lit is None:
+                    regex_cues.setdefault(i, []).append(_scoped(p))
+                else:
+                    lit_labels.setdefault(lit, set()).add(i)
+
+        # marker group -> labels matching at that position: a literal implies every literal that is its prefix
+        self._marker: Dict[int, Tuple[int, ...]] = {}
+        trie: Dict[str, Any] = {}
+        for lit in lit_labels:
+            node = trie
+            for ch in lit:
+                node = node.setdefault(ch, {})
+            node[""] = None
+        self._trie = re.compile(self._emit(trie, "", lit_labels)) if trie else None
+        # regex cues stay out of the trie (as branches they would be tried at every position): one search per label
+        self._regex: List[Tuple[int, "re.Pattern[str]"]] = [
+            (i, re.compile("|".join(f"(?:{p})" for p in pats))) for i, pats in regex_cues.items()]
+
+    def _emit(self, node: Dict[str, Any], prefix: str, lit_labels: Dict[str, Set[int]]) -> str:
+        alts = [re.escape(ch) + self._emit(node[ch], prefix + ch, lit_labels) for ch in sorted(k for k in node if k)]
+        if "" in node:
+            labels = set()
+            for n in range(1, len(prefix) + 1):
+                labels |= lit_labels.get(prefix[:n], set())
+            self._marker[len(self._marker) + 1] = tuple(sorted(labels))
+            alts.append("()")
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    @classmethod
+    def from_schema(cls, schema: Optional[Mapping[str, Any]], base: Mapping[str, Sequence[str]] = QUERY_CUES) -> "CueEngine":
+        """base cues plus the schema's "cues" section (label -> [regex, ...]); no section, no change."""
+        extra = (schema or {}).get("cues") if isinstance(schema, Mapping) else None
+        if not extra:
+            return default_engine() if base is QUERY_CUES else cls(base)
+        merged = {label: list(pats) for label, pats in base.items()}
+        for label, pats in extra.items():
+            pats = [pats] if isinstance(pats, str) else list(pats or [])
+            merged.setdefault(str(label), []).extend(p for p in pats if p not in merged.get(str(label), []))
+        return cls(merged)
+
+    def scan(self, text: Optional[str]) -> FrozenSet[str]:
+        """Labels with a cue in text.lower()."""
+        t = (text or "").lower()
+        hit: Set[int] = set()
+        if self._trie is not None:
+            search, marker = self._trie.search, self._marker
+            pos = 0
+            while True:
+                m = search(t, pos)
+                if m is None:
+                    break
+                hit.update(marker[m.lastindex])
+                pos = m.start() + 1
+        for i, rx in self._regex:
+            if i not in hit and rx.search(t):
+                hit.add(i)
+        labels = self.labels
+        return frozenset(labels[i] for i in hit)
+
+    def scan_many(self, texts: Iterable[Optional[str]]) -> List[FrozenSet[str]]:
+        scan = self.scan
+        return [scan(t) for t in texts]
+
+@lru_cache(maxsize=1)
+def default_engine() -> CueEngine:
+    """The compiled QUERY_CUES, shared by every caller that has no schema of its own."""
+    return CueEngine(QUERY_CUES)
@@ -1,7 +1,10 @@
 import io, json
-import numpy as np
-from sentence_transformers import SentenceTransformer
-import faiss
+try:
+    from graphcorag.profiling import stage, count
+except ImportError:  # loaded by file path without src/ on sys.path
+    import contextlib
+    def stage(name): return contextlib.nullcontext()
+    def count(name, n=1): pass
 
 class DenseRetriever:
     def __init__(self, corpus_path, model_name="sentence-transformers/all-MiniLM-L6-v2"):
@@ -11,6 +14,9 @@ class DenseRetriever:
                 o = json.loads(line)
                 if o.get("id") and o.get("text"):
                     self.ids.append(o["id"]); self.texts.append(o["text"])
+        # heavy deps are imported on construction, so importing this module stays cheap
+        from sentence_transformers import SentenceTransformer
+        import faiss
         self.model = SentenceTransformer(model_name)
         X = self.model.encode(self.texts, convert_to_numpy=True, batch_size=256,
                               show_progress_bar=False, normalize_embeddings=True)
@@ -18,8 +24,11 @@ class DenseRetriever:
         self.index.add(X)
 
     def search(self, query, topk=100):
-        q = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
-        D, I = self.index.search(q, topk)
+        with stage("dense.encode"):
+            q = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
+        with stage("dense.faiss"):
+            D, I = self.index.search(q, topk)
+        count("dense.hits", int((I[0] != -1).sum()))
         out = []
         for score, idx in zip(D[0], I[0]):
             if idx == -1: break
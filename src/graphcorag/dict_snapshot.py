@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.dict_snapshot
+Compiled dictionary artifact: the CUI -> [surfaces] dictionary merged with its
+overlay once, the normalized surface -> CUIs index and the Aho-Corasick
+automaton over those surfaces, in one versioned, memory-mapped file.
+
+Compile once (again whenever the dict or the overlay changes):
+  PYTHONPATH=src python -m graphcorag compile-dict --dict config/umls_dict.txt --overlay config/umls_dict.overlay.json
+which writes config/umls_dict.txt.dictsnap next to the dict. load_lexicon()
+then opens the snapshot whenever it is fresh for both sources and merges the
+JSON files otherwise, so every stage sees the same merged dictionary.
+
+API:
+  lex = load_lexicon("config/umls_dict.txt", "config/umls_dict.overlay.json")
+  lex.surfaces("drug_bombesin")   # merged forms: dict order, then overlay additions
+  lex.lookup("Bombesin")          # CUIs sharing the (normalized) surface, preferred first
+  lex.matcher().find(text)        # normalized surfaces occurring in text
+"""
+from __future__ import annotations
+import bisect, mmap, os, struct, sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from graphcorag.fileio import load_json
+
+SNAPSHOT_EXT = ".dictsnap"
+SNAPSHOT_MAGIC = b"GCDICTSN"
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved,
+# n_cuis, n_forms, n_keys, n_cui_forms, n_key_cuis, n_states, n_edges, n_out, cui_blob_len, form_blob_len, key_blob_len,
+# dict_size, dict_mtime_ns, overlay_size, overlay_mtime_ns   (overlay -1 / -1: compiled without one)
+_HEADER = struct.Struct("<8sII11QQqqq")
+
+def _pad(n: int, align: int = 8) -> int:
+    return (-n) % align
+
+def norm_surface(x: Optional[str]) -> str:
+    """Lookup key of a surface: lowercased, whitespace runs collapsed (same as KG.surface_to_cui)."""
+    return ("" if x is None else " ".join(str(x).lower().split()))
+
+def snapshot_path_for(dict_path: str) -> str:
+    """Default snapshot location for a dictionary (sibling file with .dictsnap suffix)."""
+    return dict_path if dict_path.endswith(SNAPSHOT_EXT) else dict_path + SNAPSHOT_EXT
+
+def _stat(path: Optional[str]) -> Tuple[int, int]:
+    if not path:
+        return (-1, -1)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (-1, -1)
+    return (st.st_size, st.st_mtime_ns)
+
+def _forms(value: Any) -> List[str]:
+    """Surface strings of one dict / overlay value: a list, a single string, or dicts of strings / lists."""
+    if isinstance(value, str):
+        return [value]
+    out: List[str] = []
+    for x in value or ():
+        if isinstance(x, str):
+            out.append(x)
+        elif isinstance(x, dict):
+            for v in x.values():
+                if isinstance(v, str):
+                    out.append(v)
+                elif isinstance(v, list):
+                    out.extend(s for s in v if isinstance(s, str))
+    return out
+
+def _csr(groups: Iterable[Sequence[int]]) -> Tuple[array, array]:
+    off, ids = array("i", [0]), array("i")
+    for g in groups:
+        ids.extend(g)
+        off.append(len(ids))
+    return off, ids
+
+# ------------------------------ lexicon ------------------------------
+class Lexicon:
+    """
+    Merged dictionary. String tables are lists; the id arrays are CSR arrays
+    (array('i') when merged in memory, memoryviews into the mmap when opened
+    from a snapshot):
+
+      cuis[i]                      dict CUIs in order, then overlay-only CUIs
+      forms[cui_form_ids[j]]       j in cui_form_off[i]:cui_form_off[i+1]; stripped, exact duplicates dropped
+      keys[k]                      sorted normalized surfaces
+      cuis[key_cui_ids[j]]         j in key_cui_off[k]:key_cui_off[k+1]; dict pass first, then overlay
+    """
+    def __init__(self, cuis: List[str], forms: List[str], cui_form_off: Sequence[int], cui_form_ids: Sequence[int],
+                 keys: List[str], key_cui_off: Sequence[int], key_cui_ids: Sequence[int],
+                 automaton: Optional[tuple] = None, path: Optional[str] = None,
+                 sources: Optional[Tuple[int, int, int, int]] = None, handles: tuple = ()):
+        self.cuis, self.forms, self.keys = cuis, forms, keys
+        self.cui_form_off, self.cui_form_ids = cui_form_off, cui_form_ids
+        self.key_cui_off, self.key_cui_ids = key_cui_off, key_cui_ids
+        self.path = path
+        self.sources = sources
+        self._automaton = automaton
+        self._handles = handles
+        self._cui_pos: Optional[Dict[str, int]] = None
+        self._matcher = None
+
+    def __len__(self) -> int:
+        return len(self.cuis)
+
+    def surfaces(self, cui: str) -> List[str]:
+        if self._cui_pos is None:
+            self._cui_pos = {c: i for i, c in enumerate(self.cuis)}
+        i = self._cui_pos.get(cui)
+        if i is None:
+            return []
+        forms = self.forms
+        return [forms[j] for j in self.cui_form_ids[self.cui_form_off[i]: self.cui_form_off[i + 1]]]
+
+    def cui2surfaces(self) -> Dict[str, List[str]]:
+        """CUI -> merged surfaces, the shape of umls_dict.txt after applying the overlay."""
+        forms, off, ids = self.forms, self.cui_form_off.tolist(), self.cui_form_ids.tolist()
+        return {c: [forms[j] for j in ids[off[i]: off[i + 1]]] for i, c in enumerate(self.cuis)}
+
+    def lookup(self, surface: str) -> List[str]:
+        """CUIs whose forms normalize to surface (binary search; no index is built)."""
+        key = norm_surface(surface)
+        k = bisect.bisect_left(self.keys, key)
+        if not key or k == len(self.keys) or self.keys[k] != key:
+            return []
+        cuis = self.cuis
+        return [cuis[j] for j in self.key_cui_ids[self.key_cui_off[k]: self.key_cui_off[k + 1]]]
+
+    def surface_index(self) -> Dict[str, List[str]]:
+        """Normalized surface -> [CUIs] (first = preferred; >1 = ambiguous)."""
+        cuis, off, ids = self.cuis, self.key_cui_off.tolist(), self.key_cui_ids.tolist()
+        return {s: [cuis[j] for j in ids[off[k]: off[k + 1]]] for k, s in enumerate(self.keys)}
+
+    def matcher(self, backend: str = "auto"):
+        """
+        Matcher over self.keys (pattern index == key index). Snapshots carry the
+        pure-Python automaton, so it is rebuilt from arrays rather than constructed.
+        """
+        from graphcorag.matcher import BACKEND, Matcher
+        if backend == "auto":
+            backend = BACKEND
+        if self._matcher is None or self._matcher.backend != backend:
+            if backend == "python" and self._automaton is not None:
+                edge_off, edge_chars, edge_tgt, fail, out_off, out_ids = self._automaton
+                self._matcher = Matcher.from_automaton(self.keys, edge_off, bytes(edge_chars).decode("utf-32-le"),
+                                                       edge_tgt, fail, out_off, out_ids)
+            else:
+                self._matcher = Matcher(self.keys, backend=backend)
+        return self._matcher
+
+    def is_fresh_for(self, dict_path: Optional[str], overlay_path: Optional[str] = None) -> bool:
+        """True if this snapshot was compiled from dict_path / overlay_path as they are now on disk."""
+        if self.sources is None:
+            return True
+        dict_size, dict_mtime, ov_size, ov_mtime = self.sources
+        if dict_path and os.path.exists(dict_path) and _stat(dict_path) != (dict_size, dict_mtime):
+            return False  # a missing source is not stale: the snapshot is all we have
+        return _stat(overlay_path) == (ov_size, ov_mtime)
+
+    def close(self) -> None:
+        if not self._handles:
+            return
+        views = [self.cui_form_off, self.cui_form_ids, self.key_cui_off, self.key_cui_ids, *(self._automaton or ())]
+        for v in views:
+            if isinstance(v, memoryview):
+                v.release()
+        mm, fh = self._handles
+        mm.close()
+        fh.close()
+        self._handles = ()
+
+    def __enter__(self) -> "Lexicon":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def build_lexicon(base: Dict[str, Any], overlay: Optional[Dict[str, Any]] = None) -> Lexicon:
+    """
+    Merge a CUI -> [surfaces] dict with its overlay: overlay CUIs and surfaces are
+    appended after the dict's own, surfaces are stripped and exact duplicates
+    dropped. The normalized index lists a surface's CUIs in first-seen order.
+    """
+    cui_pos: Dict[str, int] = {}
+    members: List[List[int]] = []
+    seen: List[set] = []
+    form_id: Dict[str, int] = {}
+    key_cuis: Dict[str, List[int]] = {}
+    for src in (base or {}, overlay or {}):
+        for cui, value in src.items():
+            i = cui_pos.get(cui)
+            if i is None:
+                i = cui_pos[cui] = len(members)
+                members.append([])
+                seen.append(set())
+            for raw in _forms(value):
+                s = raw.strip()
+                if s and s not in seen[i]:
+                    seen[i].add(s)
+                    members[i].append(form_id.setdefault(s, len(form_id)))
+                k = norm_surface(raw)
+                if k:
+                    lst = key_cuis.setdefault(k, [])
+                    if i not in lst:
+                        lst.append(i)
+    keys = sorted(key_cuis)
+    cui_form_off, cui_form_ids = _csr(members)
+    key_cui_off, key_cui_ids = _csr(key_cuis[k] for k in keys)
+    return Lexicon(list(cui_pos), list(form_id), cui_form_off, cui_form_ids, keys, key_cui_off, key_cui_ids)
+
+def merge_dicts(dict_path: Optional[str], overlay_path: Optional[str] = None) -> Lexicon:
+    """Parse and merge the JSON dict (CUI -> [surfaces]) and optional overlay; a missing overlay is skipped."""
+    base = load_json(dict_path) if dict_path else {}
+    overlay = load_json(overlay_path) if overlay_path and os.path.exists(overlay_path) else {}
+    return build_lexicon(base, overlay)
+
+# ------------------------------ snapshot ------------------------------
+def compile_dict(dict_path: str, overlay_path: Optional[str] = None, out_path: Optional[str] = None) -> str:
+    """Merge dict + overlay once and write the binary snapshot. Returns the snapshot path."""
+    from graphcorag.matcher import Matcher
+    out_path = out_path or snapshot_path_for(dict_path)
+    lex = merge_dicts(dict_path, overlay_path)
+    for name, table in (("CUI", lex.cuis), ("surface", lex.forms)):
+        bad = next((s for s in table if "\n" in s), None)
+        if bad is not None:
+            raise ValueError(f"{name} with an embedded newline cannot be compiled: {bad!r}")
+    edge_off, edge_chars, edge_tgt, fail, out_off, out_ids = Matcher(lex.keys, backend="python").export()
+
+    blobs = ["\n".join(t).encode("utf-8") for t in (lex.cuis, lex.forms, lex.keys)]
+    ints = [lex.cui_form_off, lex.cui_form_ids, lex.key_cui_off, lex.key_cui_ids,
+            edge_off, edge_tgt, fail, out_off, out_ids]
+    chars = edge_chars.encode("utf-32-le")
+    if sys.byteorder != "little":
+        for a in ints:
+            a.byteswap()
+    dict_st = _stat(dict_path)
+    ov_st = _stat(overlay_path)
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0,
+                             len(lex.cuis), len(lex.forms), len(lex.keys), len(lex.cui_form_ids),
+                             len(lex.key_cui_ids), len(fail), len(edge_tgt), len(out_ids),
+                             len(blobs[0]), len(blobs[1]), len(blobs[2]),
+                             dict_st[0], dict_st[1], ov_st[0], ov_st[1]))
+        for b in blobs:
+            f.write(b); f.write(b"\0" * _pad(len(b)))
+        for a in ints:
+            a.tofile(f)
+        f.write(chars)
+    os.replace(tmp, out_path)
+    print(f"[dict] Compiled snapshot: {len(lex.cuis)} CUIs, {len(lex.forms)} surfaces, "
+          f"{len(lex.keys)} normalized keys, {len(fail)} automaton states -> {out_path}")
+    return out_path
+
+def open_dict_snapshot(path: str) -> Lexicon:
+    """Memory-map a compiled snapshot. Raises ValueError for empty, truncated or foreign files."""
+    fh = open(path, "rb")
+    try:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file
+        fh.close()
+        raise ValueError(f"Empty dictionary snapshot: {path}")
+    if len(mm) < _HEADER.size:
+        mm.close(); fh.close()
+        raise ValueError(f"Truncated dictionary snapshot: {path}")
+    (magic, version, _, n_cuis, n_forms, n_keys, n_cui_forms, n_key_cuis, n_states, n_edges, n_out,
+     cui_len, form_len, key_len, dict_size, dict_mtime, ov_size, ov_mtime) = _HEADER.unpack_from(mm, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        mm.close(); fh.close()
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a dictionary snapshot: {path}")
+        raise ValueError(f"Unsupported dictionary snapshot version {version} (expected {SNAPSHOT_VERSION}): {path}")
+
+    off = _HEADER.size
+    tables = []
+    for n, length in ((n_cuis, cui_len), (n_forms, form_len), (n_keys, key_len)):
+        tables.append(mm[off: off + length].decode("utf-8").split("\n") if n else [])
+        off += length + _pad(length)
+
+    view = memoryview(mm)
+    arrays = []
+    for n in (n_cuis + 1, n_cui_forms, n_keys + 1, n_key_cuis,
+              n_states + 1, n_edges, n_states, n_states + 1, n_out):
+        arrays.append(view[off: off + 4 * n].cast("i"))
+        off += 4 * n
+    edge_chars = view[off: off + 4 * n_edges]
+    view.release()
+    cui_form_off, cui_form_ids, key_cui_off, key_cui_ids, edge_off, edge_tgt, fail, out_off, out_ids = arrays
+    return Lexicon(tables[0], tables[1], cui_form_off, cui_form_ids, tables[2], key_cui_off, key_cui_ids,
+                   automaton=(edge_off, edge_chars, edge_tgt, fail, out_off, out_ids), path=path,
+                   sources=(dict_size, dict_mtime, ov_size, ov_mtime), handles=(mm, fh))
+
+def load_lexicon(dict_path: Optional[str], overlay_path: Optional[str] = None) -> Lexicon:
+    """
+    The merged dictionary for dict_path (+ overlay_path): from the compiled snapshot
+    (dict_path itself or its .dictsnap sibling) when present and fresh, else by
+    parsing and merging the JSON files.
+    """
+    if dict_path:
+        snap_path = snapshot_path_for(dict_path)
+        if os.path.exists(snap_path):
+            try:
+                lex = open_dict_snapshot(snap_path)
+            except ValueError as e:
+                print(f"[WARN] Ignoring dictionary snapshot: {e}", file=sys.stderr)
+            else:
+                if snap_path == dict_path or lex.is_fresh_for(dict_path, overlay_path):
+                    return lex
+                print(f"[WARN] Dictionary snapshot is stale, re-merging JSON: {dict_path}", file=sys.stderr)
+                lex.close()
+    return merge_dicts(dict_path, overlay_path)
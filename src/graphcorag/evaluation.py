@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.evaluation
+Columnar evaluation core. Runs, rankings, explain CSVs and analyzer labels are
+loaded once into column arrays ({name: np.ndarray}, one row per query) and
+every metric is an array expression over them instead of a per-row dict loop.
+
+- rank_matrix(): ranked doc ids -> int32 [Q, K] matrix (-1 padded) + doc vocabulary
+- recall_at_k(): relevant-doc hits via one np.isin over (query, doc) keys, cumsum over ranks
+- coverage_at_k(): required-entity hits per (query, rank), prefix unions with logical_or.accumulate
+- kg_support() / analyzer_accuracy(): boolean column means
+- load_run() / compare_runs(): hybrid.outputs.jsonl of many runs -> one row per run
+- write_csv(); write_parquet() when pyarrow is installed
+
+CLI (compare runs):
+  PYTHONPATH=src python -m graphcorag.evaluation --runs out/run_a out/run_b --out_csv out/compare.csv \
+      [--out_parquet out/compare.parquet] [--per_query_parquet out/compare.per_query.parquet]
+"""
+from __future__ import annotations
+import csv, os, sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from graphcorag.fileio import iter_jsonl, open_text
+
+Columns = Dict[str, np.ndarray]
+
+# ------------------------------ I/O ------------------------------
+def to_columns(rows: Iterable[Dict[str, Any]], fields: Dict[str, Any]) -> Columns:
+    """rows -> {field: array}; fields maps name -> dtype (str for text, missing values become "")."""
+    rows = list(rows)
+    cols: Columns = {}
+    for name, dtype in fields.items():
+        vals = [r.get(name) for r in rows]
+        if dtype is str:
+            cols[name] = np.array(["" if v is None else str(v) for v in vals], dtype=str)
+        elif dtype is bool:
+            cols[name] = np.array([_as_bool(v) for v in vals], dtype=bool)
+        else:
+            cols[name] = np.array([0 if v in (None, "") else v for v in vals], dtype=dtype)
+    return cols
+
+def _as_bool(v: Any) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in ("true", "1", "yes")
+    return bool(v)
+
+def read_csv_columns(path: str, bool_fields: Sequence[str] = (), float_fields: Sequence[str] = ()) -> Columns:
+    """CSV -> columns; "True"/"False" fields in bool_fields become bool arrays, the rest stay text."""
+    with open_text(path, "r", newline="") as f:
+        rows = list(csv.DictReader(f))
+    names = list(rows[0].keys()) if rows else list(bool_fields) + list(float_fields)
+    fields = {n: (bool if n in bool_fields else float if n in float_fields else str) for n in names}
+    return to_columns(rows, fields)
+
+def n_rows(cols: Columns) -> int:
+    return len(next(iter(cols.values()))) if cols else 0
+
+def write_csv(cols: Columns, path: str) -> None:
+    d = os.path.dirname(os.path.abspath(path))
+    os.makedirs(d, exist_ok=True)
+    names = list(cols)
+    with open_text(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(names)
+        w.writerows(zip(*(cols[n].tolist() for n in names)))
+
+def write_parquet(cols: Columns, path: str) -> None:
+    """Columns -> Parquet (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    d = os.path.dirname(os.path.abspath(path))
+    os.makedirs(d, exist_ok=True)
+    pq.write_table(pa.table({n: a.tolist() if a.dtype.kind == "U" else a for n, a in cols.items()}), path)
+
+def maybe_write_parquet(cols: Columns, path: Optional[str]) -> bool:
+    """write_parquet when a path is given; warns and returns False without pyarrow."""
+    if not path:
+        return False
+    try:
+        write_parquet(cols, path)
+    except ImportError:
+        print(f"[eval] pyarrow not installed; skipped {path}", file=sys.stderr)
+        return False
+    return True
+
+# ------------------------------ rankings ------------------------------
+def rank_matrix(rankings: Sequence[Sequence[Any]], max_k: int,
+                vocab: Optional[Dict[Any, int]] = None) -> Tuple[np.ndarray, Dict[Any, int]]:
+    """Ranked doc ids per query -> int32 [Q, max_k] of vocabulary ids (-1 = no doc at that rank)."""
+    vocab = {} if vocab is None else vocab
+    mat = np.full((len(rankings), max(0, max_k)), -1, dtype=np.int32)
+    for q, docs in enumerate(rankings):
+        ids = [vocab.setdefault(d, len(vocab)) for d in list(docs)[:max_k]]
+        mat[q, :len(ids)] = ids
+    return mat, vocab
+
+def _pair_keys(a: np.ndarray, b: np.ndarray, nb: int) -> np.ndarray:
+    return a.astype(np.int64) * np.int64(nb) + b.astype(np.int64)
+
+def recall_at_k(mat: np.ndarray, relevant: Sequence[Iterable[Any]], vocab: Dict[Any, int],
+                ks: Sequence[int]) -> Dict[int, np.ndarray]:
+    """k -> per-query recall (NaN where a query has no relevant docs)."""
+    nq, K = mat.shape
+    nv = max(1, len(vocab))
+    qi, di = [], []
+    n_rel = np.zeros(nq, dtype=np.float64)
+    for q, rel in enumerate(relevant):
+        ids = {vocab[d] for d in rel if d in vocab}
+        n_rel[q] = len(set(rel))
+        qi.extend([q] * len(ids))
+        di.extend(ids)
+    rel_keys = _pair_keys(np.array(qi, dtype=np.int64), np.array(di, dtype=np.int64), nv)
+    keys = _pair_keys(np.arange(nq)[:, None], mat, nv)
+    hit = np.isin(keys, rel_keys) & (mat >= 0)
+    cum = np.cumsum(hit, axis=1)
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for k in ks:
+            got = cum[:, min(k, K) - 1] if K and k > 0 else np.zeros(nq)
+            out[k] = np.where(n_rel > 0, got / n_rel, np.nan)
+    return out
+
+def coverage_at_k(mat: np.ndarray, doc_entities: Sequence[Iterable[int]], required: Sequence[Sequence[int]],
+                  ks: Sequence[int], chunk: int = 2048) -> np.ndarray:
+    """
+    Which required entities are covered by the top-k docs of each query.
+
+    Args:
+      mat: [Q, K] doc vocabulary ids from rank_matrix()
+      doc_entities: vocabulary id -> entity ids the doc contains
+      required: per query entity ids (position j = column j of the result)
+    Returns:
+      bool [Q, len(ks), J] (J = longest required list; padding columns are False)
+    """
+    nq, K = mat.shape
+    J = max((len(r) for r in required), default=0)
+    out = np.zeros((nq, len(ks), J), dtype=bool)
+    if not nq or not J or not K:
+        return out
+    # sorted (doc, entity) keys: "doc d contains entity e"
+    ne = 1 + max([max(r) for r in required if len(r)] + [max(s) for s in doc_entities if s] + [0])
+    pd, pe = [], []
+    for d, ents in enumerate(doc_entities):
+        pd.extend([d] * len(ents))
+        pe.extend(ents)
+    pairs = np.unique(_pair_keys(np.array(pd, dtype=np.int64), np.array(pe, dtype=np.int64), ne))
+    req = np.full((nq, J), -1, dtype=np.int64)
+    for q, r in enumerate(required):
+        req[q, :len(r)] = r
+    cols = [min(k, K) - 1 for k in ks]
+    for s in range(0, nq, chunk):
+        m = mat[s:s + chunk]
+        rq = req[s:s + chunk]
+        keys = _pair_keys(m[:, :, None], rq[:, None, :], ne)          # [q, K, J]
+        pos = np.searchsorted(pairs, keys)
+        found = (pairs[np.minimum(pos, len(pairs) - 1)] == keys) if len(pairs) else np.zeros(keys.shape, bool)
+        found &= (m[:, :, None] >= 0) & (rq[:, None, :] >= 0)
+        acc = np.logical_or.accumulate(found, axis=1)                    # prefix unions over ranks
+        for i, c in enumerate(cols):
+            if c >= 0:
+                out[s:s + chunk, i] = acc[:, c]
+    return out
+
+def coverage_status(found: np.ndarray, n_required: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """found [Q, nk, J] -> (found_count [Q, nk], status [Q, nk] in complete / partial / zero)."""
+    cnt = found.sum(axis=2)
+    status = np.where(cnt == n_required[:, None], "complete", np.where(cnt == 0, "zero", "partial"))
+    return cnt, status
+
+# ------------------------------ KG support / analyzer ------------------------------
+EXPLAIN_BOOL_FIELDS = ("head_surface_link_ok", "tail1_surface_link_ok", "tail2_surface_link_ok",
+                       "edge1_present", "edge2_present", "both_edges_present", "chain_path_present")
+
+def kg_support(cols: Columns) -> Dict[str, Any]:
+    """Support counts over explain_kg_support.py columns."""
+    total = n_rows(cols)
+    e1, e2 = cols["edge1_present"], cols["edge2_present"]
+    both = cols["both_edges_present"]
+    link_ok = cols["head_surface_link_ok"] & cols["tail1_surface_link_ok"] & cols["tail2_surface_link_ok"]
+    out = {"total": total, "both": int(both.sum()), "one": int(((e1 | e2) & ~both).sum()),
+           "edge1": int(e1.sum()), "edge2": int(e2.sum()), "link_ok": int(link_ok.sum())}
+    out["none"] = total - out["both"] - out["one"]
+    if "chain_path_present" in cols:
+        out["chained"] = int(cols["chain_path_present"].sum())
+    return out
+
+def _first_rel(r: Dict[str, Any]) -> Any:
+    """Predicted relation: relations[0] (None when empty), as tests/check_analyzer.py scores it."""
+    rels = r.get("relations") or []
+    return rels[0] if rels else None
+
+def analyzer_accuracy(pred: Sequence[Dict[str, Any]], gold: Sequence[Dict[str, Any]]) -> Columns:
+    """
+    Row-aligned analyzer predictions vs gold -> per-query columns (intent_ok, relation_ok, has_head).
+    Same comparisons as check_analyzer.py: intent == intent, relations[0] == gold "relation".
+    """
+    n = len(gold)
+    pred = list(pred)[:n] + [{}] * max(0, n - len(pred))
+    p_int, g_int = [r.get("intent") for r in pred], [r.get("intent") for r in gold]
+    p_rel, g_rel = [_first_rel(r) for r in pred], [r.get("relation") for r in gold]
+    text = lambda vals: np.array([str(v or "") for v in vals])
+    return {"idx": np.arange(1, n + 1),
+            "gold_intent": text(g_int), "pred_intent": text(p_int),
+            "intent_ok": np.array([a == b for a, b in zip(p_int, g_int)], dtype=bool),
+            "gold_relation": text(g_rel), "pred_relation": text(p_rel),
+            "relation_ok": np.array([a == b for a, b in zip(p_rel, g_rel)], dtype=bool),
+            "pred_head_cui": np.array([str(r.get("head_cui") or "") for r in pred]),
+            "has_head": np.array([bool(r.get("head_cui")) for r in pred], dtype=bool)}
+
+# ------------------------------ runs ------------------------------
+RUN_FIELDS = {"qid": str, "coverage": np.float64, "text_entity_recall@k": np.float64, "hops": np.int32}
+
+def load_run(path: str) -> Columns:
+    """hybrid.outputs.jsonl (or its run directory) -> per-query columns."""
+    if os.path.isdir(path):
+        path = os.path.join(path, "hybrid.outputs.jsonl")
+    rows = list(iter_jsonl(path, errors="ignore"))
+    cols = to_columns(rows, RUN_FIELDS)
+    cols["supported"] = np.array([r.get("decision") == "supported" for r in rows], dtype=bool)
+    cols["n_verdicts"] = np.array([len(r.get("kg_verdicts") or ()) for r in rows], dtype=np.int32)
+    cols["n_paths"] = np.array([len(r.get("kg_paths") or ()) for r in rows], dtype=np.int32)
+    cols["has_head"] = np.array([bool(r.get("head_cui")) for r in rows], dtype=bool)
+    return cols
+
+def _mean(a: np.ndarray) -> float:
+    return float(a.mean()) if len(a) else 0.0
+
+def run_summary(cols: Columns) -> Dict[str, float]:
+    return {"queries": n_rows(cols),
+            "supported_rate": _mean(cols["supported"]),
+            "coverage_mean": _mean(cols["coverage"]),
+            "ter_mean": _mean(cols["text_entity_recall@k"]),
+            "hops_mean": _mean(cols["hops"]),
+            "multi_hop_rate": _mean(cols["hops"] > 1),
+            "path_rate": _mean(cols["n_paths"] > 0),
+            "head_rate": _mean(cols["has_head"])}
+
+def compare_runs(paths: Sequence[str]) -> Tuple[Columns, Columns]:
+    """(one row per run, concatenated per-query columns with a run column)."""
+    summaries, per_query = [], []
+    for p in paths:
+        cols = load_run(p)
+        summaries.append(dict(run=p, **run_summary(cols)))
+        cols["run"] = np.full(n_rows(cols), p)
+        per_query.append(cols)
+    names = list(summaries[0]) if summaries else ["run"]
+    table = {n: np.array([s[n] for s in summaries]) for n in names}
+    pq = {n: np.concatenate([c[n] for c in per_query]) for n in per_query[0]} if per_query else {}
+    return table, pq
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Compare hybrid runs (columnar)")
+    ap.add_argument("--runs", nargs="+", required=True, help="run dirs or hybrid.outputs.jsonl files")
+    ap.add_argument("--out_csv", default=None)
+    ap.add_argument("--out_parquet", default=None)
+    ap.add_argument("--per_query_parquet", default=None)
+    args = ap.parse_args()
+
+    table, per_query = compare_runs(args.runs)
+    if args.out_csv:
+        write_csv(table, args.out_csv)
+    maybe_write_parquet(table, args.out_parquet)
+    maybe_write_parquet(per_query, args.per_query_parquet)
+    names = [n for n in table if n != "run"]
+    print("run\t" + "\t".join(names))
+    for i, run in enumerate(table["run"].tolist()):
+        print(run + "\t" + "\t".join(f"{float(table[n][i]):.4g}" for n in names))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.fileio
+Streaming JSONL / CSV I/O shared by the library and the scripts.
+
+- open_text(): transparent gzip (.gz) and zstd (.zst, needs zstandard) by extension;
+  reads tolerate a UTF-8 BOM
+- iter_jsonl(): generator, one record per non-blank line, so memory stays flat
+- JsonlWriter / write_jsonl(): buffered writes, one writelines() per batch
+- loads(): orjson or msgspec when installed, else json (NaN / big ints fall back to json)
+- dumps(): json.dumps(ensure_ascii=False) formatting by default; compact=True uses orjson
+- iter_csv_rows() / iter_csv_dicts(), load_json()
+
+API:
+  for row in iter_jsonl("queries.jsonl.gz"):
+      ...
+  with JsonlWriter("out.jsonl") as w:
+      w.write(row)
+"""
+from __future__ import annotations
+import csv, io, json, sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+try:
+    import msgspec as _msgspec
+except ImportError:
+    _msgspec = None
+
+_FAST_ERRORS: tuple = (ValueError,)
+if _orjson is not None:
+    _fast_loads: Optional[Callable[[Any], Any]] = _orjson.loads
+    BACKEND = "orjson"
+elif _msgspec is not None:
+    _fast_loads = _msgspec.json.decode
+    _FAST_ERRORS = (ValueError, _msgspec.DecodeError)
+    BACKEND = "msgspec"
+else:
+    _fast_loads = None
+    BACKEND = "json"
+
+def loads(s: Any) -> Any:
+    if _fast_loads is not None:
+        try:
+            return _fast_loads(s)
+        except _FAST_ERRORS:
+            pass  # NaN / Infinity / >64-bit ints: json accepts them, the fast parsers do not
+    return json.loads(s)
+
+def dumps(obj: Any, compact: bool = False) -> str:
+    """One JSON line (no newline). Default output matches json.dumps(obj, ensure_ascii=False)."""
+    if compact:
+        if _orjson is not None:
+            try:
+                return _orjson.dumps(obj, option=_orjson.OPT_NON_STR_KEYS | _orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+            except TypeError:
+                pass
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, ensure_ascii=False)
+
+# ------------------------------ files ------------------------------
+def open_text(path: str, mode: str = "r", encoding: Optional[str] = None, errors: Optional[str] = None,
+              newline: Optional[str] = None):
+    """
+    Text handle for path; .gz / .zst are (de)compressed on the fly. Reading defaults
+    to utf-8-sig (a leading BOM is dropped), writing to utf-8.
+    """
+    if encoding is None:
+        encoding = "utf-8-sig" if "r" in mode else "utf-8"
+    mode = mode.replace("t", "")
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, mode + "t", encoding=encoding, errors=errors, newline=newline)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(f"reading/writing {path} needs the zstandard package") from e
+        return zstandard.open(path, mode + "t", encoding=encoding, errors=errors, newline=newline)
+    return io.open(path, mode, encoding=encoding, errors=errors, newline=newline, buffering=1 << 20)
+
+def iter_jsonl(path: str, on_error: str = "raise", errors: Optional[str] = None,
+               numbered: bool = False) -> Iterator[Any]:
+    """
+    Records of a JSONL file, lazily.
+
+    Args:
+      on_error: "raise" (ValueError naming path:line), "warn" (stderr, skip) or "skip"
+      errors: codec error handler for undecodable bytes (e.g. "ignore")
+      numbered: yield (line_no, record) instead of record
+    """
+    with open_text(path, "r", errors=errors) as f:
+        for i, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = loads(line)
+            except ValueError as e:
+                if on_error == "raise":
+                    raise ValueError(f"bad JSON at {path}:{i}: {e}") from e
+                if on_error == "warn":
+                    print(f"[WARN] bad JSONL line {path}:{i}: {e}", file=sys.stderr)
+                continue
+            yield (i, obj) if numbered else obj
+
+def read_jsonl(path: str, **kwargs: Any) -> List[Any]:
+    """iter_jsonl() into a list (small files only)."""
+    return list(iter_jsonl(path, **kwargs))
+
+class JsonlWriter:
+    """Buffered JSONL writer: rows are serialized as they come and flushed every `batch` rows."""
+
+    def __init__(self, path: str, batch: int = 1000, compact: bool = False, mode: str = "w"):
+        self.path = path
+        self.batch = max(1, int(batch))
+        self.compact = compact
+        self.count = 0
+        self._buf: List[str] = []
+        self._f = open_text(path, mode)
+
+    def write(self, obj: Any) -> None:
+        self._buf.append(dumps(obj, self.compact) + "\n")
+        self.count += 1
+        if len(self._buf) >= self.batch:
+            self.flush()
+
+    def write_many(self, objs: Iterable[Any]) -> int:
+        n = self.count
+        for o in objs:
+            self.write(o)
+        return self.count - n
+
+    def flush(self) -> None:
+        if self._buf:
+            self._f.writelines(self._buf)
+            self._buf.clear()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self.flush()
+            self._f.close()
+            self._f = None
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+def write_jsonl(path: str, rows: Iterable[Any], compact: bool = False) -> int:
+    with JsonlWriter(path, compact=compact) as w:
+        return w.write_many(rows)
+
+def load_json(path: str) -> Any:
+    """Whole-document JSON (dictionaries, overlays, schemas); BOM-tolerant, .gz / .zst aware."""
+    with open_text(path, "r") as f:
+        return loads(f.read())
+
+def iter_csv_rows(path: str, **fmt: Any) -> Iterator[List[str]]:
+    with open_text(path, "r", newline="") as f:
+        yield from csv.reader(f, **fmt)
+
+def iter_csv_dicts(path: str, **fmt: Any) -> Iterator[Dict[str, str]]:
+    with open_text(path, "r", newline="") as f:
+        yield from csv.DictReader(f, **fmt)
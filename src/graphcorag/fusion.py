@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.fusion
+Score fusion for any number of retriever runs (BM25, dense, ...).
+
+Methods (score of a doc = sum over the runs that retrieved it):
+- rrf      : w / (rrf_k + rank)                       (rank starts at 1; scale-free)
+- minmax   : w * (s - min) / (max - min)              (per-run min-max normalization)
+- zscore   : w * (s - mean) / std                     (per-run z-score normalization)
+- combsum  : w * s                                    (raw scores; comparable scales only)
+- combmnz  : minmax sum * number of runs retrieving the doc
+- max      : legacy run_hybrid merge, max raw score across runs
+
+Only the retrieved candidates are touched; the top-k is taken with a heap
+(heapq.nlargest), ties keep first-seen order.
+
+API: fuse({"bm25": hits, "dense": hits}, method="rrf", weights=None, topk=80)
+"""
+from __future__ import annotations
+import heapq, math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+Hit = Tuple[Any, float]
+Runs = Union[Mapping[str, Any], Sequence[Any]]
+
+METHODS = ("rrf", "minmax", "zscore", "combsum", "combmnz", "max")
+
+def hit_pairs(hits: Any) -> List[Hit]:
+    """
+    Normalize retriever output to [(doc_id, score), ...] in rank order.
+    Accepts (id, score) / (score, id) tuples and {"id"|"doc_id"|"document_id", "score"} dicts.
+    """
+    out: List[Hit] = []
+    for h in hits or []:
+        if isinstance(h, dict):
+            did = h.get("id") or h.get("doc_id") or h.get("document_id")
+            if did is not None:
+                out.append((did, float(h.get("score", 0.0))))
+        elif isinstance(h, (list, tuple)) and len(h) >= 2:
+            a, b = h[0], h[1]
+            # tolerate (score, id) or (id, score)
+            if isinstance(a, (int, float)) and not isinstance(b, (int, float)):
+                out.append((b, float(a)))
+            elif a is not None:
+                out.append((a, float(b)))
+    return out
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """'bm25=0.3,dense=0.7' -> {"bm25": 0.3, "dense": 0.7}"""
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, val = part.partition("=")
+        if not sep:
+            raise ValueError(f"bad fusion weight {part!r} (expected name=value)")
+        out[name.strip()] = float(val)
+    return out
+
+def _normalizer(scores: List[float], method: str):
+    if method == "minmax":
+        lo, hi = min(scores), max(scores)
+        span = hi - lo
+        return (lambda s: (s - lo) / span) if span > 0 else (lambda s: 1.0)
+    if method == "zscore":
+        n = len(scores)
+        mean = sum(scores) / n
+        std = math.sqrt(sum((s - mean) ** 2 for s in scores) / n)
+        return (lambda s: (s - mean) / std) if std > 0 else (lambda s: 0.0)
+    return lambda s: s
+
+def fuse(runs: Runs, method: str = "rrf", weights: Optional[Mapping[str, float]] = None,
+         topk: int = 80, rrf_k: float = 60.0) -> List[Hit]:
+    """
+    Fuse ranked runs into one [(doc_id, score), ...] list of at most topk items.
+    runs: {name: hits} (weights are looked up by name, default 1.0) or a list of hits.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown fusion method {method!r} (choose from {', '.join(METHODS)})")
+    named: Iterable[Tuple[str, Any]] = runs.items() if isinstance(runs, Mapping) else \
+        ((str(i), r) for i, r in enumerate(runs))
+    weights = weights or {}
+    acc: Dict[Any, float] = {}
+    hits_per_doc: Dict[Any, int] = {}
+
+    for name, hits in named:
+        pairs = hit_pairs(hits)
+        if not pairs:
+            continue
+        w = float(weights.get(name, 1.0))
+        if method == "max":
+            for did, s in pairs:
+                acc[did] = max(acc.get(did, 0.0), s)
+            continue
+        if method == "rrf":
+            seen = set()
+            for rank, (did, _) in enumerate(pairs, start=1):
+                if did in seen:
+                    continue  # a doc listed twice counts at its best rank
+                seen.add(did)
+                acc[did] = acc.get(did, 0.0) + w / (rrf_k + rank)
+            continue
+        norm = _normalizer([s for _, s in pairs], "minmax" if method == "combmnz" else method)
+        best: Dict[Any, float] = {}
+        for did, s in pairs:
+            if did not in best or s > best[did]:
+                best[did] = s
+        for did, s in best.items():
+            acc[did] = acc.get(did, 0.0) + w * norm(s)
+            hits_per_doc[did] = hits_per_doc.get(did, 0) + 1
+
+    if method == "combmnz":
+        for did in acc:
+            acc[did] *= hits_per_doc[did]
+    if topk is None or topk <= 0:
+        return sorted(acc.items(), key=lambda x: x[1], reverse=True)
+    return heapq.nlargest(int(topk), acc.items(), key=lambda x: x[1])
+
+if __name__ == "__main__":
+    import argparse, json
+    ap = argparse.ArgumentParser(description="Fuse retriever runs given as JSON files of [[doc_id, score], ...]")
+    ap.add_argument("runs", nargs="+", help="name=path.json")
+    ap.add_argument("--method", default="rrf", choices=METHODS)
+    ap.add_argument("--weights", default=None, help="name=w,name=w")
+    ap.add_argument("--rrf_k", type=float, default=60.0)
+    ap.add_argument("--topk", type=int, default=20)
+    args = ap.parse_args()
+
+    loaded: Dict[str, Any] = {}
+    for spec in args.runs:
+        name, _, path = spec.partition("=")
+        with open(path or name, "r", encoding="utf-8") as f:
+            loaded[name if path else str(len(loaded))] = json.load(f)
+    for did, s in fuse(loaded, args.method, parse_weights(args.weights), args.topk, args.rrf_k):
+        print(f"{s:.6f}\t{did}")
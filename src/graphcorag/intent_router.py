@@ -1,24 +1,16 @@
-﻿import re
+﻿from graphcorag.cues import PRED_CUES, default_engine
 
-YESNO_RE = re.compile(r"^(is|does|do|are|can|could|would|whether)\b", re.I)
-PRED_CUES = {
-    "ADVERSE_EFFECT": [r"adverse effect", r"side effect", r"toxicit", r"hepatotox", r"nephrotox", r"pneumonitis"],
-    "INTERACTS_WITH": [r"interact", r"contraindicat", r"co[- ]?admin", r"drug[- ]?drug", r"increase[s]? levels", r"reduce[s]? levels"],
-    "INDICATION":    [r"indicat", r"treat[s]?|treatment", r"for \b.*\b(cancer|disease|condition|syndrome)"]
-}
+def detect_predicate(text, signals=None):
+    sig = default_engine().scan(text) if signals is None else signals
+    found = [rel for rel in PRED_CUES if f"pred:{rel}" in sig]
+    # predicates that only have cues from the schema's "cues" section
+    return found + sorted(lab[5:] for lab in sig if lab.startswith("pred:") and lab[5:] not in PRED_CUES)
 
-def detect_predicate(text):
-    text_l = text.lower()
-    found = []
-    for rel, pats in PRED_CUES.items():
-        if any(re.search(p, text_l) for p in pats):
-            found.append(rel)
-    return found
-
-def route_intent(q, extracted_surfaces):
-    text = q.strip()
-    yn = bool(YESNO_RE.search(text))
-    cues = detect_predicate(text)
+def route_intent(q, extracted_surfaces, signals=None):
+    # signals: cue labels of q from graphcorag.cues (one scan covers yes/no and predicate cues)
+    sig = default_engine().scan(q) if signals is None else signals
+    yn = "yesno" in sig
+    cues = detect_predicate(q, sig)
     ent_count = len(set([s.lower() for s in (extracted_surfaces or [])]))
 
     if yn and (cues) and ent_count >= 1:
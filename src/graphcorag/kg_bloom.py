@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_bloom
+Per-relation Bloom filters over KG edges: a cheap, compact "definitely not an edge"
+test that runs before the exact check, so most non-edges in a candidate batch never
+reach it.
+
+- one filter per relation, sized for its edge count and a target false-positive rate
+  (default 1%: ~9.6 bits and 7 probes per edge, whatever the node names)
+- keys come from the normalized head / tail strings (not KG-internal ids): each
+  distinct node is hashed once with blake2b and the ordered pair is mixed in numpy,
+  so a filter is valid for any loader of the same KG
+- probes are vectorized with numpy over a batch; no false negatives
+
+Compile it next to the KG snapshot (same freshness rule: size + mtime of the CSV):
+  python src/graphcorag/kg_snapshot.py --kg data/kg_edges.merged.csv --bloom
+which also writes data/kg_edges.merged.csv.kgbloom; KG(..., bloom=True) uses it.
+The filters sit in front of the exact structures, they do not replace them, so
+they are opt-in: worth it only when most probes of a batch are non-edges.
+
+API:
+  bloom = EdgeBloom.build(kg.edge_set)          # or open_bloom(kg_path)
+  mask = bloom.might_contain_many(triples)      # numpy bool; False = not in the KG
+"""
+from __future__ import annotations
+import math, mmap, os, struct, sys
+from array import array
+from hashlib import blake2b
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+BLOOM_EXT = ".kgbloom"
+BLOOM_MAGIC = b"GCKGBLOM"
+BLOOM_VERSION = 1
+DEFAULT_FPR = 0.01
+
+# magic, version, n_filters, fpr, src_size, src_mtime_ns
+_HEADER = struct.Struct("<8sIIdQq")
+# name_len, n_items, n_bits, n_hashes
+_FILTER = struct.Struct("<IQQI")
+
+def bloom_path_for(kg_path: str) -> str:
+    """Sibling filter file of a KG CSV (or of its .kgsnap)."""
+    from graphcorag.kg_snapshot import SNAPSHOT_EXT
+    base = kg_path[: -len(SNAPSHOT_EXT)] if kg_path.endswith(SNAPSHOT_EXT) else kg_path
+    return kg_path if kg_path.endswith(BLOOM_EXT) else base + BLOOM_EXT
+
+def _pad(n: int, align: int = 8) -> int:
+    return (-n) % align
+
+def _node_hash(node: str) -> int:
+    return int.from_bytes(blake2b(node.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (64-bit avalanche)."""
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _edge_hashes(heads: np.ndarray, tails: np.ndarray) -> np.ndarray:
+    """Ordered (head, tail) key from the two node hashes: each distinct node is hashed once, edges in numpy."""
+    with np.errstate(over="ignore"):
+        return _mix(heads * np.uint64(0x9E3779B97F4A7C15) + tails)
+
+def _hash_columns(heads: Sequence[str], tails: Sequence[str],
+                  key: Optional[Callable[[str], str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """uint64 node hash per value of both columns, normalizing (key) and hashing each distinct name once."""
+    names = set(heads).union(tails)
+    memo = {v: _node_hash(key(v)) for v in names} if key is not None else {v: _node_hash(v) for v in names}
+    get = memo.__getitem__
+    return (np.fromiter(map(get, heads), dtype=np.uint64, count=len(heads)),
+            np.fromiter(map(get, tails), dtype=np.uint64, count=len(tails)))
+
+def _sizing(n_items: int, fpr: float) -> Tuple[int, int]:
+    """(bits, hashes) for n_items at the target false-positive rate; bits rounded up to whole words."""
+    n = max(1, n_items)
+    bits = int(math.ceil(-n * math.log(fpr) / (math.log(2) ** 2)))
+    bits += _pad(bits, 64)
+    return bits, max(1, int(round(bits / n * math.log(2))))
+
+class BloomFilter:
+    """Bit array over 64-bit key hashes; positions h1 + i*h2 (mod n_bits), i < n_hashes."""
+
+    def __init__(self, bits: np.ndarray, n_bits: int, n_hashes: int, n_items: int = 0):
+        self.bits = bits            # uint8, n_bits / 8 bytes (may be a view into an mmap)
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.n_items = n_items
+
+    @classmethod
+    def from_hashes(cls, hashes: np.ndarray, fpr: float = DEFAULT_FPR) -> "BloomFilter":
+        n_bits, k = _sizing(len(hashes), fpr)
+        bits = np.zeros(n_bits // 8, dtype=np.uint8)
+        if len(hashes):
+            pos = cls._positions(np.asarray(hashes, dtype=np.uint64), n_bits, k).ravel()
+            np.bitwise_or.at(bits, pos >> np.uint64(3), (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+        return cls(bits, n_bits, k, len(hashes))
+
+    @staticmethod
+    def _positions(h1: np.ndarray, n_bits: int, k: int) -> np.ndarray:
+        h2 = _mix(h1) | np.uint64(1)
+        i = np.arange(k, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(n_bits)
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        """bool per hash: False = definitely absent."""
+        h = np.asarray(hashes, dtype=np.uint64)
+        if h.size == 0:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(h, self.n_bits, self.n_hashes)
+        hit = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & np.uint8(1)
+        return hit.all(axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.n_bits // 8
+
+class EdgeBloom:
+    """One BloomFilter per relation over (head, tail) of its edges (normalized strings)."""
+
+    def __init__(self, filters: Dict[str, BloomFilter], fpr: float = DEFAULT_FPR,
+                 src_size: int = 0, src_mtime_ns: int = 0):
+        self.filters = filters
+        self.fpr = fpr
+        self.src_size = src_size
+        self.src_mtime_ns = src_mtime_ns
+        self._mm = None
+        self._fh = None
+
+    @classmethod
+    def build(cls, edges: Iterable[Tuple[str, str, str]], fpr: float = DEFAULT_FPR) -> "EdgeBloom":
+        """edges: normalized (head, relation, tail), e.g. KG.edge_set; repeats only cost a little extra space."""
+        memo: Dict[str, int] = {}
+        per_rel: Dict[str, Tuple[array, array]] = {}
+        for h, r, t in edges:
+            cols = per_rel.get(r)
+            if cols is None:
+                cols = per_rel[r] = (array("Q"), array("Q"))
+            hh = memo.get(h)
+            if hh is None:
+                hh = memo[h] = _node_hash(h)
+            ht = memo.get(t)
+            if ht is None:
+                ht = memo[t] = _node_hash(t)
+            cols[0].append(hh); cols[1].append(ht)
+        return cls({r: BloomFilter.from_hashes(_edge_hashes(np.frombuffer(hs, dtype=np.uint64),
+                                                            np.frombuffer(ts, dtype=np.uint64)), fpr)
+                    for r, (hs, ts) in sorted(per_rel.items())}, fpr)
+
+    def might_contain(self, head: str, relation: str, tail: str) -> bool:
+        return bool(self.might_contain_many([(head, relation, tail)])[0])
+
+    def might_contain_many(self, triples: Sequence[Tuple[str, str, str]],
+                           node_key: Optional[Callable[[str], str]] = None,
+                           rel_key: Optional[Callable[[str], str]] = None) -> np.ndarray:
+        """
+        Vectorized might_contain; one probe batch per relation. Triples are taken as
+        normalized unless node_key / rel_key (e.g. kg_loader's _norm_cui / _norm_rel) are given.
+        """
+        n = len(triples)
+        out = np.zeros(n, dtype=bool)
+        if not n:
+            return out
+        heads, rels, tails = zip(*triples)
+        hh, ht = _hash_columns(heads, tails, node_key)
+        keys = _edge_hashes(hh, ht)
+        distinct = {r: (rel_key(r) if rel_key is not None else r) for r in set(rels)}
+        if len(distinct) == 1:
+            f = self.filters.get(next(iter(distinct.values())))
+            return f.contains_hashes(keys) if f is not None else out
+        code = {r: i for i, r in enumerate(distinct)}
+        rel_codes = np.fromiter(map(code.__getitem__, rels), dtype=np.int64, count=n)
+        for i, r in enumerate(distinct.values()):
+            f = self.filters.get(r)
+            if f is not None:
+                sel = rel_codes == i
+                out[sel] = f.contains_hashes(keys[sel])
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return sum(f.nbytes for f in self.filters.values())
+
+    # ------------------------------ file ------------------------------
+    def save(self, path: str, src_path: Optional[str] = None) -> str:
+        """Write the filters; src_path (the KG CSV) stamps them for freshness checks."""
+        if src_path:
+            st = os.stat(src_path)
+            self.src_size, self.src_mtime_ns = st.st_size, st.st_mtime_ns
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(BLOOM_MAGIC, BLOOM_VERSION, len(self.filters), self.fpr,
+                                 self.src_size, self.src_mtime_ns))
+            for name, flt in self.filters.items():
+                blob = name.encode("utf-8")
+                f.write(_FILTER.pack(len(blob), flt.n_items, flt.n_bits, flt.n_hashes))
+                f.write(blob); f.write(b"\0" * _pad(len(blob)))
+                f.write(np.ascontiguousarray(flt.bits, dtype=np.uint8).tobytes())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "EdgeBloom":
+        """Memory-map a filter file; the bit arrays are views, nothing is copied."""
+        fh = open(path, "rb")
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            fh.close()
+            raise ValueError(f"Empty KG bloom file: {path}")
+        try:
+            if len(mm) < _HEADER.size:
+                raise ValueError(f"Truncated KG bloom file: {path}")
+            magic, version, n, fpr, src_size, src_mtime_ns = _HEADER.unpack_from(mm, 0)
+            if magic != BLOOM_MAGIC:
+                raise ValueError(f"Not a KG bloom file: {path}")
+            if version != BLOOM_VERSION:
+                raise ValueError(f"Unsupported KG bloom version {version} (expected {BLOOM_VERSION}): {path}")
+            off = _HEADER.size
+            filters: Dict[str, BloomFilter] = {}
+            bits = None
+            for _ in range(n):
+                name_len, n_items, n_bits, k = _FILTER.unpack_from(mm, off); off += _FILTER.size
+                name = mm[off: off + name_len].decode("utf-8"); off += name_len + _pad(name_len)
+                bits = np.frombuffer(mm, dtype=np.uint8, count=n_bits // 8, offset=off); off += n_bits // 8
+                filters[name] = BloomFilter(bits, n_bits, k, n_items)
+        except (ValueError, struct.error) as e:
+            filters = bits = None  # drop the views into mm before closing it
+            mm.close(); fh.close()
+            raise ValueError(str(e) if isinstance(e, ValueError) else f"Truncated KG bloom file: {path}")
+        out = cls(filters, fpr, src_size, src_mtime_ns)
+        out._mm, out._fh = mm, fh
+        return out
+
+    def is_fresh_for(self, csv_path: str) -> bool:
+        """True if the filters were compiled from csv_path as it is now on disk."""
+        try:
+            st = os.stat(csv_path)
+        except OSError:
+            return True  # source gone: the filters are all we have
+        return st.st_size == self.src_size and st.st_mtime_ns == self.src_mtime_ns
+
+    def close(self) -> None:
+        """Release a loaded file (the filters are unusable afterwards)."""
+        self.filters = {}
+        if self._mm is not None:
+            self._mm.close(); self._fh.close()
+            self._mm = self._fh = None
+
+    def __enter__(self) -> "EdgeBloom":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def compile_bloom(kg_path: str, out_path: Optional[str] = None, fpr: float = DEFAULT_FPR) -> str:
+    """Build the filters from a KG CSV / snapshot (edges normalized as KG does) and write them."""
+    from graphcorag.kg_loader import _norm_cui, _norm_rel
+    from graphcorag.kg_snapshot import SNAPSHOT_EXT, iter_kg_edges
+    edges = ((_norm_cui(h), _norm_rel(r), _norm_cui(t)) for h, r, t in iter_kg_edges(kg_path))
+    bloom = EdgeBloom.build((e for e in edges if all(e)), fpr)
+    out_path = out_path or bloom_path_for(kg_path)
+    bloom.save(out_path, None if kg_path.endswith(SNAPSHOT_EXT) else kg_path)
+    print(f"[KG] Compiled bloom filters: {len(bloom.filters)} relations, {bloom.nbytes / 1e6:.2f} MB "
+          f"(fpr {fpr:g}) -> {out_path}")
+    return out_path
+
+def open_bloom(kg_path: str) -> Optional[EdgeBloom]:
+    """The fresh filter file for kg_path, else None (stale / unreadable files are reported and ignored)."""
+    path = bloom_path_for(kg_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        bloom = EdgeBloom.load(path)
+    except ValueError as e:
+        print(f"[WARN] Ignoring KG bloom file: {e}", file=sys.stderr)
+        return None
+    from graphcorag.kg_snapshot import SNAPSHOT_EXT
+    if path != kg_path and not kg_path.endswith(SNAPSHOT_EXT) and not bloom.is_fresh_for(kg_path):
+        print(f"[WARN] KG bloom file is stale, not using it: {path}", file=sys.stderr)
+        bloom.close()
+        return None
+    return bloom
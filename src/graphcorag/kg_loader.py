@@ -1,80 +1,273 @@
 # -*- coding: utf-8 -*-
 """
 hybridkg.kg_loader
-Clean KG CSV loader with normalization, has_edge(), neighbors().
+Clean KG CSV loader with normalization, has_edge(), neighbors(), predecessors()
+and batched neighbors_many()/predecessors_many() over forward and reverse adjacency.
+Vectorized has_edges() and per-relation sparse adjacency() via kg_sparse (numpy/scipy, lazy);
+opt-in per-relation Bloom filters (kg_bloom) reject most non-edges of a batch before the exact check.
+Weight-ranked top-k neighbor lists (kg_rank) via ranking() / top_neighbors().
+Normalized surface -> CUI(s) hash index (dict + overlay via dict_snapshot, or a prebuilt surf2cui.json).
+Reads the compiled binary snapshot (see kg_snapshot) when one is present.
 """
 from __future__ import annotations
-import csv, io, json, os
+import io, json, os, sys
 from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+from graphcorag.dict_snapshot import Lexicon, load_lexicon
+from graphcorag.kg_snapshot import iter_csv_edges, open_snapshot
+from graphcorag.profiling import stage, count
+
 def _norm_cui(x: Optional[str]) -> str:
     return ("" if x is None else str(x).strip().lower())
 
 def _norm_rel(x: Optional[str]) -> str:
     return ("" if x is None else str(x).strip().upper())
 
+def _norm_surface(x: Optional[str]) -> str:
+    return ("" if x is None else " ".join(str(x).lower().split()))
+
 class KG:
-    def __init__(self, kg_csv_path: str, dict_path: Optional[str] = None, overlay_path: Optional[str] = None):
+    def __init__(self, kg_csv_path: str, dict_path: Optional[str] = None, overlay_path: Optional[str] = None,
+                 surf2cui_path: Optional[str] = None, bloom: bool = False):
+        """
+        bloom: put per-relation Bloom filters in front of has_edges() (the compiled
+        <kg>.kgbloom when present, fresh and covering every relation, else built in
+        memory). Off by default: the exact structures stay loaded either way.
+        """
         self.edge_set: Set[Tuple[str, str, str]] = set()
-        self.out: Dict[Tuple[str, str], Set[str]] = {}
-
-        # Load edges
-        with io.open(kg_csv_path, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            if not reader.fieldnames:
-                raise ValueError("KG CSV has no header.")
-            # Tolerant header aliases
-            alias = {h.lower(): h for h in reader.fieldnames}
-            hcol = alias.get("head") or alias.get("h") or "head"
-            rcol = alias.get("relation") or alias.get("rel") or "relation"
-            tcol = alias.get("tail") or alias.get("t") or "tail"
-            for row in reader:
-                h = _norm_cui(row.get(hcol))
-                r = _norm_rel(row.get(rcol))
-                t = _norm_cui(row.get(tcol))
-                if not (h and r and t):
-                    continue
-                self.edge_set.add((h, r, t))
-                self.out.setdefault((h, r), set()).add(t)
+        self.out: Dict[Tuple[str, str], Set[str]] = {}   # (head, rel) -> tails
+        self.inc: Dict[Tuple[str, str], Set[str]] = {}   # (tail, rel) -> heads
+        self.relations: Set[str] = set()
+        self.edge_rows: Dict[Tuple[str, str, str], int] = {}   # rows per edge, only for edges listed more than once
+        self._rankings: Dict[Tuple[str, Optional[Tuple[str, ...]]], object] = {}
+        self._rel_stats: Optional[Dict[str, Dict[str, float]]] = None
+        self._matrices = None
+
+        # Load edges (binary snapshot when compiled and fresh, else CSV)
+        snap = open_snapshot(kg_csv_path)
+        if snap is not None:
+            with snap:
+                # normalize each vocab entry once instead of once per edge
+                nodes = [_norm_cui(n) for n in snap.nodes]
+                rels = [_norm_rel(r) for r in snap.relations]
+                for hi, ri, ti in zip(snap.heads, snap.rels, snap.tails):
+                    self._add_edge(nodes[hi], rels[ri], nodes[ti])
+        else:
+            for h, r, t in iter_csv_edges(kg_csv_path):
+                self._add_edge(_norm_cui(h), _norm_rel(r), _norm_cui(t))
 
         print(f"[KG] Loaded {len(self.edge_set)} edges from: {os.path.basename(kg_csv_path)}. Total unique now: {len(self.edge_set)}")
+        self.bloom = self._load_bloom(kg_csv_path) if bloom else None
 
-        # Optional dictionary (JSON: CUI -> [surfaces])
-        self.surface_dict: Dict[str, List[str]] = {}
-        if dict_path and os.path.exists(dict_path):
+        # Optional dictionary (JSON: CUI -> [surfaces]) + overlay, merged once (compiled snapshot when fresh)
+        self.lexicon: Optional[Lexicon] = None
+        if dict_path and not os.path.exists(dict_path):
+            dict_path = None
+        if dict_path or overlay_path:
             try:
-                with io.open(dict_path, "r", encoding="utf-8-sig") as f:
-                    self.surface_dict = json.load(f)
+                self.lexicon = load_lexicon(dict_path, overlay_path)  # a missing overlay is skipped
             except Exception:
-                self.surface_dict = {}
-        print(f"[KG] Loaded dictionary entries: {len(self.surface_dict)}")
+                self.lexicon = None
+        print(f"[KG] Loaded dictionary entries: {len(self.lexicon) if self.lexicon is not None else 0}")
 
-        # Optional overlay
-        self.overlay = None
-        if overlay_path and os.path.exists(overlay_path):
-            try:
-                with io.open(overlay_path, "r", encoding="utf-8-sig") as f:
-                    self.overlay = json.load(f)
-            except Exception:
-                self.overlay = None
+        # Surface index: normalized surface -> [CUIs] (first = preferred; >1 = ambiguous)
+        self.surface_index: Dict[str, List[str]] = {}
+        if surf2cui_path and os.path.exists(surf2cui_path):
+            self._load_surface_index(surf2cui_path)
+        elif self.lexicon is not None:
+            self.surface_index = self.lexicon.surface_index()
+        if self.surface_index:
+            print(f"[KG] Surface index: {len(self.surface_index)} surfaces "
+                  f"({sum(1 for v in self.surface_index.values() if len(v) > 1)} ambiguous)")
+        self._surface2cui: Optional[Dict[str, str]] = None
+
+    def _load_surface_index(self, path: str) -> None:
+        """Prebuilt surface -> [CUIs] (or surface -> CUI) JSON, e.g. config/surf2cui.json."""
+        with io.open(path, "r", encoding="utf-8-sig") as f:
+            raw = json.load(f)
+        index = self.surface_index
+        for surface, cuis in raw.items():
+            s = _norm_surface(surface)
+            if not s:
+                continue
+            lst = index.setdefault(s, [])
+            for cui in ([cuis] if isinstance(cuis, str) else cuis or ()):
+                if cui not in lst:
+                    lst.append(cui)
+
+    def _load_bloom(self, kg_path: str):
+        try:
+            from graphcorag.kg_bloom import EdgeBloom, open_bloom
+        except ImportError:  # numpy missing
+            return None
+        bloom = open_bloom(kg_path)
+        if bloom is not None and set(bloom.filters) != self.relations:
+            print("[WARN] KG bloom file does not match the loaded relations, rebuilding it in memory", file=sys.stderr)
+            bloom.close()
+            bloom = None
+        if bloom is None:
+            bloom = EdgeBloom.build(self.edge_set)
+        if bloom is not None:
+            print(f"[KG] Bloom filters: {len(bloom.filters)} relations, {bloom.nbytes / 1e6:.2f} MB")
+        return bloom
+
+    def _add_edge(self, h: str, r: str, t: str) -> None:
+        if not (h and r and t):
+            return
+        e = (h, r, t)
+        if e in self.edge_set:
+            self.edge_rows[e] = self.edge_rows.get(e, 1) + 1
+            return
+        self.edge_set.add(e)
+        self.out.setdefault((h, r), set()).add(t)
+        self.inc.setdefault((t, r), set()).add(h)
+        self.relations.add(r)
 
     def has_edge(self, head_cui: str, relation: str, tail_cui: str) -> bool:
+        count("kg.edges_checked")
         return (_norm_cui(head_cui), _norm_rel(relation), _norm_cui(tail_cui)) in self.edge_set
 
+    def matrices(self):
+        """Integer-encoded array view (kg_sparse.KGMatrices), built on first use."""
+        if self._matrices is None:
+            from graphcorag.kg_sparse import KGMatrices
+            self._matrices = KGMatrices(self)
+        return self._matrices
+
+    def has_edges(self, triples):
+        """
+        Vectorized has_edge over a batch of (head, relation, tail) string triples or an
+        (n, 3) id array from matrices().encode(). Returns a numpy bool array. With Bloom
+        filters, string triples they reject skip the exact check.
+        """
+        count("kg.edges_checked", len(triples))
+        with stage("kg.has_edges"):
+            if self.bloom is None or not isinstance(triples, (list, tuple)) or not triples:
+                return self.matrices().has_edges(triples)
+            maybe = self.might_have_edges(triples)
+            found = maybe.copy()
+            hits = maybe.nonzero()[0]
+            if hits.size:
+                found[hits] = self.matrices().has_edges([triples[i] for i in hits.tolist()])
+            return found
+
+    def might_have_edges(self, triples):
+        """
+        Bloom prefilter over string triples: a numpy bool array, False = certainly not an
+        edge. All True when the KG has no filters.
+        """
+        import numpy as np
+        if self.bloom is None or not len(triples):
+            return np.ones(len(triples), dtype=bool)
+        maybe = self.bloom.might_contain_many(triples, node_key=_norm_cui, rel_key=_norm_rel)
+        count("kg.bloom_rejected", int(len(triples) - maybe.sum()))
+        return maybe
+
+    def adjacency(self, relation: str):
+        """SciPy CSR adjacency matrix for one relation (node ids from matrices().node_id)."""
+        return self.matrices().adjacency(relation)
+
     def neighbors(self, head_cui: str, relation: str) -> List[str]:
         """Return sorted list of tails T with (head, relation, T) in KG."""
         h = _norm_cui(head_cui)
         r = _norm_rel(relation)
+        count("kg.neighbor_lookups")
         return sorted(self.out.get((h, r), []))
 
+    def predecessors(self, tail_cui: str, relation: str) -> List[str]:
+        """Return sorted list of heads H with (H, relation, tail) in KG."""
+        t = _norm_cui(tail_cui)
+        r = _norm_rel(relation)
+        return sorted(self.inc.get((t, r), []))
+
+    def neighbors_many(self, head_cuis: Iterable[str], relation: str) -> List[List[str]]:
+        """Batched neighbors(): one sorted tail list per head, aligned with the input."""
+        r = _norm_rel(relation)
+        out = self.out
+        return [sorted(out.get((_norm_cui(h), r), ())) for h in head_cuis]
+
+    def predecessors_many(self, tail_cuis: Iterable[str], relation: str) -> List[List[str]]:
+        """Batched predecessors(): one sorted head list per tail, aligned with the input."""
+        r = _norm_rel(relation)
+        inc = self.inc
+        return [sorted(inc.get((_norm_cui(t), r), ())) for t in tail_cuis]
+
+    def ranking(self, weight: str = "specificity", relations: Optional[Iterable[str]] = None):
+        """kg_rank.NeighborRanking of this KG for weight (built once per weight / relation set, then cached)."""
+        from graphcorag.kg_rank import NeighborRanking
+        key = (weight, None if relations is None else tuple(sorted({_norm_rel(r) for r in relations})))
+        rank = self._rankings.get(key)
+        if rank is None:
+            rank = self._rankings[key] = NeighborRanking(self, weight, relations=key[1])
+        return rank
+
+    def top_neighbors(self, head_cui: str, relation: str, k: int = 8, weight: str = "specificity") -> List[str]:
+        """The k best tails of (head, relation) under weight, best first."""
+        count("kg.neighbor_lookups")
+        return self.ranking(weight).top_k(head_cui, relation, k)
+
+    def source_count(self, head_cui: str, relation: str, tail_cui: str) -> int:
+        """KG rows asserting the edge (0 when absent)."""
+        e = (_norm_cui(head_cui), _norm_rel(relation), _norm_cui(tail_cui))
+        return self.edge_rows.get(e, 1) if e in self.edge_set else 0
+
+    def out_degree(self, head_cui: str, relation: str) -> int:
+        return len(self.out.get((_norm_cui(head_cui), _norm_rel(relation)), ()))
+
+    def in_degree(self, tail_cui: str, relation: str) -> int:
+        return len(self.inc.get((_norm_cui(tail_cui), _norm_rel(relation)), ()))
+
+    def relation_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-relation degree statistics (computed once, then cached):
+        edges, heads, tails, max_out, mean_out, max_in, mean_in.
+        """
+        if self._rel_stats is None:
+            stats: Dict[str, Dict[str, float]] = {
+                r: {"edges": 0, "heads": 0, "tails": 0, "max_out": 0, "max_in": 0} for r in self.relations
+            }
+            for (_, r), tails in self.out.items():
+                st = stats[r]
+                st["edges"] += len(tails)
+                st["heads"] += 1
+                st["max_out"] = max(st["max_out"], len(tails))
+            for (_, r), heads in self.inc.items():
+                st = stats[r]
+                st["tails"] += 1
+                st["max_in"] = max(st["max_in"], len(heads))
+            for st in stats.values():
+                st["mean_out"] = st["edges"] / max(1, st["heads"])
+                st["mean_in"] = st["edges"] / max(1, st["tails"])
+            self._rel_stats = stats
+        return self._rel_stats
+
     # Convenience for quick checks
     def surface_to_cui(self, surface: str) -> Optional[str]:
-        s = (surface or "").strip().lower()
-        for cui, forms in self.surface_dict.items():
-            for form in forms:
-                if (form or "").lower() == s:
-                    return cui
-        return None
+        cuis = self.surface_index.get(_norm_surface(surface))
+        return cuis[0] if cuis else None
+
+    def surface_to_cuis(self, surface: str) -> List[str]:
+        """All CUIs sharing this surface form (ambiguity list, preferred first)."""
+        return list(self.surface_index.get(_norm_surface(surface), ()))
+
+    def surfaces_to_cuis(self, surfaces: Iterable[str]) -> List[Optional[str]]:
+        """Batched surface_to_cui(), aligned with the input."""
+        index = self.surface_index
+        out: List[Optional[str]] = []
+        for s in surfaces:
+            cuis = index.get(_norm_surface(s))
+            out.append(cuis[0] if cuis else None)
+        return out
+
+    def ambiguous_surfaces(self) -> Dict[str, List[str]]:
+        return {s: list(c) for s, c in self.surface_index.items() if len(c) > 1}
+
+    @property
+    def surface2cui(self) -> Dict[str, str]:
+        """surface -> preferred CUI, the mapping rules.extract_surfaces() expects."""
+        if self._surface2cui is None:
+            self._surface2cui = {s: c[0] for s, c in self.surface_index.items()}
+        return self._surface2cui
 
 if __name__ == "__main__":
     import argparse
@@ -82,14 +275,23 @@ if __name__ == "__main__":
     ap.add_argument("--kg", required=True)
     ap.add_argument("--dict", default=None)
     ap.add_argument("--overlay", default=None)
+    ap.add_argument("--surf2cui", default=None, help="prebuilt surface->CUI(s) JSON (skips indexing dict/overlay)")
     ap.add_argument("--check", default=None, help="HEAD,REL,TAIL")
     ap.add_argument("--surface", default=None)
+    ap.add_argument("--incoming", default=None, help="TAIL,REL")
+    ap.add_argument("--top", default=None, help="HEAD,REL: best-ranked tails")
+    ap.add_argument("--rank", default="specificity", help="neighbor weight for --top (kg_rank), e.g. sources=1,specificity=0.5")
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--stats", action="store_true", help="print per-relation degree statistics")
     args = ap.parse_args()
 
-    kg = KG(args.kg, dict_path=args.dict, overlay_path=args.overlay)
+    kg = KG(args.kg, dict_path=args.dict, overlay_path=args.overlay, surf2cui_path=args.surf2cui)
 
     if args.surface:
         print(f"surface_to_cui('{args.surface}') -> {kg.surface_to_cui(args.surface)}")
+        cuis = kg.surface_to_cuis(args.surface)
+        if len(cuis) > 1:
+            print(f"  ambiguous: {cuis}")
 
     if args.check:
         parts = [p.strip() for p in args.check.split(",")]
@@ -98,3 +300,25 @@ if __name__ == "__main__":
             raise SystemExit(2)
         h, r, t = parts
         print("has_edge:", kg.has_edge(h, r, t))
+
+    if args.incoming:
+        parts = [p.strip() for p in args.incoming.split(",")]
+        if len(parts) != 2:
+            print("Invalid --incoming (expected TAIL,REL)")
+            raise SystemExit(2)
+        heads = kg.predecessors(parts[0], parts[1])
+        print(f"predecessors: {len(heads)}", heads[:20])
+
+    if args.top:
+        parts = [p.strip() for p in args.top.split(",")]
+        if len(parts) != 2:
+            print("Invalid --top (expected HEAD,REL)")
+            raise SystemExit(2)
+        ranked = kg.ranking(args.rank).top_k_scored(parts[0], parts[1], args.k)
+        print(f"top {args.k} by {args.rank}: {len(ranked)}", [(t, round(s, 3)) for t, s in ranked])
+
+    if args.stats:
+        for rel, st in sorted(kg.relation_stats().items()):
+            print(f"{rel:22s} edges={st['edges']:<7d} heads={st['heads']:<6d} tails={st['tails']:<6d} "
+                  f"max_out={st['max_out']:<5d} mean_out={st['mean_out']:.2f} "
+                  f"max_in={st['max_in']:<5d} mean_in={st['mean_in']:.2f}")
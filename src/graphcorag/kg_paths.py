@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_paths
+Multi-hop path search over KG for (head, relation-chain, tail) validation.
+
+- Bidirectional layered search: the smaller frontier is expanded first, so a
+  hub on one side (e.g. drug_antigens) does not blow up the whole search
+- Relation-sequence constraints: a fixed chain like ["INTERACTS_WITH", "ADVERSE_EFFECT"],
+  with None / "*" as a per-hop wildcard; no chain means any relation, any length <= max_hops
+- k shortest simple paths (shorter paths first), fan-out cap per expanded node,
+  per-query cap on expanded nodes (deterministic) and optional wall-clock budget
+  (partial results are flagged as truncated; a time budget makes results depend on load)
+
+API: PathFinder(kg).find_paths(head, tail, relations=None, k=5) -> PathResult
+"""
+from __future__ import annotations
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from graphcorag.kg_loader import KG, _norm_cui, _norm_rel
+
+Edge = Tuple[str, str, str]
+Path = List[Edge]
+# node -> [(neighbor toward the search origin, relation)]
+Layer = Dict[str, List[Tuple[str, str]]]
+
+_WILDCARDS = (None, "", "*", "ANY")
+
+class PathResult:
+    """Paths found for one query plus search bookkeeping."""
+    __slots__ = ("paths", "truncated", "expanded", "elapsed_s")
+
+    def __init__(self):
+        self.paths: List[Path] = []
+        self.truncated = False   # fan-out cap, expansion cap or time budget cut the search short
+        self.expanded = 0        # nodes expanded on both sides
+        self.elapsed_s = 0.0
+
+    def __bool__(self) -> bool:
+        return bool(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "paths": [[list(e) for e in p] for p in self.paths],
+            "truncated": self.truncated,
+            "expanded": self.expanded,
+            "elapsed_ms": round(self.elapsed_s * 1000.0, 3),
+        }
+
+class _BudgetExceeded(Exception):
+    pass
+
+class PathFinder:
+    def __init__(self, kg: KG, max_hops: int = 3, fanout: int = 256, time_budget_s: Optional[float] = None,
+                 reach2=None, max_expanded: Optional[int] = None):
+        """
+        Args:
+          max_hops: longest path considered when no relation chain is given
+          fanout: max neighbors taken per (node, relation) expansion; hubs beyond it are truncated
+          time_budget_s: per-query wall-clock budget (None = unlimited); results then vary with machine load
+          reach2: optional kg_reach2.TwoHopIndex; fixed two-relation chains become lookups
+          max_expanded: per-query cap on expanded nodes (None = unlimited), the reproducible bound
+        """
+        self.kg = kg
+        self.reach2 = reach2
+        self.max_hops = int(max_hops)
+        self.fanout = int(fanout)
+        self.time_budget_s = time_budget_s
+        self.max_expanded = max_expanded
+        # node -> [(rel, neighbors)] so wildcard hops don't probe every relation name
+        self._out_by_node: Dict[str, List[Tuple[str, Set[str]]]] = {}
+        self._in_by_node: Dict[str, List[Tuple[str, Set[str]]]] = {}
+        for (h, r), tails in kg.out.items():
+            self._out_by_node.setdefault(h, []).append((r, tails))
+        for (t, r), heads in kg.inc.items():
+            self._in_by_node.setdefault(t, []).append((r, heads))
+
+    # ------------------------------ expansion ------------------------------
+    def _adjacent(self, node: str, rel: Optional[str], forward: bool) -> Iterable[Tuple[str, Set[str]]]:
+        if rel is None:
+            return (self._out_by_node if forward else self._in_by_node).get(node, ())
+        nbrs = (self.kg.out if forward else self.kg.inc).get((node, rel))
+        return ((rel, nbrs),) if nbrs else ()
+
+    def _expand(self, layer: Layer, rel: Optional[str], forward: bool, state: Dict[str, object]) -> Layer:
+        nxt: Layer = {}
+        deadline = state["deadline"]
+        fanout = state["fanout"]
+        limit = state["max_expanded"]
+        res: PathResult = state["result"]
+        for node in layer:
+            if (deadline is not None and time.perf_counter() > deadline) or \
+                    (limit is not None and res.expanded >= limit):
+                res.truncated = True
+                raise _BudgetExceeded()
+            res.expanded += 1
+            for r, nbrs in self._adjacent(node, rel, forward):
+                if len(nbrs) > fanout:
+                    nbrs = sorted(nbrs)[:fanout]
+                    res.truncated = True
+                for m in nbrs:
+                    nxt.setdefault(m, []).append((node, r))
+        return nxt
+
+    # ------------------------------ enumeration ------------------------------
+    @staticmethod
+    def _walks(layers: List[Layer], depth: int, node: str) -> Iterable[List[Tuple[str, str]]]:
+        """Yield [(prev, rel), ...] hop lists leading from the layer-0 origin to node at depth."""
+        if depth == 0:
+            yield []
+            return
+        for prev, rel in sorted(layers[depth][node]):
+            for w in PathFinder._walks(layers, depth - 1, prev):
+                yield w + [(prev, rel)]
+
+    def _collect(self, fwd: List[Layer], i: int, bwd: List[Layer], j: int,
+                 k: int, res: PathResult, seen: Set[Tuple[Edge, ...]], deadline: Optional[float]) -> None:
+        a, b = fwd[i], bwd[j]
+        small, big = (a, b) if len(a) <= len(b) else (b, a)
+        meet = sorted(m for m in small if m in big)
+        for m in meet:
+            for pre in self._walks(fwd, i, m):
+                # forward hops: (prev, rel) means prev -rel-> next
+                nodes = [p for p, _ in pre] + [m]
+                edges: Path = [(p, r, nodes[x + 1]) for x, (p, r) in enumerate(pre)]
+                for suf in self._walks(bwd, j, m):
+                    # backward hops were recorded from the tail side: (next, rel) means node -rel-> next
+                    path = list(edges)
+                    cur = m
+                    visited = set(nodes)
+                    ok = True
+                    for nxt, r in reversed(suf):
+                        if nxt in visited:
+                            ok = False; break
+                        visited.add(nxt)
+                        path.append((cur, r, nxt))
+                        cur = nxt
+                    if not ok or len(visited) != len(path) + 1:
+                        continue  # not a simple path
+                    key = tuple(path)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    res.paths.append(path)
+                    if len(res.paths) >= k:
+                        return
+                    if deadline is not None and time.perf_counter() > deadline:
+                        res.truncated = True
+                        return
+
+    # ------------------------------ search ------------------------------
+    def find_paths(self, head: str, tail: str, relations: Optional[Sequence[Optional[str]]] = None,
+                   k: int = 5, max_hops: Optional[int] = None, fanout: Optional[int] = None,
+                   time_budget_s: Optional[float] = -1.0) -> PathResult:
+        """
+        Find up to k simple paths head -> ... -> tail, shortest first.
+        relations: fixed relation chain (one entry per hop; None/"*" = any relation).
+                   When omitted, any relations and any length up to max_hops are allowed.
+        time_budget_s: per-call override (-1 keeps the finder default, None = unlimited).
+        """
+        res = PathResult()
+        t0 = time.perf_counter()
+        budget = self.time_budget_s if time_budget_s == -1.0 else time_budget_s
+        deadline = (t0 + budget) if budget is not None else None
+        h, t = _norm_cui(head), _norm_cui(tail)
+        if not (h and t) or k <= 0:
+            return res
+
+        if relations:
+            chain: List[Optional[str]] = [None if r in _WILDCARDS else _norm_rel(r) for r in relations]
+            lengths = [len(chain)]
+        else:
+            chain = []
+            lengths = list(range(1, int(max_hops or self.max_hops) + 1))
+
+        if self.reach2 is not None and len(chain) == 2 and None not in chain and tuple(chain) in self.reach2.reach:
+            # two-hop index: O(1) negative answers, intermediates straight from the adjacency sets
+            if self.reach2.has_path2(h, chain[0], chain[1], t):
+                for x in self.reach2.intermediates(h, chain[0], chain[1], t):
+                    if x != h and x != t:
+                        res.paths.append([(h, chain[0], x), (x, chain[1], t)])
+                        if len(res.paths) >= k:
+                            break
+            res.elapsed_s = time.perf_counter() - t0
+            return res
+
+        def hop_rel(x: int) -> Optional[str]:
+            return chain[x] if chain else None
+
+        state = {"deadline": deadline, "fanout": int(fanout or self.fanout), "result": res,
+                 "max_expanded": self.max_expanded}
+        fwd: List[Layer] = [{h: []}]
+        bwd: List[Layer] = [{t: []}]
+        seen: Set[Tuple[Edge, ...]] = set()
+        try:
+            for L in lengths:
+                # grow the smaller frontier until the two sides can meet at length L
+                while (len(fwd) - 1) + (len(bwd) - 1) < L:
+                    i, j = len(fwd) - 1, len(bwd) - 1
+                    if len(fwd[i]) <= len(bwd[j]):
+                        fwd.append(self._expand(fwd[i], hop_rel(i), True, state))
+                    else:
+                        bwd.append(self._expand(bwd[j], hop_rel(L - 1 - j), False, state))
+                i = min(len(fwd) - 1, L)
+                self._collect(fwd, i, bwd, L - i, k, res, seen, deadline)
+                if len(res.paths) >= k:
+                    break
+                if deadline is not None and time.perf_counter() > deadline:
+                    res.truncated = True
+                    break
+        except _BudgetExceeded:
+            pass
+        res.elapsed_s = time.perf_counter() - t0
+        return res
+
+    def has_path(self, head: str, tail: str, relations: Optional[Sequence[Optional[str]]] = None, **kw) -> bool:
+        return bool(self.find_paths(head, tail, relations=relations, k=1, **kw))
+
+def format_path(path: Path) -> str:
+    """drug_a -INTERACTS_WITH-> drug_b -ADVERSE_EFFECT-> disease_c"""
+    if not path:
+        return ""
+    parts = [path[0][0]]
+    for _, r, t in path:
+        parts.append(f"-{r}-> {t}")
+    return " ".join(parts)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="KG multi-hop path search")
+    ap.add_argument("--kg", required=True)
+    ap.add_argument("--head", required=True)
+    ap.add_argument("--tail", required=True)
+    ap.add_argument("--chain", default=None, help="comma-separated relation chain, * = any relation")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--max_hops", type=int, default=3)
+    ap.add_argument("--fanout", type=int, default=256)
+    ap.add_argument("--budget_ms", type=float, default=0.0, help="per-query time budget (<=0: unlimited)")
+    ap.add_argument("--max_expanded", type=int, default=0, help="per-query cap on expanded nodes (<=0: unlimited)")
+    args = ap.parse_args()
+
+    kg = KG(args.kg)
+    finder = PathFinder(kg, max_hops=args.max_hops, fanout=args.fanout,
+                        time_budget_s=(args.budget_ms / 1000.0 if args.budget_ms > 0 else None),
+                        max_expanded=(args.max_expanded if args.max_expanded > 0 else None))
+    chain = [c.strip() for c in args.chain.split(",")] if args.chain else None
+    res = finder.find_paths(args.head, args.tail, relations=chain, k=args.k)
+    print(f"paths: {len(res)}  truncated={res.truncated}  expanded={res.expanded}  {res.elapsed_s*1000:.2f} ms")
+    for p in res.paths:
+        print("  " + format_path(p))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_rank
+Ranked first-hop neighbor lists for KG verdicts: every (head, relation) tail list is
+sorted once, at load time, by a configurable edge weight and stored as flat arrays
+(per relation: head row -> offset into tail ids / scores), so top_k() is one slice
+instead of a sort per call.
+
+Weights (combine with coefficients, e.g. "sources=1,specificity=0.5"):
+- specificity: log((1 + heads of the relation) / (1 + heads pointing at the tail));
+  tails many heads share (hubs such as a generic "complication") rank last
+- sources: KG rows asserting the edge (duplicates across the merged source CSVs)
+- cooccurrence: external per-edge scores, e.g. head / tail co-mention counts in the
+  corpus, read from a head,relation,tail,weight CSV (load_edge_weights)
+Ties break on tail name, so the order is deterministic.
+
+API:
+  rank = NeighborRanking(kg, "specificity", relations=("ADVERSE_EFFECT",))
+  rank.top_k("drug_adalimumab", "ADVERSE_EFFECT", 8)   # best tails first
+  kg.ranking().top_k_scored(head, rel, 3)               # [(tail, score), ...]
+"""
+from __future__ import annotations
+import math
+from array import array
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from graphcorag.fileio import iter_csv_dicts
+from graphcorag.kg_loader import _norm_cui, _norm_rel
+
+Edge = Tuple[str, str, str]
+WEIGHTS = ("specificity", "sources", "cooccurrence")
+DEFAULT_WEIGHT = "specificity"
+_WEIGHT_COLUMNS = ("weight", "score", "count")
+
+def parse_rank_spec(spec: Optional[str]) -> Dict[str, float]:
+    """'specificity' -> {"specificity": 1.0}; 'sources=1,specificity=0.5' -> coefficients."""
+    out: Dict[str, float] = {}
+    for part in (spec or DEFAULT_WEIGHT).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, val = part.partition("=")
+        name = name.strip()
+        if name not in WEIGHTS:
+            raise ValueError(f"unknown neighbor weight {name!r} (expected one of {', '.join(WEIGHTS)})")
+        out[name] = float(val) if sep else 1.0
+    return out
+
+def load_edge_weights(path: str) -> Dict[Edge, float]:
+    """(head, relation, tail) -> weight from a CSV with head, relation, tail and weight/score/count columns."""
+    out: Dict[Edge, float] = {}
+    for row in iter_csv_dicts(path):
+        row = {(k or "").strip().lower(): v for k, v in row.items()}
+        col = next((c for c in _WEIGHT_COLUMNS if c in row), None)
+        if col is None:
+            raise ValueError(f"{path}: no weight column (expected one of {', '.join(_WEIGHT_COLUMNS)})")
+        key = (_norm_cui(row.get("head")), _norm_rel(row.get("relation")), _norm_cui(row.get("tail")))
+        try:
+            out[key] = out.get(key, 0.0) + float(row[col] or 0.0)
+        except ValueError:
+            continue  # non-numeric weight: skip the row
+    return out
+
+class NeighborRanking:
+    """
+    Tail lists of one KG, best first. Per relation: head -> row, offsets (array 'q'),
+    tail ids into .nodes (array 'l') and scores (array 'd'), rows in sorted head order.
+    """
+
+    def __init__(self, kg, weight: str = DEFAULT_WEIGHT, edge_weights: Optional[Mapping[Edge, float]] = None,
+                 relations: Optional[Iterable[str]] = None):
+        """
+        kg: a loaded kg_loader.KG
+        weight: a weight name or "name=coef,..." (see module docstring)
+        edge_weights: normalized (head, relation, tail) -> score, for "cooccurrence"
+        relations: rank only these relations (default: all)
+        """
+        self.weight = weight
+        self.coefs = parse_rank_spec(weight)
+        if "cooccurrence" in self.coefs and edge_weights is None:
+            raise ValueError("the cooccurrence weight needs edge_weights (see load_edge_weights)")
+        wanted = None if relations is None else {_norm_rel(r) for r in relations}
+        by_rel: Dict[str, List[str]] = {}
+        for h, r in kg.out:
+            if wanted is None or r in wanted:
+                by_rel.setdefault(r, []).append(h)
+
+        self.nodes: List[str] = []
+        node_id: Dict[str, int] = {}
+        self._rows: Dict[str, Dict[str, int]] = {}
+        self._offsets: Dict[str, array] = {}
+        self._tails: Dict[str, array] = {}
+        self._scores: Dict[str, array] = {}
+        for r, heads in sorted(by_rel.items()):
+            score = self._scorer(kg, r, len(heads), edge_weights)
+            rows: Dict[str, int] = {}
+            offsets, tails, scores = array("q", [0]), array("l"), array("d")
+            for h in sorted(heads):
+                ranked = sorted((-score(h, t), t) for t in kg.out[(h, r)])
+                rows[h] = len(rows)
+                for neg, t in ranked:
+                    i = node_id.get(t)
+                    if i is None:
+                        i = node_id[t] = len(self.nodes)
+                        self.nodes.append(t)
+                    tails.append(i)
+                    scores.append(-neg)
+                offsets.append(len(tails))
+            self._rows[r], self._offsets[r], self._tails[r], self._scores[r] = rows, offsets, tails, scores
+
+    def _scorer(self, kg, r: str, n_heads: int, edge_weights: Optional[Mapping[Edge, float]]) -> Callable[[str, str], float]:
+        parts: List[Callable[[str, str], float]] = []
+        for name, coef in self.coefs.items():
+            if not coef:
+                continue
+            if name == "specificity":
+                inc, top = kg.inc, 1.0 + n_heads
+                parts.append(lambda h, t, c=coef: c * math.log(top / (1.0 + len(inc.get((t, r), ())))))
+            elif name == "sources":
+                rows = kg.edge_rows
+                parts.append(lambda h, t, c=coef: c * rows.get((h, r, t), 1))
+            else:
+                parts.append(lambda h, t, c=coef: c * edge_weights.get((h, r, t), 0.0))
+        if len(parts) == 1:
+            return parts[0]
+        return lambda h, t: sum(p(h, t) for p in parts)
+
+    @property
+    def relations(self) -> List[str]:
+        return list(self._rows)
+
+    def _span(self, head: str, relation: str, k: Optional[int]) -> Tuple[Optional[str], int, int]:
+        r = _norm_rel(relation)
+        i = self._rows.get(r, {}).get(_norm_cui(head))
+        if i is None:
+            return None, 0, 0
+        off = self._offsets[r]
+        a, b = off[i], off[i + 1]
+        return r, a, b if k is None else min(b, a + max(0, int(k)))
+
+    def degree(self, head: str, relation: str) -> int:
+        _, a, b = self._span(head, relation, None)
+        return b - a
+
+    def top_k(self, head: str, relation: str, k: Optional[int] = None) -> List[str]:
+        """The k best tails of (head, relation), best first ([] when the KG has none); k=None: all."""
+        r, a, b = self._span(head, relation, k)
+        if r is None:
+            return []
+        nodes = self.nodes
+        return [nodes[i] for i in self._tails[r][a:b]]
+
+    def top_k_scored(self, head: str, relation: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        r, a, b = self._span(head, relation, k)
+        if r is None:
+            return []
+        nodes = self.nodes
+        return [(nodes[i], s) for i, s in zip(self._tails[r][a:b], self._scores[r][a:b])]
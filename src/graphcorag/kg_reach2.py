@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_reach2
+Optional precomputed two-hop reachability index over KG.
+
+For every relation pair (r1, r2) it materializes the boolean product A_r1 · A_r2
+row by row (head -> set of tails reachable via head -r1-> x -r2-> tail), so
+has_path2() is a dict + set probe. Intermediates are enumerated on demand.
+
+Hub intermediates whose |in_r1(x)| * |out_r2(x)| exceeds hub_cap are not expanded
+into the product (that is where the quadratic blow-up lives); they are remembered
+per pair and checked directly at query time, which keeps answers exact.
+
+API: TwoHopIndex(kg, relation_pairs=None, hub_cap=200000).has_path2(h, r1, r2, t)
+"""
+from __future__ import annotations
+import json, time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from graphcorag.kg_loader import KG, _norm_cui, _norm_rel
+
+RelPair = Tuple[str, str]
+
+def pairs_from_schema(schema_path: str) -> List[RelPair]:
+    """
+    Relation pairs declared as two-hop compositions in relation_schema.json, e.g.
+      "ADVERSE_EFFECT": [["INTERACTS_WITH", "ADVERSE_EFFECT"], ["CAUSES", "IS_A"]]
+      "CONTRAINDICATED_FOR": ["ADVERSE_EFFECT", "IS_A"]
+    """
+    with open(schema_path, "r", encoding="utf-8-sig") as f:
+        schema = json.load(f)
+    pairs: List[RelPair] = []
+    for key, val in schema.items():
+        if not isinstance(val, list) or not key.isupper():
+            continue
+        chains = val if val and isinstance(val[0], list) else [val]
+        for ch in chains:
+            if isinstance(ch, list) and len(ch) == 2 and all(isinstance(r, str) for r in ch):
+                pr = (_norm_rel(ch[0]), _norm_rel(ch[1]))
+                if pr not in pairs:
+                    pairs.append(pr)
+    return pairs
+
+class TwoHopIndex:
+    def __init__(self, kg: KG, relation_pairs: Optional[Iterable[Sequence[str]]] = None, hub_cap: int = 200000):
+        """
+        Args:
+          relation_pairs: (r1, r2) pairs to index (default: every ordered pair of KG relations)
+          hub_cap: max |in_r1(x)| * |out_r2(x)| product expanded per intermediate x
+        """
+        self.kg = kg
+        self.hub_cap = int(hub_cap)
+        if relation_pairs is None:
+            rels = sorted(kg.relations)
+            relation_pairs = [(a, b) for a in rels for b in rels]
+        self.pairs: List[RelPair] = [(_norm_rel(a), _norm_rel(b)) for a, b in relation_pairs]
+        self.reach: Dict[RelPair, Dict[str, Set[str]]] = {}
+        self.hubs: Dict[RelPair, List[str]] = {}
+        t0 = time.perf_counter()
+        for pr in self.pairs:
+            self._build_pair(pr)
+        n = sum(len(ts) for m in self.reach.values() for ts in m.values())
+        print(f"[KG] Two-hop index: {len(self.pairs)} relation pairs, {n} reachable (h, t) entries, "
+              f"{sum(len(v) for v in self.hubs.values())} hub intermediates skipped "
+              f"in {time.perf_counter() - t0:.2f}s")
+
+    def _build_pair(self, pr: RelPair) -> None:
+        r1, r2 = pr
+        out, inc = self.kg.out, self.kg.inc
+        rows: Dict[str, Set[str]] = {}
+        hubs: List[str] = []
+        # every x that closes h -r1-> x -r2-> t: x has an incoming r1 and an outgoing r2
+        for (x, r), preds in inc.items():
+            if r != r1:
+                continue
+            succ = out.get((x, r2))
+            if not succ:
+                continue
+            if len(preds) * len(succ) > self.hub_cap:
+                hubs.append(x)
+                continue
+            for h in preds:
+                row = rows.get(h)
+                if row is None:
+                    rows[h] = set(succ)
+                else:
+                    row.update(succ)
+        self.reach[pr] = rows
+        self.hubs[pr] = sorted(hubs)
+
+    def _pair(self, r1: str, r2: str) -> RelPair:
+        pr = (_norm_rel(r1), _norm_rel(r2))
+        if pr not in self.reach:
+            raise KeyError(f"relation pair not indexed: {pr}")
+        return pr
+
+    def has_path2(self, head_cui: str, r1: str, r2: str, tail_cui: str) -> bool:
+        """True if head -r1-> x -r2-> tail for some x."""
+        pr = self._pair(r1, r2)
+        h, t = _norm_cui(head_cui), _norm_cui(tail_cui)
+        row = self.reach[pr].get(h)
+        if row is not None and t in row:
+            return True
+        out = self.kg.out
+        for x in self.hubs[pr]:
+            if t in out.get((x, pr[1]), ()) and x in out.get((h, pr[0]), ()):
+                return True
+        return False
+
+    def intermediates(self, head_cui: str, r1: str, r2: str, tail_cui: str) -> List[str]:
+        """Sorted x with head -r1-> x -r2-> tail (out_r1(head) ∩ in_r2(tail))."""
+        r1n, r2n = self._pair(r1, r2)
+        h, t = _norm_cui(head_cui), _norm_cui(tail_cui)
+        a = self.kg.out.get((h, r1n), set())
+        b = self.kg.inc.get((t, r2n), set())
+        small, big = (a, b) if len(a) <= len(b) else (b, a)
+        return sorted(x for x in small if x in big)
+
+    def reachable(self, head_cui: str, r1: str, r2: str) -> Set[str]:
+        """All tails reachable from head via r1 then r2 (hub intermediates included)."""
+        pr = self._pair(r1, r2)
+        h = _norm_cui(head_cui)
+        res = set(self.reach[pr].get(h, ()))
+        mids = self.kg.out.get((h, pr[0]), ())
+        for x in self.hubs[pr]:
+            if x in mids:
+                res.update(self.kg.out.get((x, pr[1]), ()))
+        return res
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Two-hop reachability index smoke test")
+    ap.add_argument("--kg", required=True)
+    ap.add_argument("--schema", default=None, help="take relation pairs from relation_schema.json")
+    ap.add_argument("--hub_cap", type=int, default=200000)
+    ap.add_argument("--check", default=None, help="HEAD,R1,R2,TAIL")
+    args = ap.parse_args()
+
+    kg = KG(args.kg)
+    pairs = pairs_from_schema(args.schema) if args.schema else None
+    idx = TwoHopIndex(kg, relation_pairs=pairs, hub_cap=args.hub_cap)
+    if args.check:
+        parts = [p.strip() for p in args.check.split(",")]
+        if len(parts) != 4:
+            print("Invalid --check (expected HEAD,R1,R2,TAIL)")
+            raise SystemExit(2)
+        h, r1, r2, t = parts
+        print("has_path2:", idx.has_path2(h, r1, r2, t))
+        print("intermediates:", idx.intermediates(h, r1, r2, t)[:20])
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_snapshot
+Versioned binary KG snapshot (node/relation vocab + int32 edge arrays) and the
+single edge loader shared by KG, run_hybrid and the scripts.
+
+Compile once:
+  python src/graphcorag/kg_snapshot.py --kg data/kg_edges.merged.csv
+which writes data/kg_edges.merged.csv.kgsnap next to the CSV. iter_kg_edges()
+then reads the snapshot (memory-mapped, no CSV parsing) whenever it is fresh and
+falls back to the CSV otherwise. --bloom also writes the per-relation edge filters
+(kg_bloom, data/kg_edges.merged.csv.kgbloom) KG(..., bloom=True) checks before exact lookups.
+"""
+from __future__ import annotations
+import csv, io, mmap, os, struct, sys
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from graphcorag.fileio import open_text
+except ImportError:  # run as a script by file path (src/ not on sys.path)
+    def open_text(path, mode="r", newline=None):
+        return io.open(path, mode, encoding="utf-8-sig", newline=newline)
+
+SNAPSHOT_EXT = ".kgsnap"
+SNAPSHOT_MAGIC = b"GCKGSNAP"
+SNAPSHOT_VERSION = 1
+
+# magic, version, n_nodes, n_rels, n_edges, node_blob_len, rel_blob_len, src_size, src_mtime_ns
+_HEADER = struct.Struct("<8sIIIQQQQq")
+
+_HEAD_NAMES = ("head", "h", "source", "subject")
+_REL_NAMES = ("relation", "rel", "r", "predicate")
+_TAIL_NAMES = ("tail", "t", "target", "object")
+
+Edge = Tuple[str, str, str]
+
+def _clean(x: Optional[str]) -> str:
+    return ("" if x is None else str(x).strip().strip('"').strip())
+
+def _pad(n: int, align: int = 8) -> int:
+    return (-n) % align
+
+def snapshot_path_for(kg_path: str) -> str:
+    """Default snapshot location for a KG CSV (sibling file with .kgsnap suffix)."""
+    return kg_path if kg_path.endswith(SNAPSHOT_EXT) else kg_path + SNAPSHOT_EXT
+
+# ------------------------------ CSV ------------------------------
+def iter_csv_edges(csv_path: str) -> Iterator[Edge]:
+    """
+    Yield stripped (head, relation, tail) rows from a KG CSV.
+    Tolerates a header (head/relation/tail, h/r/t, source/target, any order) or none.
+    """
+    with open_text(csv_path, "r", newline="") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        names = [_clean(c).lower() for c in first]
+        cols = (0, 1, 2)
+        if any(n in _HEAD_NAMES or n in _REL_NAMES or n in _TAIL_NAMES for n in names):
+            def _find(cands, default):
+                for i, n in enumerate(names):
+                    if n in cands:
+                        return i
+                return default
+            cols = (_find(_HEAD_NAMES, 0), _find(_REL_NAMES, 1), _find(_TAIL_NAMES, 2))
+            first = None
+        hi, ri, ti = cols
+        need = max(cols)
+        if first is not None and len(first) > need:
+            yield (_clean(first[hi]), _clean(first[ri]), _clean(first[ti]))
+        for row in reader:
+            if len(row) <= need:
+                continue
+            yield (_clean(row[hi]), _clean(row[ri]), _clean(row[ti]))
+
+# ------------------------------ snapshot ------------------------------
+class KGSnapshot:
+    """
+    Read-only view over a compiled snapshot. Edge arrays are memoryviews into an
+    mmap of the file (int32 ids into .nodes / .relations); nothing is copied.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._fh.close()
+            raise ValueError(f"Empty KG snapshot: {path}")
+        if len(self._mm) < _HEADER.size:
+            self._mm.close(); self._fh.close()
+            raise ValueError(f"Truncated KG snapshot: {path}")
+        (magic, version, n_nodes, n_rels, n_edges,
+         node_len, rel_len, self.src_size, self.src_mtime_ns) = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self._mm.close(); self._fh.close()
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"Not a KG snapshot: {path}")
+            raise ValueError(f"Unsupported KG snapshot version {version} (expected {SNAPSHOT_VERSION}): {path}")
+        self.version = version
+
+        off = _HEADER.size
+        node_blob = self._mm[off: off + node_len]; off += node_len + _pad(node_len)
+        rel_blob = self._mm[off: off + rel_len]; off += rel_len + _pad(rel_len)
+        self.nodes: List[str] = node_blob.decode("utf-8").split("\n") if n_nodes else []
+        self.relations: List[str] = rel_blob.decode("utf-8").split("\n") if n_rels else []
+
+        view = memoryview(self._mm)
+        width = 4 * n_edges
+        self.heads = view[off: off + width].cast("i"); off += width
+        self.rels = view[off: off + width].cast("i"); off += width
+        self.tails = view[off: off + width].cast("i")
+        self.n_edges = n_edges
+
+    def __len__(self) -> int:
+        return self.n_edges
+
+    def iter_edges(self) -> Iterator[Edge]:
+        nodes, rels = self.nodes, self.relations
+        for h, r, t in zip(self.heads, self.rels, self.tails):
+            yield (nodes[h], rels[r], nodes[t])
+
+    def is_fresh_for(self, csv_path: str) -> bool:
+        """True if the snapshot was compiled from csv_path as it is now on disk."""
+        try:
+            st = os.stat(csv_path)
+        except OSError:
+            return True  # source gone: the snapshot is all we have
+        return st.st_size == self.src_size and st.st_mtime_ns == self.src_mtime_ns
+
+    def close(self) -> None:
+        for mv in (self.heads, self.rels, self.tails):
+            mv.release()
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self) -> "KGSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def compile_snapshot(csv_path: str, out_path: Optional[str] = None) -> str:
+    """Parse csv_path once and write the binary snapshot. Returns the snapshot path."""
+    out_path = out_path or snapshot_path_for(csv_path)
+    node_id: dict = {}
+    rel_id: dict = {}
+    heads, rels, tails = array("i"), array("i"), array("i")
+    for h, r, t in iter_csv_edges(csv_path):
+        if not (h and r and t):
+            continue
+        heads.append(node_id.setdefault(h, len(node_id)))
+        rels.append(rel_id.setdefault(r, len(rel_id)))
+        tails.append(node_id.setdefault(t, len(node_id)))
+
+    for name, table in (("node", node_id), ("relation", rel_id)):
+        bad = next((s for s in table if "\n" in s), None)
+        if bad is not None:
+            raise ValueError(f"{name} with an embedded newline cannot be compiled: {bad!r}")
+    node_blob = "\n".join(node_id).encode("utf-8")
+    rel_blob = "\n".join(rel_id).encode("utf-8")
+    st = os.stat(csv_path)
+    if sys.byteorder != "little":
+        for a in (heads, rels, tails):
+            a.byteswap()
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(node_id), len(rel_id), len(heads),
+                             len(node_blob), len(rel_blob), st.st_size, st.st_mtime_ns))
+        f.write(node_blob); f.write(b"\0" * _pad(len(node_blob)))
+        f.write(rel_blob); f.write(b"\0" * _pad(len(rel_blob)))
+        heads.tofile(f); rels.tofile(f); tails.tofile(f)
+    os.replace(tmp, out_path)
+    print(f"[KG] Compiled snapshot: {len(heads)} edges, {len(node_id)} nodes, {len(rel_id)} relations -> {out_path}")
+    return out_path
+
+def open_snapshot(kg_path: str) -> Optional[KGSnapshot]:
+    """
+    Open the snapshot for kg_path (a .kgsnap file or a CSV with a sibling snapshot).
+    Returns None when there is no usable, fresh snapshot.
+    """
+    snap_path = snapshot_path_for(kg_path)
+    if not os.path.exists(snap_path):
+        return None
+    try:
+        snap = KGSnapshot(snap_path)
+    except ValueError as e:
+        print(f"[WARN] Ignoring KG snapshot: {e}", file=sys.stderr)
+        return None
+    if snap_path != kg_path and not snap.is_fresh_for(kg_path):
+        print(f"[WARN] KG snapshot is stale, re-parsing CSV: {kg_path}", file=sys.stderr)
+        snap.close()
+        return None
+    return snap
+
+def iter_kg_edges(kg_path: str) -> Iterator[Edge]:
+    """
+    Yield stripped (head, relation, tail) strings for every KG row, from the
+    snapshot when available and fresh, else from the CSV.
+    """
+    snap = open_snapshot(kg_path)
+    if snap is None:
+        yield from iter_csv_edges(kg_path)
+        return
+    with snap:
+        yield from snap.iter_edges()
+
+def iter_kg_nodes(kg_path: str) -> Iterator[str]:
+    """Yield every distinct node id (heads and tails) appearing in the KG."""
+    snap = open_snapshot(kg_path)
+    if snap is not None:
+        with snap:
+            yield from snap.nodes
+        return
+    seen = set()
+    for h, _, t in iter_csv_edges(kg_path):
+        for n in (h, t):
+            if n and n not in seen:
+                seen.add(n)
+                yield n
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Compile a KG CSV into a binary snapshot")
+    ap.add_argument("--kg", required=True, help="KG edges CSV")
+    ap.add_argument("--out", default=None, help=f"snapshot path (default: <kg>{SNAPSHOT_EXT})")
+    ap.add_argument("--bloom", action="store_true", help="also write per-relation Bloom filters (<kg>.kgbloom)")
+    ap.add_argument("--bloom_fpr", type=float, default=0.01, help="target false-positive rate of the filters")
+    args = ap.parse_args()
+    compile_snapshot(args.kg, args.out)
+    if args.bloom:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from graphcorag.kg_bloom import compile_bloom
+        compile_bloom(args.kg, fpr=args.bloom_fpr)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.kg_sparse
+Integer-encoded, array-backed view of KG for vectorized batch validation.
+
+- node / relation vocabularies (sorted, so ids are stable for a given KG)
+- per-relation sorted int64 edge keys (head_id * n_nodes + tail_id): has_edges() is
+  one np.searchsorted per relation present in the batch
+- per-relation SciPy CSR adjacency matrices (n_nodes x n_nodes, bool), built lazily
+
+Needs numpy; SciPy only for adjacency(). Obtain it through KG.matrices().
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from graphcorag.kg_loader import _norm_cui, _norm_rel
+
+TripleBatch = Union[np.ndarray, Sequence[Tuple[str, str, str]]]
+
+class KGMatrices:
+    def __init__(self, kg):
+        nodes = set()
+        for (h, _), tails in kg.out.items():
+            nodes.add(h)
+            nodes.update(tails)
+        self.nodes: List[str] = sorted(nodes)
+        self.relations: List[str] = sorted(kg.relations)
+        self.node_id: Dict[str, int] = {n: i for i, n in enumerate(self.nodes)}
+        self.rel_id: Dict[str, int] = {r: i for i, r in enumerate(self.relations)}
+        self.n_nodes = len(self.nodes)
+
+        per_rel: List[List[int]] = [[] for _ in self.relations]
+        nid, N = self.node_id, self.n_nodes
+        for (h, r), tails in kg.out.items():
+            base = nid[h] * N
+            per_rel[self.rel_id[r]].extend(base + nid[t] for t in tails)
+        # sorted unique keys per relation
+        self._keys: List[np.ndarray] = [np.unique(np.asarray(k, dtype=np.int64)) for k in per_rel]
+        self._csr: Dict[int, object] = {}
+
+    # ------------------------------ encoding ------------------------------
+    @staticmethod
+    def _lookup(values: Sequence[str], table: Dict[str, int], norm) -> np.ndarray:
+        """Map a column of strings to ids (-1 if unknown), normalizing each distinct value once."""
+        memo = {v: table.get(norm(v), -1) for v in set(values)}
+        return np.fromiter(map(memo.__getitem__, values), dtype=np.int64, count=len(values))
+
+    def encode(self, triples: Sequence[Tuple[str, str, str]]) -> np.ndarray:
+        """(n, 3) int64 array of (head_id, rel_id, tail_id); unknown names become -1."""
+        if len(triples) == 0:
+            return np.empty((0, 3), dtype=np.int64)
+        heads, rels, tails = zip(*triples)
+        out = np.empty((len(heads), 3), dtype=np.int64)
+        out[:, 0] = self._lookup(heads, self.node_id, _norm_cui)
+        out[:, 1] = self._lookup(rels, self.rel_id, _norm_rel)
+        out[:, 2] = self._lookup(tails, self.node_id, _norm_cui)
+        return out
+
+    # ------------------------------ validation ------------------------------
+    def has_edges(self, triples: TripleBatch) -> np.ndarray:
+        """
+        Vectorized has_edge over a batch. Accepts string triples or an already
+        encoded (n, 3) integer array; returns a bool array aligned with the input.
+        """
+        ids = triples if isinstance(triples, np.ndarray) and triples.dtype.kind in "iu" else self.encode(triples)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1, 3)
+        found = np.zeros(ids.shape[0], dtype=bool)
+        if ids.shape[0] == 0:
+            return found
+        known = (ids >= 0).all(axis=1)
+        keys = ids[:, 0] * self.n_nodes + ids[:, 2]
+        for r in np.unique(ids[known, 1]):
+            rk = self._keys[int(r)]
+            if rk.size == 0:
+                continue
+            sel = np.flatnonzero(known & (ids[:, 1] == r))
+            q = keys[sel]
+            pos = np.searchsorted(rk, q)
+            pos[pos == rk.size] = 0
+            found[sel] = rk[pos] == q
+        return found
+
+    # ------------------------------ matrices ------------------------------
+    def adjacency(self, relation: str):
+        """scipy.sparse.csr_matrix (bool) with A[h, t] = 1 iff (h, relation, t) in KG."""
+        from scipy.sparse import csr_matrix
+        r = self.rel_id.get(_norm_rel(relation))
+        if r is None:
+            raise KeyError(f"unknown relation: {relation}")
+        m = self._csr.get(r)
+        if m is None:
+            k = self._keys[r]
+            rows, cols = np.divmod(k, self.n_nodes)
+            m = csr_matrix((np.ones(k.size, dtype=bool), (rows, cols)), shape=(self.n_nodes, self.n_nodes))
+            self._csr[r] = m
+        return m
+
+    def ids(self, cuis: Sequence[str]) -> np.ndarray:
+        """Node ids for CUIs (-1 if unknown), e.g. to index rows of adjacency()."""
+        return np.fromiter((self.node_id.get(_norm_cui(c), -1) for c in cuis), dtype=np.int64, count=len(cuis))
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.matcher
+Multi-pattern substring matcher (Aho-Corasick): one pass over a text reports
+every pattern it contains, instead of one `pattern in text` scan per pattern.
+
+- case-insensitive by default (patterns and text are lowercased), i.e. the
+  same answer as `p.lower() in text.lower()` for every pattern p
+- uses pyahocorasick when installed, else a pure-Python automaton
+
+API:
+  m = Matcher(["adalimumab", "infliximab", "tnf"])
+  m.find_ids(text)   # {pattern index, ...}
+  m.find(text)       # {pattern, ...}
+
+The pure-Python automaton can be exported as flat arrays (export()) and
+rebuilt without re-running construction (Matcher.from_automaton()); the
+compiled dictionary snapshot stores it that way.
+"""
+from __future__ import annotations
+from collections import deque
+from array import array
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+try:
+    import ahocorasick as _ac
+except ImportError:
+    _ac = None
+
+BACKEND = "pyahocorasick" if _ac is not None else "python"
+
+class Matcher:
+    def __init__(self, patterns: Iterable[str], lowercase: bool = True, backend: str = "auto"):
+        """
+        Args:
+          patterns: duplicates (after lowercasing) share one automaton entry; empty ones never match
+          backend: "auto" (pyahocorasick when importable), "pyahocorasick" or "python"
+        """
+        self.patterns: List[str] = list(patterns)
+        self.lowercase = lowercase
+        keys: Dict[str, List[int]] = {}
+        for i, p in enumerate(self.patterns):
+            k = (p or "").lower() if lowercase else (p or "")
+            if k:
+                keys.setdefault(k, []).append(i)
+        self._keys = keys
+        if backend == "auto":
+            backend = "pyahocorasick" if _ac is not None else "python"
+        self.backend = backend
+        if backend == "pyahocorasick":
+            if _ac is None:
+                raise ImportError("pyahocorasick is not installed")
+            self._auto = _ac.Automaton()
+            for k, ids in keys.items():
+                self._auto.add_word(k, tuple(ids))
+            if keys:
+                self._auto.make_automaton()
+        else:
+            self._build(keys)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    @classmethod
+    def from_automaton(cls, patterns: Sequence[str], edge_off: Sequence[int], edge_chars: str,
+                       edge_tgt: Sequence[int], fail: Sequence[int], out_off: Sequence[int],
+                       out_ids: Sequence[int], lowercase: bool = True) -> "Matcher":
+        """
+        Rebuild a pure-Python matcher from export() arrays (CSR layout: state s owns
+        edges edge_off[s]:edge_off[s+1] and outputs out_off[s]:out_off[s+1]).
+        """
+        self = cls.__new__(cls)
+        self.patterns = list(patterns)
+        self.lowercase = lowercase
+        self.backend = "python"
+        self._keys = {}
+        for i, p in enumerate(self.patterns):
+            k = (p or "").lower() if lowercase else (p or "")
+            if k:
+                self._keys.setdefault(k, []).append(i)
+        tgt = list(edge_tgt)
+        offs = list(edge_off)
+        goto: List[Dict[str, int]] = []
+        add = goto.append
+        for a, b in zip(offs, offs[1:]):
+            # most trie states are chain links with a single edge
+            if b - a == 1:
+                add({edge_chars[a]: tgt[a]})
+            else:
+                add(dict(zip(edge_chars[a:b], tgt[a:b])))
+        ids = list(out_ids)
+        empty: FrozenSet[int] = frozenset()
+        oo = list(out_off)
+        self._goto = goto
+        self._fail = list(fail)
+        self._out = [frozenset(ids[a:b]) if b > a else empty for a, b in zip(oo, oo[1:])]
+        return self
+
+    def export(self) -> Tuple[array, str, array, array, array, array]:
+        """(edge_off, edge_chars, edge_tgt, fail, out_off, out_ids) of the pure-Python automaton."""
+        if self.backend != "python":
+            self._build(self._keys)
+        edge_off, edge_tgt, fail = array("i", [0]), array("i"), array("i", self._fail)
+        chars: List[str] = []
+        for g in self._goto:
+            chars.extend(g.keys())
+            edge_tgt.extend(g.values())
+            edge_off.append(len(edge_tgt))
+        out_off, out_ids = array("i", [0]), array("i")
+        for o in self._out:
+            out_ids.extend(sorted(o))
+            out_off.append(len(out_ids))
+        return edge_off, "".join(chars), edge_tgt, fail, out_off, out_ids
+
+    # ------------------------------ pure Python automaton ------------------------------
+    def _build(self, keys: Dict[str, List[int]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[FrozenSet[int]] = [frozenset()]
+        for k, ids in keys.items():
+            s = 0
+            for ch in k:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(frozenset())
+                s = nxt
+            out[s] = out[s] | frozenset(ids)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, nxt in goto[s].items():
+                queue.append(nxt)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # a state also reports everything its longest proper suffix reports
+                out[nxt] = out[nxt] | out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _scan_python(self, text: str) -> Set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                found |= out[s]
+        return found
+
+    # ------------------------------ API ------------------------------
+    def find_ids(self, text: str) -> Set[int]:
+        """Indexes (into self.patterns) of every pattern occurring in text."""
+        if not text or not self._keys:
+            return set()
+        if self.lowercase:
+            text = text.lower()
+        if self.backend == "pyahocorasick":
+            found: Set[int] = set()
+            for _, ids in self._auto.iter(text):
+                found.update(ids)
+            return found
+        return self._scan_python(text)
+
+    def find(self, text: str) -> Set[str]:
+        return {self.patterns[i] for i in self.find_ids(text)}
@@ -1,12 +1,201 @@
-﻿class NeuralReranker:
-    """
-    Minimal no-op reranker that just returns hits unchanged.
-    Each hit is expected to be a tuple: (score, doc_id)
-    Replace with your real reranker later.
-    """
-    def __init__(self, **kwargs):
-        pass
-
-    def rerank(self, hits):
-        # ensure it's a list of (score, doc_id)
-        return list(hits or [])
+# -*- coding: utf-8 -*-
+"""
+graphcorag.neural_reranker
+Cross-encoder reranking of the top-N fused hits.
+
+- Only the first top_n hits are scored; the rest keep their order after them,
+  on the model's scale (1 apart, below the lowest model score)
+- (query, passage) pairs from several queries go through the model together
+  (rerank_many), best-ranked pairs first
+- Pair scores are cached by (query hash, doc id) in a bounded LRU
+- time_budget_s: once a query batch runs past the budget, the remaining
+  pairs are not scored, which truncates N for the queries still waiting
+
+Hits are (score, doc_id) tuples in and out; (doc_id, score) and {"id", "score"}
+dicts are accepted as input too. Without a query, rerank() returns the hits unchanged.
+
+API: NeuralReranker(corpus_path="data/corpus.jsonl").rerank(hits, query="...")
+"""
+from __future__ import annotations
+import hashlib, io, json, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from graphcorag.fusion import hit_pairs
+
+ScoredHit = Tuple[float, Any]
+
+def _query_key(query: str) -> str:
+    return hashlib.sha1(" ".join(query.split()).lower().encode("utf-8")).hexdigest()[:16]
+
+def _doc_scores(hits: Any) -> List[Tuple[Any, float]]:
+    """[(doc_id, score), ...] from (score, doc_id) tuples (the reranker contract), (doc_id, score) or dicts."""
+    out: List[Tuple[Any, float]] = []
+    for h in hits or []:
+        if isinstance(h, (list, tuple)) and len(h) >= 2:
+            a, b = h[0], h[1]
+            if isinstance(b, (int, float)) and not isinstance(a, (int, float)):
+                out.append((a, float(b)))
+            else:
+                out.append((b, float(a)))
+        else:
+            out.extend(hit_pairs([h]))
+    return out
+
+def load_passages(corpus_path: str) -> Dict[str, str]:
+    """doc id -> text from a corpus JSONL ({"id", "text"} per line)."""
+    out: Dict[str, str] = {}
+    with io.open(corpus_path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            o = json.loads(line)
+            if o.get("id") and o.get("text"):
+                out[str(o["id"])] = o["text"]
+    return out
+
+class NeuralReranker:
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 passages: Optional[Mapping[str, str]] = None, corpus_path: Optional[str] = None,
+                 top_n: int = 50, batch_size: int = 32, max_length: int = 256,
+                 time_budget_s: Optional[float] = None, cache_size: int = 200000,
+                 device: str = "cpu", score_fn: Optional[Callable[[List[Tuple[str, str]]], Sequence[float]]] = None,
+                 **kwargs):
+        """
+        Args:
+          passages / corpus_path: doc id -> passage text (one of them is needed to rerank)
+          top_n: hits per query sent to the cross-encoder
+          time_budget_s: per-call wall-clock budget for model scoring (None = unlimited)
+          score_fn: optional callable [(query, passage)] -> scores used instead of the
+                    sentence-transformers CrossEncoder (loaded lazily on first use)
+        """
+        self.model_name = model_name
+        self.passages: Mapping[str, str] = passages if passages is not None else \
+            (load_passages(corpus_path) if corpus_path else {})
+        self.top_n = int(top_n)
+        self.batch_size = max(1, int(batch_size))
+        self.max_length = int(max_length)
+        self.time_budget_s = time_budget_s
+        self.cache_size = int(cache_size)
+        self.device = device
+        self._score_fn = score_fn
+        self._model = None
+        self._cache: "OrderedDict[Tuple[str, Any], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self.stats = {"pairs_scored": 0, "cache_hits": 0, "truncated": 0}
+
+    # ------------------------------ model ------------------------------
+    def _predict(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        if self._score_fn is not None:
+            return [float(s) for s in self._score_fn(pairs)]
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+            scores = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        return [float(s) for s in scores]
+
+    # ------------------------------ cache ------------------------------
+    def _cache_get(self, key: Tuple[str, Any]) -> Optional[float]:
+        with self._cache_lock:
+            s = self._cache.get(key)
+            if s is not None:
+                self._cache.move_to_end(key)
+            return s
+
+    def _cache_put(self, items: List[Tuple[Tuple[str, Any], float]]) -> None:
+        with self._cache_lock:
+            for key, s in items:
+                self._cache[key] = s
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ------------------------------ rerank ------------------------------
+    def rerank(self, hits, query: Optional[str] = None, top_n: Optional[int] = None) -> List[ScoredHit]:
+        """Rerank one query's hits; returns [(score, doc_id), ...]."""
+        if not query:
+            # ensure it's a list of (score, doc_id)
+            return [(s, d) for d, s in _doc_scores(hits)]
+        return self.rerank_many([query], [hits], top_n=top_n)[0]
+
+    def rerank_many(self, queries: Sequence[str], hits_lists: Sequence[Any],
+                    top_n: Optional[int] = None) -> List[List[ScoredHit]]:
+        """
+        Rerank several queries at once. Uncached pairs are scored in rank-major order
+        (every query's rank-1 hit, then every rank-2 hit, ...), so a budget cut trims
+        N evenly across queries instead of starving the last ones.
+        """
+        n = self.top_n if top_n is None else int(top_n)
+        runs = [_doc_scores(h) for h in hits_lists]
+        qkeys = [_query_key(q or "") for q in queries]
+        scores: List[Dict[Any, float]] = [{} for _ in runs]
+        todo: List[Tuple[int, int, Any]] = []  # (rank, query index, doc id)
+        for qi, pairs in enumerate(runs):
+            if not queries[qi]:
+                continue
+            queued = set()
+            for rank, (did, _) in enumerate(pairs[:n]):
+                if did in scores[qi] or did in queued:
+                    continue
+                queued.add(did)
+                cached = self._cache_get((qkeys[qi], did))
+                if cached is not None:
+                    scores[qi][did] = cached
+                    self.stats["cache_hits"] += 1
+                elif str(did) in self.passages:
+                    todo.append((rank, qi, did))
+        todo.sort(key=lambda x: (x[0], x[1]))
+
+        t0 = time.perf_counter()
+        for b in range(0, len(todo), self.batch_size):
+            if self.time_budget_s is not None and b and time.perf_counter() - t0 > self.time_budget_s:
+                self.stats["truncated"] += len(todo) - b
+                break
+            chunk = todo[b:b + self.batch_size]
+            out = self._predict([(queries[qi], self.passages[str(did)]) for _, qi, did in chunk])
+            fresh = []
+            for (_, qi, did), s in zip(chunk, out):
+                scores[qi][did] = s
+                fresh.append(((qkeys[qi], did), s))
+            self._cache_put(fresh)
+            self.stats["pairs_scored"] += len(chunk)
+
+        results: List[List[ScoredHit]] = []
+        for qi, pairs in enumerate(runs):
+            got = scores[qi]
+            if not got:
+                results.append([(s, d) for d, s in pairs])
+                continue
+            head = sorted(((s, d) for d, s in got.items()), key=lambda x: x[0], reverse=True)
+            # hits that were not scored (beyond top_n, no passage, cut by the budget) keep their order,
+            # rescored below the lowest model score so the list stays sorted by score
+            lo = head[-1][0]
+            tail = [(lo - 1.0 - i, d) for i, d in enumerate(d for d, _ in pairs if d not in got)]
+            results.append(head + tail)
+        return results
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Rerank BM25 hits for one query with a cross-encoder")
+    ap.add_argument("--corpus", required=True)
+    ap.add_argument("--dict", default=None)
+    ap.add_argument("--overlay", default=None)
+    ap.add_argument("--query", required=True)
+    ap.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    ap.add_argument("--topk", type=int, default=50)
+    ap.add_argument("--top_n", type=int, default=50)
+    ap.add_argument("--budget_ms", type=float, default=0.0, help="<=0: unlimited")
+    args = ap.parse_args()
+
+    from graphcorag.text_retriever import TextRetriever
+    hits = TextRetriever(args.corpus, args.dict, args.overlay).search(args.query, topk=args.topk)
+    rr = NeuralReranker(args.model, corpus_path=args.corpus, top_n=args.top_n,
+                        time_budget_s=(args.budget_ms / 1000.0 if args.budget_ms > 0 else None))
+    t0 = time.perf_counter()
+    ranked = rr.rerank(hits, query=args.query)
+    print(f"reranked in {(time.perf_counter() - t0) * 1000:.1f} ms  stats={rr.stats}")
+    for s, d in ranked[:10]:
+        print(f"{s:.4f}\t{d}")
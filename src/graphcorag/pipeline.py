@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.pipeline
+In-process analyze -> retrieve -> fuse -> validate pipeline. The KG (with its
+dictionary / overlay surface index), the retriever indexes, the path finder and
+the optional reranker are loaded once, on first use, and shared by every stage
+and every query -- an end-to-end run is a single interpreter.
+
+  pipe = Pipeline("data/corpus.jsonl", "data/kg_edges.merged.csv",
+                  dict_path="config/umls_dict.txt", overlay_path="config/umls_dict.overlay.json")
+  row  = pipe.analyze({"qid": "q1", "text": "Does alemtuzumab cause lymphopenia?"})
+  hits = pipe.retrieve(row["text"])            # {"bm25": [(doc_id, score)], "dense": [...]}
+  top  = pipe.fuse(hits, query=row["text"])    # [(doc_id, score), ...] (+ rerank)
+  kgr  = pipe.validate(row)                    # kg_verdicts / kg_paths / coverage / hops
+  pipe.run(rows, "out/run")                    # scrape_run_verbose.log, hybrid.outputs.jsonl, rl_eval.tsv
+
+Retrievers default to graphcorag.text_retriever / graphcorag.dense_retriever;
+pass factories={"bm25": ..., "dense": ...} to swap in others (e.g. the service's
+RemoteRetriever). CLI: python -m graphcorag {analyze,run,end2end} --help
+"""
+from __future__ import annotations
+import contextlib, importlib, importlib.util, itertools, os, sys, threading, time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from graphcorag.fileio import JsonlWriter, load_json, open_text
+from graphcorag.fusion import fuse
+from graphcorag.profiling import Profiler, count, print_summary, profile_hook, stage
+
+RETRIEVER_CLASSES = {"bm25": ("graphcorag.text_retriever", "TextRetriever"),
+                     "dense": ("graphcorag.dense_retriever", "DenseRetriever")}
+# retrievers each --mode queries (text: BM25, kg: dense, both: both)
+MODE_RETRIEVERS = {"text": ("bm25",), "kg": ("dense",), "both": ("bm25", "dense")}
+NEIGHBOR_RELATIONS = ("INTERACTS_WITH", "ADVERSE_EFFECT")
+RL_HEADER = "qid,qtype,rel,goal,phase,coverage,ter,top1_score,top1_id,reward,hops\n"
+
+def safe_cui(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip().lower()
+    if s in ("", "none", "null", "na", "n/a", "of"):  # guard "of" garbage value
+        return None
+    return str(v).strip()
+
+def _cui_type(cui: str) -> str:
+    return (cui or "").split("_", 1)[0].lower()
+
+def choose_head_tail(surfaces: List[Tuple[str, str]], rel: str) -> Tuple[Optional[str], Optional[str]]:
+    """(head, tail) CUIs by mention order: two drugs for INTERACTS_WITH, else drug/class -> other entity."""
+    cuis = list(dict.fromkeys(c for _, c in surfaces))
+    drugs = [c for c in cuis if _cui_type(c) in ("drug", "class")]
+    if rel == "INTERACTS_WITH":
+        return (drugs[0] if drugs else None), (drugs[1] if len(drugs) > 1 else None)
+    head = drugs[0] if drugs else (cuis[0] if cuis else None)
+    rest = [c for c in cuis if c != head and _cui_type(c) not in ("drug", "class")]
+    return head, (rest[0] if rest else None)
+
+class Pipeline:
+    def __init__(self, corpus: Optional[str], kg: str, dict_path: Optional[str] = None,
+                 overlay_path: Optional[str] = None, schema_path: Optional[str] = None,
+                 kg_bloom: bool = False, prune_candidates: bool = False,
+                 mode: str = "both", topk: int = 80,
+                 fusion: str = "rrf", fusion_weights: Optional[Dict[str, float]] = None, rrf_k: float = 60.0,
+                 dense_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 rerank_model: Optional[str] = None, rerank_top_n: int = 50, rerank_budget_ms: float = 0.0,
+                 retrieval_cache: Optional[str] = None, retrieval_cache_mb: float = 512.0,
+                 max_hops: int = 3, path_k: int = 5, path_fanout: int = 256, path_budget_ms: float = 0.0,
+                 path_max_expanded: int = 0,
+                 neighbor_rank: str = "specificity", neighbor_weights: Optional[str] = None,
+                 factories: Optional[Dict[str, Callable[[], Any]]] = None,
+                 sources: Optional[Dict[str, Optional[str]]] = None):
+        """
+        Args:
+          kg_bloom: per-relation Bloom filters in front of the KG's exact edge checks (kg_bloom;
+                    the compiled <kg>.kgbloom when fresh, else built in memory)
+          prune_candidates: analyze() keeps only the candidate triples the KG holds
+          mode: which retrievers are queried (text: BM25, kg: dense, both)
+          path_budget_ms: wall-clock cap per path search (<= 0: none); makes kg_paths depend on machine load
+          path_max_expanded: deterministic cap on nodes expanded per path search (<= 0: none)
+          neighbor_rank: edge weight ranking the first-hop verdict tails (kg_rank, e.g. "sources=1,specificity=0.5")
+          neighbor_weights: head,relation,tail,weight CSV for the "cooccurrence" weight
+          factories: name -> zero-arg constructor overriding the default retriever classes
+          sources: name -> file fingerprinted with the retrieval cache (defaults to the module file)
+        """
+        self.corpus = corpus
+        self.kg_path = kg
+        self.dict_path = dict_path
+        self.overlay_path = overlay_path
+        self.schema_path = schema_path
+        self.kg_bloom = kg_bloom
+        self.prune_candidates = prune_candidates
+        self.mode = mode
+        self.topk = topk
+        self.fusion = fusion
+        self.fusion_weights = fusion_weights
+        self.rrf_k = rrf_k
+        self.dense_model = dense_model
+        self.rerank_model = rerank_model
+        self.rerank_top_n = rerank_top_n
+        self.rerank_budget_ms = rerank_budget_ms
+        self.max_hops = max_hops
+        self.path_k = path_k
+        self.path_fanout = path_fanout
+        self.path_budget_ms = path_budget_ms
+        self.path_max_expanded = path_max_expanded
+        self.neighbor_rank = neighbor_rank
+        self.neighbor_weights = neighbor_weights
+        self.factories = dict(factories or {})
+        self.sources = dict(sources or {})
+        self.cache = None
+        if retrieval_cache:
+            from graphcorag.retrieval_cache import RetrievalCache
+            self.cache = RetrievalCache(retrieval_cache, max_mb=retrieval_cache_mb)
+
+        self._kg = None
+        self._ranking = None
+        self._finder = None
+        self._reranker = None
+        self._rerank_loaded = False
+        self._schema = None
+        self._cues = None
+        self._retrievers: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------ resources ------------------------------
+    @property
+    def kg(self):
+        if self._kg is None:
+            with self._lock:
+                if self._kg is None:
+                    from graphcorag.kg_loader import KG
+                    self._kg = KG(self.kg_path, dict_path=self.dict_path, overlay_path=self.overlay_path,
+                                  bloom=self.kg_bloom)
+        return self._kg
+
+    @property
+    def ranking(self):
+        """kg_rank.NeighborRanking over NEIGHBOR_RELATIONS: the first-hop verdict tails, best first."""
+        if self._ranking is None:
+            with self._lock:
+                if self._ranking is None:
+                    from graphcorag.kg_rank import NeighborRanking, load_edge_weights
+                    weights = load_edge_weights(self.neighbor_weights) if self.neighbor_weights else None
+                    self._ranking = NeighborRanking(self.kg, self.neighbor_rank, weights, relations=NEIGHBOR_RELATIONS)
+        return self._ranking
+
+    @property
+    def finder(self):
+        if self._finder is None:
+            with self._lock:
+                if self._finder is None:
+                    from graphcorag.kg_paths import PathFinder
+                    self._finder = PathFinder(self.kg, max_hops=self.max_hops, fanout=self.path_fanout,
+                                              time_budget_s=(self.path_budget_ms / 1000.0
+                                                             if self.path_budget_ms > 0 else None),
+                                              max_expanded=(self.path_max_expanded
+                                                            if self.path_max_expanded > 0 else None))
+        return self._finder
+
+    @property
+    def reranker(self):
+        if not self._rerank_loaded:
+            with self._lock:
+                if not self._rerank_loaded:
+                    if self.rerank_model:
+                        from graphcorag.neural_reranker import NeuralReranker
+                        self._reranker = NeuralReranker(
+                            self.rerank_model, corpus_path=self.corpus, top_n=self.rerank_top_n,
+                            time_budget_s=(self.rerank_budget_ms / 1000.0 if self.rerank_budget_ms > 0 else None))
+                    self._rerank_loaded = True
+        return self._reranker
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        if self._schema is None:
+            try:
+                self._schema = load_json(self.schema_path)
+            except Exception:
+                self._schema = {}
+        return self._schema
+
+    @property
+    def cues(self):
+        """Relation / intent cue engine: the built-in cues plus the schema's "cues" section."""
+        if self._cues is None:
+            from graphcorag.cues import CueEngine
+            self._cues = CueEngine.from_schema(self.schema)
+        return self._cues
+
+    def _build_retriever(self, name: str):
+        factory = self.factories.get(name)
+        if factory is not None:
+            return factory()
+        mod, cls = RETRIEVER_CLASSES[name]
+        cls = getattr(importlib.import_module(mod), cls)
+        if name == "bm25":
+            return cls(self.corpus, self.dict_path, self.overlay_path)
+        return cls(self.corpus, **self._settings(name))
+
+    def _settings(self, name: str) -> Dict[str, Any]:
+        """Constructor settings of a retriever beyond its files, part of its cache fingerprint."""
+        if name == "dense":
+            return {"model_name": self.dense_model}
+        return {}
+
+    def _source(self, name: str) -> Optional[str]:
+        if name in self.sources:
+            return self.sources[name]
+        spec = importlib.util.find_spec(RETRIEVER_CLASSES[name][0])
+        return spec.origin if spec else None
+
+    def retriever(self, name: str):
+        """The named retriever; with a retrieval cache its index is only built on a miss."""
+        r = self._retrievers.get(name)
+        if r is None:
+            with self._lock:
+                r = self._retrievers.get(name)
+                if r is None:
+                    if self.cache is not None:
+                        from graphcorag.retrieval_cache import CachedRetriever, retriever_fingerprint
+                        files = [self.corpus, self._source(name)]
+                        if name == "bm25":
+                            files[1:1] = [self.dict_path, self.overlay_path]
+                        r = CachedRetriever(lambda: self._build_retriever(name), self.cache,
+                                            retriever_fingerprint(name, files, **self._settings(name)), name)
+                    else:
+                        r = self._build_retriever(name)
+                    self._retrievers[name] = r
+        return r
+
+    def warm(self) -> "Pipeline":
+        """Load everything run() touches up front (worker threads then only read)."""
+        for name in MODE_RETRIEVERS[self.mode]:
+            self.retriever(name)
+        _ = self.ranking
+        _ = self.finder
+        _ = self.reranker
+        return self
+
+    # ------------------------------ stages ------------------------------
+    def analyze(self, ex: Dict[str, Any], signals: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """
+        Raw query -> structured row: surfaces (KG surface index + rules), detected
+        relations, candidate triples, intent; relations / head_cui / tail_cui are
+        filled in when the row does not carry them already. signals: the query's
+        cue labels (self.cues.scan), when already scanned.
+        """
+        from graphcorag.rules import extract_surfaces, augment_surfaces, detect_relations, generate_candidates
+        from graphcorag.intent_router import route_intent
+        out = dict(ex)
+        qtext = ex.get("text") or ex.get("question") or ""
+        out.setdefault("text", qtext)
+        kg = self.kg
+        with stage("analyze"):
+            sig = self.cues.scan(qtext) if signals is None else signals
+            surfaces = augment_surfaces(qtext, extract_surfaces(kg.surface2cui, qtext), sig)
+            rels = detect_relations(qtext, kg.relations or self.schema, surfaces, sig) or []
+            intent, cues = route_intent(qtext, [s for s, _ in surfaces], sig)
+            cand = generate_candidates(surfaces, rels, kg=kg if self.prune_candidates else None) or []
+        out["extracted_surfaces"] = surfaces
+        out["detected_relations"] = rels
+        out["candidates"] = cand
+        out.setdefault("intent", intent)
+        out.setdefault("relation_hint", cues)
+
+        if not out.get("relations"):
+            # prefer a relation the KG holds first-hop neighbors for, then the router's cues
+            ordered = sorted(rels, key=lambda r: r not in NEIGHBOR_RELATIONS) or \
+                [c for c in cues if c in kg.relations]
+            out["relations"] = ordered[:1] if ordered else []
+        rel = out["relations"][0] if out["relations"] else ""
+        if not safe_cui(out.get("head_cui")):
+            head, tail = choose_head_tail(surfaces, rel)
+            out["head_cui"] = head or ""
+            if tail and not safe_cui(out.get("tail_cui")):
+                out["tail_cui"] = tail
+        return out
+
+    def iter_analyze(self, rows: Iterable[Dict[str, Any]], preview: bool = True,
+                     batch: int = 10000) -> Iterator[Dict[str, Any]]:
+        """
+        analyze() every row, lazily; with preview, the candidate triples of each
+        batch of rows are checked against the KG in one vectorized call.
+        """
+        it = iter(rows)
+        while True:
+            raw = list(itertools.islice(it, batch))
+            if not raw:
+                return
+            signals = self.cues.scan_many(ex.get("text") or ex.get("question") or "" for ex in raw)
+            chunk = [self.analyze(ex, sig) for ex, sig in zip(raw, signals)]
+            if preview:
+                self._preview(chunk)
+            yield from chunk
+
+    def analyze_many(self, rows: Iterable[Dict[str, Any]], preview: bool = True) -> List[Dict[str, Any]]:
+        return list(self.iter_analyze(rows, preview=preview))
+
+    def _preview(self, rows: List[Dict[str, Any]]) -> None:
+        flat = [tuple(c) for r in rows for c in r["candidates"]]
+        present = self.check_edges(flat)
+        pos = 0
+        for r in rows:
+            cand = r["candidates"]
+            if not cand:
+                continue
+            hits = present[pos: pos + len(cand)]
+            pos += len(cand)
+            r["kg_verdicts_preview"] = [{"edge": list(c), "present": p} for c, p in zip(cand, hits)]
+            r["coverage_preview"] = sum(hits) / max(1, len(cand))
+
+    def check_edges(self, triples: List[Tuple[str, str, str]]) -> List[bool]:
+        """Vectorized has_edges; per-edge fallback without numpy."""
+        if not triples:
+            return []
+        try:
+            return [bool(x) for x in self.kg.has_edges(triples)]
+        except ImportError:
+            return [bool(self.kg.has_edge(h, r, t)) for h, r, t in triples]
+
+    def retrieve(self, text: str, topk: Optional[int] = None) -> Dict[str, List[Tuple[Any, float]]]:
+        topk = self.topk if topk is None else topk
+        return {name: self.search(name, text, topk) for name in MODE_RETRIEVERS[self.mode]}
+
+    def search(self, name: str, text: str, topk: Optional[int] = None):
+        """One retriever's raw hits ([] when the mode does not query it)."""
+        if name not in MODE_RETRIEVERS[self.mode]:
+            return []
+        return self.retriever(name).search(text, topk=self.topk if topk is None else topk)
+
+    def fuse(self, runs: Dict[str, Any], query: Optional[str] = None) -> List[Tuple[Any, float]]:
+        """Fused top-k [(doc_id, score)]; the cross-encoder (if configured) reorders the head."""
+        count("fuse.candidates", sum(len(v) for v in runs.values()))
+        with stage("fuse"):
+            top = fuse(runs, self.fusion, self.fusion_weights, self.topk, self.rrf_k)
+        if query:
+            top = self.rerank_many([top], [query])[0]
+        return top
+
+    def rerank_many(self, tops: List[List[Tuple[Any, float]]], queries: List[str]) -> List[List[Tuple[Any, float]]]:
+        """Cross-encoder over several queries' fused tops (fuse(runs) without query) in shared batches."""
+        reranker = self.reranker
+        idx = [i for i, (top, q) in enumerate(zip(tops, queries)) if top and q]
+        if reranker is None or not idx:
+            return tops
+        # (score, doc_id) in and out
+        with stage("rerank"):
+            ranked = reranker.rerank_many([queries[i] for i in idx], [[(s, d) for d, s in tops[i]] for i in idx])
+        tops = list(tops)
+        for i, out in zip(idx, ranked):
+            tops[i] = [(d, s) for s, d in out]
+        return tops
+
+    def validate(self, ex: Dict[str, Any]) -> Dict[str, Any]:
+        """First-hop KG verdicts for (head, relation) plus up to path_k head -> tail paths."""
+        rels = ex.get("relations") or []
+        head = safe_cui(ex.get("head_cui"))
+        tail = safe_cui(ex.get("tail_cui"))
+        qtype = "unknown"
+        hop_count = 1
+        kg_verdicts = []
+        coverage = 0.0
+        if rels and head:
+            ranking = self.ranking
+            for rel in rels:
+                rel = rel.strip()
+                tails = ranking.top_k(head, rel, 8)
+                count("kg.neighbor_lookups")
+                if tails:
+                    # the 8 best-ranked neighbors (read from the ranking, not edge checks)
+                    count("kg.verdict_neighbors", len(tails))
+                    for t in tails:
+                        kg_verdicts.append({"edge": (head, rel, t), "present": True})
+                    coverage = 1.0 if kg_verdicts else 0.0
+                    qtype = "ddi" if rel == "INTERACTS_WITH" else "ae"
+                    break  # take the first relation that hits
+
+        # Multi-hop support: follow ex["relation_chain"] when given, else any relations up to max_hops
+        kg_paths = []
+        paths_truncated = False
+        if head and tail:
+            with stage("kg.paths"):
+                found = self.finder.find_paths(head, tail, relations=ex.get("relation_chain"), k=self.path_k)
+            count("kg.path_nodes_expanded", found.expanded)
+            kg_paths = [[list(e) for e in path] for path in found.paths]
+            paths_truncated = found.truncated
+            if found.paths:
+                hop_count = len(found.paths[0])
+        return {"head": head, "qtype": qtype, "hop_count": hop_count, "kg_verdicts": kg_verdicts,
+                "coverage": coverage, "kg_paths": kg_paths, "kg_paths_truncated": paths_truncated}
+
+    def assemble(self, qi: int, ex: Dict[str, Any], runs: Dict[str, Any], kgr: Dict[str, Any],
+                 top: Optional[List[Tuple[Any, float]]] = None) -> Tuple[str, Dict[str, Any], str]:
+        """Fuse (unless the fused, reranked top is given), then build the log block, the JSONL row and the rl_eval line for one query."""
+        qid   = ex.get("qid", f"Q{qi}")
+        qtext = ex.get("text") or ex.get("question") or ""
+        rels  = ex.get("relations") or []
+        top_sorted = self.fuse(runs, query=qtext) if top is None else top
+        top1 = top_sorted[0] if top_sorted else ("N/A", 0.0)
+        coverage, hop_count = kgr["coverage"], kgr["hop_count"]
+        kg_verdicts, kg_paths = kgr["kg_verdicts"], kgr["kg_paths"]
+
+        decision = "supported" if coverage > 0 else "insufficient_text_support"
+        reward   = 1.0 if coverage > 0 else 0.0
+        ter      = float(len(top_sorted))/float(self.topk or 1)
+
+        log = ["="*80,
+               f"Query {qi}: {qtext}",
+               f"text_topk: {len(top_sorted)} results; top1=({top1[0]}, {top1[1]})",
+               f"kg_verdicts: {kg_verdicts}"]
+        if kg_paths:
+            log.append(f"kg_paths: {kg_paths}")
+        if kgr.get("kg_paths_truncated"):
+            log.append("kg_paths_truncated: True")
+        log += [f"coverage: {coverage:.3f}",
+                f"decision: {decision}",
+                f"text_entity_recall@{self.topk}: {ter:.3f}",
+                f"hops: {hop_count}"]
+        jrow = {
+            "qid": qid, "text": qtext, "relations": rels, "head_cui": kgr["head"],
+            "kg_verdicts": kg_verdicts, "kg_paths": kg_paths, "kg_paths_truncated": kgr.get("kg_paths_truncated", False),
+            "coverage": coverage,
+            "decision": decision, "text_entity_recall@k": ter, "hops": hop_count
+        }
+        rl_line = (f"{qi},{kgr['qtype']},{rels[0] if rels else ''},{rels[0] if rels else ''},eval,"
+                   f"{coverage:.3f},{ter:.3f},{top1[1]},{top1[0]},{reward},{hop_count}\n")
+        return "\n".join(log) + "\n", jrow, rl_line
+
+    # ------------------------------ runner ------------------------------
+    def run(self, examples: Iterable[Dict[str, Any]], out_dir: str, concurrency: int = 1,
+            profile: bool = False, hook: Optional[str] = None) -> Dict[str, str]:
+        """
+        Retrieve + validate + fuse every example and write scrape_run_verbose.log,
+        hybrid.outputs.jsonl and rl_eval.tsv (in query order) to out_dir. examples
+        may be a generator (e.g. fileio.iter_jsonl); it is consumed as the run goes.
+        concurrency > 1 overlaps the BM25 / dense / KG stages of several queries and,
+        with a reranker, sends `concurrency` queries at a time through the cross-encoder.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        paths = {"log": os.path.join(out_dir, "scrape_run_verbose.log"),
+                 "out": os.path.join(out_dir, "hybrid.outputs.jsonl"),
+                 "rl":  os.path.join(out_dir, "rl_eval.tsv")}
+        self.warm()
+
+        # profile: per-query stage timings / counters (stage callables may run on worker threads)
+        prof = Profiler() if profile else None
+        recs = {}
+
+        def stages_for(qi, ex):
+            qtext = ex.get("text") or ex.get("question") or ""
+            st = {"bm25":  lambda: self.search("bm25", qtext),
+                  "dense": lambda: self.search("dense", qtext),
+                  "kg":    lambda: self.validate(ex)}
+            if prof is None:
+                return st
+            rec = recs[qi] = prof.start_query(ex.get("qid", f"Q{qi}"))
+            return {n: prof.bind(rec, fn, n) for n, fn in st.items()}
+
+        def finish(qi, ex, res, top=None):
+            runs = {"bm25": res["bm25"], "dense": res["dense"]}
+            if prof is None:
+                return self.assemble(qi, ex, runs, res["kg"], top=top)
+            rec = recs.pop(qi)
+            with prof.active(rec):
+                out = self.assemble(qi, ex, runs, res["kg"], top=top)
+            prof.finish_query(rec)
+            return out
+
+        # concurrent runs with a reranker: hold finished queries and rerank them in one batch
+        batch_rerank = concurrency > 1 and self.reranker is not None
+        held: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+
+        def flush(sink):
+            tops = []
+            for qi, ex, res in held:
+                with (prof.active(recs[qi]) if prof is not None else contextlib.nullcontext()):
+                    tops.append(self.fuse({"bm25": res["bm25"], "dense": res["dense"]}))
+            t0 = time.perf_counter()
+            tops = self.rerank_many(tops, [ex.get("text") or ex.get("question") or "" for _, ex, _ in held])
+            dt = time.perf_counter() - t0
+            for (qi, ex, res), top in zip(held, tops):
+                if prof is not None:
+                    recs[qi].add_time("rerank", dt)  # each query waited for the whole batch
+                sink(finish(qi, ex, res, top=top))
+            held.clear()
+
+        with open_text(paths["log"], "w") as log, \
+             JsonlWriter(paths["out"]) as jout, \
+             open_text(paths["rl"], "w") as rl:
+
+            rl.write(RL_HEADER)
+
+            def sink(out):
+                log_text, jrow, rl_line = out
+                log.write(log_text)
+                jout.write(jrow)
+                rl.write(rl_line)
+
+            with profile_hook(hook, os.path.join(out_dir, "hybrid.profile")):
+                if batch_rerank:
+                    from graphcorag.async_pipeline import run_ordered
+
+                    def hold(item):
+                        held.append(item)
+                        if len(held) >= concurrency:
+                            flush(sink)
+                    run_ordered(enumerate(examples, start=1), lambda _, item: stages_for(*item),
+                                lambda _, item, res: (item[0], item[1], res), hold, concurrency=concurrency)
+                    flush(sink)
+                elif concurrency > 1:
+                    from graphcorag.async_pipeline import run_ordered
+                    run_ordered(enumerate(examples, start=1), lambda _, item: stages_for(*item),
+                                lambda _, item, res: finish(item[0], item[1], res), sink,
+                                concurrency=concurrency)
+                else:
+                    for qi, ex in enumerate(examples, start=1):
+                        sink(finish(qi, ex, {n: fn() for n, fn in stages_for(qi, ex).items()}))
+
+        if prof is not None:
+            paths["profile"] = os.path.join(out_dir, "hybrid.profile.json")
+            print_summary(prof.write(paths["profile"]))
+        if self.cache is not None:
+            print(f"[cache] {self.cache.stats()}", file=sys.stderr)
+        return paths
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.profiling
+Lightweight per-query instrumentation: stage timers, counters, and an optional
+cProfile / pyinstrument hook around a whole run.
+
+Library code marks its hot sections unconditionally; with no active query
+record (the default) stage() returns a shared no-op context and count() is a
+single attribute lookup, so the markers cost next to nothing outside profiling.
+
+  from graphcorag.profiling import stage, count
+  with stage("bm25.score"):
+      ...
+  count("bm25.postings_scanned", len(posting))
+
+Runner side:
+  prof = Profiler()
+  rec = prof.start_query("Q1")
+  with prof.active(rec):          # in every thread that works on this query
+      ...
+  prof.finish_query(rec)
+  prof.write("out/hybrid.profile.json")   # per-query breakdowns + p50/p95/p99
+"""
+from __future__ import annotations
+import contextlib, json, math, sys, threading, time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+_local = threading.local()
+
+class QueryRecord:
+    __slots__ = ("qid", "stages", "counters", "t0", "total_s", "_lock")
+
+    def __init__(self, qid: Any):
+        self.qid = qid
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.t0 = time.perf_counter()
+        self.total_s = 0.0
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"qid": self.qid, "total_ms": round(self.total_s * 1000.0, 3),
+                "stages_ms": {k: round(v * 1000.0, 3) for k, v in self.stages.items()},
+                "counters": dict(self.counters)}
+
+class _Timer:
+    __slots__ = ("rec", "name", "t0")
+
+    def __init__(self, rec: QueryRecord, name: str):
+        self.rec = rec
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rec.add_time(self.name, time.perf_counter() - self.t0)
+        return False
+
+_NULL = contextlib.nullcontext()
+
+def stage(name: str):
+    """Time a block into the current thread's query record (no-op when none is active)."""
+    rec = getattr(_local, "record", None)
+    return _NULL if rec is None else _Timer(rec, name)
+
+def count(name: str, n: int = 1) -> None:
+    rec = getattr(_local, "record", None)
+    if rec is not None:
+        rec.add_count(name, n)
+
+def percentile(sorted_vals: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_vals:
+        return 0.0
+    i = max(0, min(len(sorted_vals) - 1, math.ceil(q / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[i]
+
+def _dist(vals_s: List[float]) -> Dict[str, float]:
+    v = sorted(x * 1000.0 for x in vals_s)
+    return {"n": len(v), "mean_ms": round(sum(v) / len(v), 3) if v else 0.0,
+            "p50_ms": round(percentile(v, 50), 3), "p95_ms": round(percentile(v, 95), 3),
+            "p99_ms": round(percentile(v, 99), 3), "max_ms": round(v[-1], 3) if v else 0.0,
+            "total_ms": round(sum(v), 3)}
+
+class Profiler:
+    def __init__(self):
+        self.records: List[QueryRecord] = []
+        self._lock = threading.Lock()
+        self.t0 = time.perf_counter()
+
+    def start_query(self, qid: Any) -> QueryRecord:
+        return QueryRecord(qid)
+
+    def finish_query(self, rec: QueryRecord) -> None:
+        rec.total_s = time.perf_counter() - rec.t0
+        with self._lock:
+            self.records.append(rec)
+
+    @contextlib.contextmanager
+    def active(self, rec: QueryRecord) -> Iterator[QueryRecord]:
+        """Make rec the current thread's record (stage()/count() land in it)."""
+        prev = getattr(_local, "record", None)
+        _local.record = rec
+        try:
+            yield rec
+        finally:
+            _local.record = prev
+
+    def bind(self, rec: QueryRecord, fn: Callable[[], Any], name: Optional[str] = None) -> Callable[[], Any]:
+        """Wrap a zero-arg stage callable so it runs with rec active (and is timed as `name`)."""
+        def _run():
+            with self.active(rec):
+                if name is None:
+                    return fn()
+                with stage(name):
+                    return fn()
+        return _run
+
+    def summary(self) -> Dict[str, Any]:
+        recs = sorted(self.records, key=lambda r: r.t0)
+        names = sorted({n for r in recs for n in r.stages})
+        cnames = sorted({n for r in recs for n in r.counters})
+        wall = time.perf_counter() - self.t0
+        return {
+            "queries": len(recs),
+            "wall_s": round(wall, 3),
+            "qps": round(len(recs) / wall, 3) if wall > 0 else 0.0,
+            "total": _dist([r.total_s for r in recs]),
+            "stages": {n: _dist([r.stages[n] for r in recs if n in r.stages]) for n in names},
+            "counters": {n: {"total": sum(r.counters.get(n, 0) for r in recs),
+                             "mean": round(sum(r.counters.get(n, 0) for r in recs) / max(1, len(recs)), 3)}
+                         for n in cnames},
+        }
+
+    def write(self, path: str, per_query: bool = True) -> Dict[str, Any]:
+        summ = self.summary()
+        out = {"summary": summ}
+        if per_query:
+            out["queries"] = [r.to_dict() for r in self.records]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=1)
+        return summ
+
+@contextlib.contextmanager
+def profile_hook(engine: Optional[str], out_base: str) -> Iterator[None]:
+    """
+    Whole-run profiler around a block: engine "cprofile" writes <out_base>.prof
+    (pstats; e.g. snakeviz), "pyinstrument" writes <out_base>.html. Both sample
+    the calling thread only. None = no hook.
+    """
+    if not engine:
+        yield
+        return
+    if engine == "pyinstrument":
+        try:
+            from pyinstrument import Profiler as _Pyi
+        except ImportError:
+            print("[profile] pyinstrument not installed; falling back to cProfile", file=sys.stderr)
+            engine = "cprofile"
+        else:
+            p = _Pyi()
+            p.start()
+            try:
+                yield
+            finally:
+                p.stop()
+                with open(out_base + ".html", "w", encoding="utf-8") as f:
+                    f.write(p.output_html())
+                print(f"[profile] {out_base}.html", file=sys.stderr)
+            return
+    import cProfile
+    p = cProfile.Profile()
+    p.enable()
+    try:
+        yield
+    finally:
+        p.disable()
+        p.dump_stats(out_base + ".prof")
+        print(f"[profile] {out_base}.prof", file=sys.stderr)
+
+def print_summary(summ: Dict[str, Any], file=sys.stderr) -> None:
+    t = summ["total"]
+    print(f"[profile] {summ['queries']} queries  {summ['qps']} q/s  "
+          f"p50={t['p50_ms']}ms p95={t['p95_ms']}ms p99={t['p99_ms']}ms", file=file)
+    for n, d in sorted(summ["stages"].items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"  {n:<22} p50={d['p50_ms']:>9.3f}  p95={d['p95_ms']:>9.3f}  p99={d['p99_ms']:>9.3f}  "
+              f"total={d['total_ms']:.1f}ms", file=file)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.retrieval_cache
+Persistent (SQLite) cache of retriever results.
+
+Key: (retriever fingerprint, normalized query, topk). The fingerprint hashes the
+retriever kind, its settings and the identity (path, size, mtime) of every file
+the index is built from (corpus, dict, overlay, retriever module), so editing
+any of them acts as a new index version and old entries are simply never hit.
+The KG is not part of it: a rerun that only changes the KG side is served
+entirely from the cache, and CachedRetriever never builds the underlying index.
+
+Size-bounded: least recently used rows are evicted once the stored results
+exceed max_mb. The file can be shared by several processes (WAL mode).
+
+API:
+  cache = RetrievalCache("out/.retrieval_cache.sqlite")
+  bm25 = CachedRetriever(lambda: TextRetriever(corpus, dict_path), cache,
+                         retriever_fingerprint("bm25", [corpus, dict_path]))
+  bm25.search(query, topk=80)   # [(doc_id, score), ...]
+"""
+from __future__ import annotations
+import hashlib, json, os, sqlite3, sys, threading, time, unicodedata
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from graphcorag.fusion import hit_pairs
+
+Hit = Tuple[Any, float]
+
+def normalize_query(query: str) -> str:
+    """NFKC, case-folded, whitespace-collapsed (what BM25 tokenization and uncased encoders ignore anyway)."""
+    return " ".join(unicodedata.normalize("NFKC", query or "").casefold().split())
+
+def _file_identity(path: Optional[str]) -> Optional[List[Any]]:
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [os.path.abspath(path), None, None]
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+def retriever_fingerprint(kind: str, files: Iterable[Optional[str]] = (), **settings: Any) -> str:
+    """Stable hash of retriever kind + settings + (path, size, mtime) of its input files."""
+    payload = {"kind": kind, "files": [_file_identity(p) for p in files],
+               "settings": {k: settings[k] for k in sorted(settings)}}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class RetrievalCache:
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        fingerprint TEXT NOT NULL,
+        query       TEXT NOT NULL,
+        topk        INTEGER NOT NULL,
+        hits        TEXT NOT NULL,
+        nbytes      INTEGER NOT NULL,
+        last_used   REAL NOT NULL,
+        PRIMARY KEY (fingerprint, query, topk)
+    );
+    CREATE INDEX IF NOT EXISTS results_lru ON results (last_used);
+    """
+
+    def __init__(self, path: str, max_mb: float = 512.0, evict_every: int = 1000):
+        """
+        Args:
+          max_mb: bound on the stored result payload; LRU rows beyond it are evicted
+          evict_every: puts between size checks
+        """
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.evict_every = max(1, int(evict_every))
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str, query: str, topk: int) -> Optional[List[Hit]]:
+        key = (fingerprint, normalize_query(query), int(topk))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hits FROM results WHERE fingerprint=? AND query=? AND topk=?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_used=? WHERE fingerprint=? AND query=? AND topk=?",
+                               (time.time(),) + key)
+            self.hits += 1
+        return [(d, s) for d, s in json.loads(row[0])]
+
+    def put(self, fingerprint: str, query: str, topk: int, hits: Any) -> List[Hit]:
+        """Store hits (any retriever output shape); returns them as [(doc_id, score), ...]."""
+        pairs = hit_pairs(hits)
+        blob = json.dumps(pairs, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (fingerprint, query, topk, hits, nbytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, normalize_query(query), int(topk), blob, len(blob), time.time()))
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict()
+        return pairs
+
+    def _evict(self) -> int:
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        # drop least recently used rows until 90% of the bound
+        excess = total - int(self.max_bytes * 0.9)
+        doomed = []
+        for rowid, nb in self._conn.execute("SELECT rowid, nbytes FROM results ORDER BY last_used"):
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= nb
+        self._conn.executemany("DELETE FROM results WHERE rowid=?", doomed)
+        return len(doomed)
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, nb = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+            fps = self._conn.execute("SELECT COUNT(DISTINCT fingerprint) FROM results").fetchone()[0]
+        return {"entries": n, "mb": round(nb / 1048576.0, 3), "fingerprints": fps,
+                "hits": self.hits, "misses": self.misses}
+
+    def clear(self, fingerprint: Optional[str] = None) -> None:
+        with self._lock:
+            if fingerprint:
+                self._conn.execute("DELETE FROM results WHERE fingerprint=?", (fingerprint,))
+            else:
+                self._conn.execute("DELETE FROM results")
+            self._conn.execute("VACUUM")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class CachedRetriever:
+    """
+    .search(query, topk) / .retrieve(query, topk) through the cache. The wrapped
+    retriever is built by factory() on the first miss only.
+    """
+
+    def __init__(self, factory: Callable[[], Any], cache: RetrievalCache, fingerprint: str, name: str = "retriever"):
+        self.factory = factory
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.name = name
+        self._inner = None
+        self._build_lock = threading.Lock()
+
+    @property
+    def inner(self):
+        if self._inner is None:
+            with self._build_lock:
+                if self._inner is None:
+                    print(f"[cache] building {self.name} (cache miss)", file=sys.stderr)
+                    self._inner = self.factory()
+        return self._inner
+
+    def search(self, query: str, topk: int = 100) -> List[Hit]:
+        got = self.cache.get(self.fingerprint, query, topk)
+        if got is not None:
+            return got
+        return self.cache.put(self.fingerprint, query, topk, self.inner.search(query, topk=topk))
+
+    retrieve = search
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect / trim a retrieval cache file")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--max_mb", type=float, default=512.0)
+    ap.add_argument("--evict", action="store_true", help="trim to --max_mb now")
+    ap.add_argument("--clear", action="store_true")
+    args = ap.parse_args()
+
+    c = RetrievalCache(args.db, max_mb=args.max_mb)
+    if args.clear:
+        c.clear()
+    if args.evict:
+        print(f"evicted {c.evict()} rows")
+    print(c.stats())
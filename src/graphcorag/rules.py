@@ -5,7 +5,9 @@ Rule-based candidate generator + small heuristics to fill common surfaces (e.g.,
 """
 from __future__ import annotations
 import re
-from typing import Dict, List, Optional, Tuple, Iterable, Set
+from typing import Dict, List, Optional, Tuple, Iterable, Set, AbstractSet, FrozenSet
+
+from graphcorag.cues import REL_KEYWORDS, default_engine
 
 _WORD_RE = re.compile(r"[A-Za-z0-9_]+", re.UNICODE)
 
@@ -36,33 +38,15 @@ def extract_surfaces(surface2cui: Dict[str,str], text: str) -> List[Tuple[str,st
     found.sort(key=lambda kv: q.find(kv[0]))
     return found
 
-# ── Updated keywords (added pregnancy-oriented cues) ───────────────────────────
-_REL_KW = {
-    "ADVERSE_EFFECT": [
-        "adverse effect","side effect","associated with","induces","causes","cough","nausea","toxicity"
-    ],
-    "CONTRAINDICATED_FOR": [
-        "contraindicated","avoid in","not recommended for",
-        "pregnancy","pregnant","teratogen","teratogenic","embryotoxic","fetal",
-        "safe in pregnancy"  # phrased as a question still triggers relation generation
-    ],
-    "TREATS": ["treat","treats","used for","indication","manage","management of","effective for"],
-    "FIRST_LINE": ["first line","first-line"],
-    "EFFECTIVE_IN": ["effective in","efficacy in"],
-    "REQUIRES_MONITORING": ["monitoring","requires monitoring","monitor"],
-    "INTERACTS_WITH": ["interacts with","interaction","drug interaction"],
-    "HAS_MEMBER": ["has member","includes"],
-    "MEMBER_OF": ["member of","class of","belongs to"]
-}
-
-def detect_relations(query_text: str, available: Iterable[str], surfaces: List[Tuple[str,str]]) -> List[str]:
-    q = _tok_lc(query_text)
+def detect_relations(query_text: str, available: Iterable[str], surfaces: List[Tuple[str,str]],
+                     signals: Optional[AbstractSet[str]] = None) -> List[str]:
+    """signals: the query's cue labels (graphcorag.cues), when the caller has scanned it already."""
+    sig = default_engine().scan(query_text) if signals is None else signals
     avail = {str(r).upper() for r in available}
-    chosen: List[str] = []
-    for rel, kws in _REL_KW.items():
-        if rel not in avail: continue
-        if any(kw in q for kw in kws):
-            chosen.append(rel)
+    chosen: List[str] = [rel for rel in REL_KEYWORDS if rel in avail and f"rel:{rel}" in sig]
+    # relations that only have cues from the schema's "cues" section
+    chosen += sorted(r for r in (lab[4:] for lab in sig if lab.startswith("rel:"))
+                     if r in avail and r not in REL_KEYWORDS)
 
     types = {_cui: _guess_type(_cui) for (_, _cui) in surfaces}
     has_drug_or_class = any(t in ("DRUG","CLASS") for t in types.values())
@@ -81,7 +65,7 @@ def detect_relations(query_text: str, available: Iterable[str], surfaces: List[T
         if has_drug_or_class and has_disease: _add("TREATS")
 
     # If the text mentions pregnancy and a drug/class is present, suggest CONTRAINDICATED_FOR
-    if ("pregnan" in q) and has_drug_or_class:
+    if ("pregnan" in sig) and has_drug_or_class:
         _add("CONTRAINDICATED_FOR")
 
     if has_class and has_drug:
@@ -89,45 +73,106 @@ def detect_relations(query_text: str, available: Iterable[str], surfaces: List[T
 
     return chosen
 
-def generate_candidates(surfaces: List[Tuple[str,str]], rels: List[str]) -> List[Tuple[str,str,str]]:
-    triples: List[Tuple[str,str,str]] = []
-    by_type = {cui: _guess_type(cui) for (_, cui) in surfaces}
+# relation -> (head types, tail types) a candidate triple may connect
+_DRUGLIKE = frozenset(("DRUG","CLASS"))
+REL_SIGNATURES: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {
+    "TREATS": (_DRUGLIKE, frozenset(("DISEASE",))),
+    "ADVERSE_EFFECT": (_DRUGLIKE, frozenset(("SYMPTOM",))),
+    "CONTRAINDICATED_FOR": (_DRUGLIKE, frozenset(("DISEASE","COND"))),
+    "FIRST_LINE": (_DRUGLIKE, frozenset(("DISEASE","COND","SYMPTOM"))),
+    "EFFECTIVE_IN": (_DRUGLIKE, frozenset(("DISEASE","COND","SYMPTOM"))),
+    "REQUIRES_MONITORING": (_DRUGLIKE, frozenset(("DISEASE","COND","SYMPTOM"))),
+    "INTERACTS_WITH": (_DRUGLIKE, _DRUGLIKE),
+    "MEMBER_OF": (frozenset(("DRUG",)), frozenset(("CLASS",))),
+    "HAS_MEMBER": (frozenset(("CLASS",)), frozenset(("DRUG",))),
+}
+
+def _candidate_index(cuis: List[str], rels: List[str]) -> List[Tuple[int,str,int]]:
+    """
+    (i, rel, j) surface positions of the candidate triples, deduplicated on (cui_i, rel, cui_j).
+    Surfaces are bucketed by type once; each relation only pairs its compatible buckets.
+    """
+    buckets: Dict[str, List[int]] = {}
+    for i, cui in enumerate(cuis):
+        buckets.setdefault(_guess_type(cui), []).append(i)
+    positions: Dict[FrozenSet[str], List[int]] = {}
+    def _at(types: FrozenSet[str]) -> List[int]:
+        pos = positions.get(types)
+        if pos is None:
+            pos = positions[types] = sorted(i for t in types for i in buckets.get(t, ()))
+        return pos
+
+    seen: Set[Tuple[str,str,str]] = set()
+    out: List[Tuple[int,str,int]] = []
     for rel in rels:
-        for i, (_, ci) in enumerate(surfaces):
-            for j, (_, cj) in enumerate(surfaces):
+        sig = REL_SIGNATURES.get(rel)
+        if sig is None: continue
+        heads = _at(sig[0])
+        tails = _at(sig[1]) if heads else []
+        for i in heads:
+            ci = cuis[i]
+            for j in tails:
                 if i == j: continue
-                ti, tj = by_type[ci], by_type[cj]
-                if rel == "TREATS":
-                    if ti in ("DRUG","CLASS") and tj == "DISEASE": triples.append((ci, rel, cj))
-                elif rel == "ADVERSE_EFFECT":
-                    if ti in ("DRUG","CLASS") and tj == "SYMPTOM": triples.append((ci, rel, cj))
-                elif rel == "CONTRAINDICATED_FOR":
-                    if ti in ("DRUG","CLASS") and tj in ("DISEASE","COND"): triples.append((ci, rel, cj))
-                elif rel in ("FIRST_LINE","EFFECTIVE_IN","REQUIRES_MONITORING"):
-                    if ti in ("DRUG","CLASS") and tj in ("DISEASE","COND","SYMPTOM"): triples.append((ci, rel, cj))
-                elif rel == "INTERACTS_WITH":
-                    if ti in ("DRUG","CLASS") and tj in ("DRUG","CLASS"): triples.append((ci, rel, cj))
-                elif rel == "MEMBER_OF":
-                    if ti == "DRUG" and tj == "CLASS": triples.append((ci, rel, cj))
-                elif rel == "HAS_MEMBER":
-                    if ti == "CLASS" and tj == "DRUG": triples.append((ci, rel, cj))
-    # Dedup
-    seen: Set[Tuple[str,str,str]] = set()
-    uniq: List[Tuple[str,str,str]] = []
-    for tr in triples:
-        if tr not in seen:
-            seen.add(tr); uniq.append(tr)
-    return uniq
+                tr = (ci, rel, cuis[j])
+                if tr not in seen:
+                    seen.add(tr); out.append((i, rel, j))
+    return out
 
-def augment_surfaces(query_text: str, surfaces: List[Tuple[str,str]]) -> List[Tuple[str,str]]:
+def generate_candidates(surfaces: List[Tuple[str,str]], rels: List[str], kg=None) -> List[Tuple[str,str,str]]:
+    """
+    Type-compatible (head, rel, tail) triples over the query's surfaces, in surface order.
+    With kg, only the triples the KG holds are kept: its Bloom filters (if any) drop most
+    non-edges, the rest get one vectorized exact check.
+    """
+    cuis = [cui for (_, cui) in surfaces]
+    index = _candidate_index(cuis, rels)
+    triples = [(cuis[i], rel, cuis[j]) for i, rel, j in index]
+    if kg is None or not triples:
+        return triples
+    try:
+        if getattr(kg, "bloom", None) is not None:
+            maybe = kg.might_have_edges(triples)
+            index = [ix for ix, m in zip(index, maybe) if m]
+            triples = [tr for tr, m in zip(triples, maybe) if m]
+            if not triples:
+                return []
+        present = kg.has_edges(candidate_array(surfaces, rels, kg.matrices(), index))
+    except ImportError:
+        present = [kg.has_edge(*tr) for tr in triples]
+    return [tr for tr, p in zip(triples, present) if p]
+
+def candidate_array(surfaces: List[Tuple[str,str]], rels: List[str], mats, index=None):
+    """
+    generate_candidates() as an (n, 3) int64 id array for KGMatrices.has_edges / KG.has_edges
+    (unknown CUIs / relations -> -1); each surface is encoded once, not once per triple.
+    """
+    import numpy as np
+    from graphcorag.kg_loader import _norm_rel
+    cuis = [cui for (_, cui) in surfaces]
+    if index is None:
+        index = _candidate_index(cuis, rels)
+    if not index:
+        return np.empty((0, 3), dtype=np.int64)
+    node_ids = mats.ids(cuis)
+    rel_ids = {r: mats.rel_id.get(_norm_rel(r), -1) for r in set(rels)}
+    heads, rs, tails = zip(*index)
+    out = np.empty((len(index), 3), dtype=np.int64)
+    out[:, 0] = node_ids[np.asarray(heads, dtype=np.int64)]
+    out[:, 1] = np.fromiter((rel_ids[r] for r in rs), dtype=np.int64, count=len(rs))
+    out[:, 2] = node_ids[np.asarray(tails, dtype=np.int64)]
+    return out
+
+def augment_surfaces(query_text: str, surfaces: List[Tuple[str,str]],
+                     signals: Optional[AbstractSet[str]] = None) -> List[Tuple[str,str]]:
     """
     Add common surfaces when the dict misses them (without touching data files).
     Currently: pregnancy → COND_PREGNANCY (runner will resolve to KG label 'PREGNANCY').
     """
-    q = _tok_lc(query_text)
+    if signals is None:
+        signals = default_engine().scan(query_text)
     have = {s for (s, _) in surfaces}
     extras: List[Tuple[str,str]] = []
-    if ("pregnan" in q) and ("pregnancy" not in have):
+    if ("pregnan" in signals) and ("pregnancy" not in have):
         extras.append(("pregnancy", "COND_PREGNANCY"))
     return surfaces + extras
 
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+graphcorag.service
+Long-lived local service: load TextRetriever, DenseRetriever, KG and the SapBERT
+index once, then answer analyze / retrieve / validate / paths requests over HTTP
+(JSON in, JSON out) from a threaded server.
+
+Server:
+  PYTHONPATH=src python -m graphcorag.service --corpus data/corpus.jsonl --kg data/kg_edges.merged.csv \
+      --dict config/umls_dict.txt --overlay config/umls_dict.overlay.json \
+      --schema config/relation_schema.json --dense --port 8765
+
+Client:
+  ServiceClient("http://127.0.0.1:8765").retrieve("does adalimumab interact ...", topk=80)
+  run_hybrid.py --service http://127.0.0.1:8765 ...   (retrieval goes to the warm server)
+
+Only retrieval is remote for run_hybrid: its KG verdicts and paths still come from
+a local KG, so they follow the run's own --path_* / --neighbor_* settings. The
+/validate and /paths endpoints serve other clients (ServiceClient.validate / .paths).
+A /retrieve request for a retriever the server did not load is an error (503).
+"""
+from __future__ import annotations
+import json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import request as _urlreq
+from urllib.error import HTTPError
+
+from graphcorag.fusion import hit_pairs
+from graphcorag.pipeline import Pipeline
+
+class Unavailable(RuntimeError):
+    """A requested resource was not loaded by this server (HTTP 503)."""
+
+class RetrievalService:
+    """
+    Warm resources + request handlers (usable in-process as well as behind the HTTP server).
+    Retrievers, KG, analysis and edge checks come from one graphcorag.pipeline.Pipeline,
+    so /analyze and /validate answer as `python -m graphcorag analyze` would.
+    """
+
+    def __init__(self, corpus: Optional[str], kg: str, dict_path: Optional[str] = None,
+                 overlay_path: Optional[str] = None, schema_path: Optional[str] = None,
+                 dense: bool = False, kg_bloom: bool = False,
+                 dense_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 sapbert_index: Optional[str] = None,
+                 sapbert_model: str = "cambridgeltl/SapBERT-from-PubMedBERT-fulltext"):
+        t0 = time.perf_counter()
+        self.pipe = Pipeline(corpus, kg, dict_path=dict_path, overlay_path=overlay_path, schema_path=schema_path,
+                             kg_bloom=kg_bloom, dense_model=dense_model)
+        self.bm25 = self.pipe.retriever("bm25") if corpus else None
+        self.dense = self.pipe.retriever("dense") if corpus and dense else None
+        self.kg = self.pipe.kg
+        self.paths = self.pipe.finder
+        _ = self.pipe.cues
+        self.sapbert = None
+        if sapbert_index:
+            self.sapbert = _SapbertLinker(sapbert_index, sapbert_model)
+        # model forward passes are serialized; index lookups run concurrently
+        self._dense_lock = threading.Lock()
+        self.load_s = time.perf_counter() - t0
+        print(f"[service] resources ready in {self.load_s:.2f}s", file=sys.stderr)
+
+    # ------------------------------ handlers ------------------------------
+    def health(self, _: Dict[str, Any]) -> Dict[str, Any]:
+        return {"bm25": self.bm25 is not None, "dense": self.dense is not None,
+                "sapbert": self.sapbert is not None, "kg_edges": len(self.kg.edge_set),
+                "load_s": round(self.load_s, 3)}
+
+    def retrieve(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        text = req.get("text") or ""
+        topk = int(req.get("topk", 80))
+        loaded = [n for n, r in (("bm25", self.bm25), ("dense", self.dense)) if r is not None]
+        which = req.get("retrievers") or loaded
+        missing = [n for n in which if n not in loaded]
+        if missing:
+            raise Unavailable(f"retriever(s) not loaded: {', '.join(missing)} (loaded: {', '.join(loaded) or 'none'})")
+        out: Dict[str, Any] = {}
+        if "bm25" in which:
+            out["bm25"] = hit_pairs(self.bm25.search(text, topk=topk))
+        if "dense" in which:
+            with self._dense_lock:
+                out["dense"] = hit_pairs(self.dense.search(text, topk=topk))
+        return out
+
+    def analyze(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline.analyze_many on one row: "text" plus optional qid / relations / head_cui / tail_cui."""
+        row = {k: v for k, v in req.items() if k not in ("link", "k", "preview")}
+        row["text"] = req.get("text") or ""
+        out = self.pipe.analyze_many([row], preview=bool(req.get("preview", True)))[0]
+        if self.sapbert is not None and req.get("link", True):
+            out["linked"] = {s: self.sapbert.nearest(s, int(req.get("k", 8))) for s, _ in out["extracted_surfaces"]}
+        return out
+
+    def validate(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"present": self.pipe.check_edges([tuple(t) for t in req.get("triples") or []])}
+        if req.get("head") and req.get("relation"):
+            limit = int(req.get("limit", 50))
+            if req.get("rank"):  # weight name / spec (kg_rank): best-ranked tails instead of the alphabetical first ones
+                out["neighbors"] = self.kg.top_neighbors(req["head"], req["relation"], limit, weight=req["rank"])
+            else:
+                out["neighbors"] = self.kg.neighbors(req["head"], req["relation"])[:limit]
+        return out
+
+    def find_paths(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        res = self.paths.find_paths(req.get("head") or "", req.get("tail") or "",
+                                    relations=req.get("relations"), k=int(req.get("k", 5)),
+                                    max_hops=req.get("max_hops"))
+        return res.to_dict()
+
+    def handlers(self):
+        return {"/health": self.health, "/retrieve": self.retrieve, "/analyze": self.analyze,
+                "/validate": self.validate, "/paths": self.find_paths}
+
+class _SapbertLinker:
+    """Mention -> nearest KG nodes over the index written by scripts/build_sapbert_index.py."""
+
+    def __init__(self, index_dir: str, model_name: str):
+        import nmslib
+        from sentence_transformers import SentenceTransformer
+        with open(os.path.join(index_dir, "ids.json"), "r", encoding="utf-8") as f:
+            self.row2node = [p[0] for p in json.load(f)["pairs"]]
+        self.index = nmslib.init(method="hnsw", space="cosinesimil")
+        self.index.loadIndex(os.path.join(index_dir, "nmslib_index.bin"))
+        self.model = SentenceTransformer(model_name)
+        self._lock = threading.Lock()
+
+    def nearest(self, surface: str, k: int) -> List[str]:
+        with self._lock:
+            v = self.model.encode([surface], convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+        idxs, _ = self.index.knnQuery(v[0], k=k)
+        return [self.row2node[i] for i in idxs]
+
+# ------------------------------ HTTP server ------------------------------
+def make_server(service: RetrievalService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    routes = service.handlers()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, code: int, obj: Dict[str, Any]) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self, req: Dict[str, Any]) -> None:
+            fn = routes.get(self.path.split("?", 1)[0])
+            if fn is None:
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+                return
+            try:
+                self._reply(200, fn(req))
+            except Unavailable as e:
+                self._reply(503, {"error": str(e)})
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self._dispatch({})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                req = json.loads(self.rfile.read(n) or b"{}")
+            except ValueError as e:
+                self._reply(400, {"error": f"bad JSON: {e}"})
+                return
+            self._dispatch(req)
+
+        def log_message(self, fmt, *a):  # keep stderr quiet under load
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+# ------------------------------ client ------------------------------
+class ServiceClient:
+    """Thin JSON-over-HTTP client for a running graphcorag.service."""
+
+    def __init__(self, url: str = "http://127.0.0.1:8765", timeout: float = 60.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        req = _urlreq.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with _urlreq.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except HTTPError as e:
+            raise RuntimeError(f"service {path} failed: {e.read().decode('utf-8', 'replace')}") from e
+
+    def health(self) -> Dict[str, Any]:
+        with _urlreq.urlopen(self.url + "/health", timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def retrieve(self, text: str, topk: int = 80, retrievers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """retrievers: names to query (default: every retriever the server loaded); unloaded ones raise."""
+        return self._post("/retrieve", {"text": text, "topk": topk, "retrievers": retrievers})
+
+    def analyze(self, text: str, link: bool = True, k: int = 8, **fields) -> Dict[str, Any]:
+        """fields: other row keys Pipeline.analyze honors (qid, relations, head_cui, tail_cui)."""
+        return self._post("/analyze", dict(fields, text=text, link=link, k=k))
+
+    def validate(self, triples: List[Tuple[str, str, str]], head: Optional[str] = None,
+                 relation: Optional[str] = None, limit: int = 50, rank: Optional[str] = None) -> Dict[str, Any]:
+        """rank: kg_rank weight spec; the limit neighbors are then the best-ranked ones, not the alphabetical first."""
+        return self._post("/validate", {"triples": [list(t) for t in triples], "head": head, "relation": relation,
+                                        "limit": limit, "rank": rank})
+
+    def paths(self, head: str, tail: str, relations: Optional[List[str]] = None, k: int = 5) -> Dict[str, Any]:
+        return self._post("/paths", {"head": head, "tail": tail, "relations": relations, "k": k})
+
+class RemoteRetriever:
+    """Drop-in for TextRetriever/DenseRetriever .search(query, topk) backed by the service."""
+
+    def __init__(self, client: ServiceClient, which: str):
+        self.client = client
+        self.which = which
+
+    def search(self, query: str, topk: int = 100) -> List[Tuple[str, float]]:
+        hits = self.client.retrieve(query, topk=topk, retrievers=[self.which])[self.which]
+        return [(h[0], h[1]) for h in hits]
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="graphcorag warm retrieval/KG service")
+    ap.add_argument("--corpus", default=None)
+    ap.add_argument("--kg", required=True)
+    ap.add_argument("--dict", default=None)
+    ap.add_argument("--overlay", default=None)
+    ap.add_argument("--schema", default=None, help="relation schema (relations / cues for /analyze)")
+    ap.add_argument("--dense", action="store_true", help="also load the dense retriever")
+    ap.add_argument("--kg_bloom", action="store_true", help="Bloom filters in front of the exact KG edge checks")
+    ap.add_argument("--dense_model", default="sentence-transformers/all-MiniLM-L6-v2")
+    ap.add_argument("--sapbert_index", default=None, help="dir written by build_sapbert_index.py")
+    ap.add_argument("--sapbert_model", default="cambridgeltl/SapBERT-from-PubMedBERT-fulltext")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    svc = RetrievalService(args.corpus, args.kg, dict_path=args.dict, overlay_path=args.overlay, schema_path=args.schema,
+                           dense=args.dense, kg_bloom=args.kg_bloom, dense_model=args.dense_model,
+                           sapbert_index=args.sapbert_index, sapbert_model=args.sapbert_model)
+    server = make_server(svc, args.host, args.port)
+    print(f"[service] listening on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -13,6 +13,13 @@ Also exposes a CLI for smoke tests.
 import json, math, re, sys
 from typing import Dict, List, Tuple, Optional
 
+try:
+    from graphcorag.profiling import stage, count
+except ImportError:  # loaded by file path without src/ on sys.path
+    import contextlib
+    def stage(name): return contextlib.nullcontext()
+    def count(name, n=1): pass
+
 _WORD_RE = re.compile(r"[A-Za-z0-9_]+", re.UNICODE)
 _STOP = set("""
 a an and are as at be but by for from has have if in into is it its of on or that the their there these this to was were which with
@@ -42,12 +49,18 @@ class TextRetriever:
                  use_rm3: bool = False,
                  rm3_fb_docs: int = 10,
                  rm3_fb_terms: int = 10,
-                 rm3_orig_weight: float = 0.6):
+                 rm3_orig_weight: float = 0.6,
+                 overlay_path: Optional[str] = None):
         """
         Args:
           chunk_size: if >0, index documents in sliding windows of token length
           chunk_stride: step for sliding windows (default = chunk_size)
-          dict_path: surface->CUI JSON (enables synonym expansion via CUI reverse map)
+          dict_path: surface->CUI JSON (enables synonym expansion via CUI reverse map), or a
+                     compiled dictionary snapshot (.dictsnap)
+          overlay_path: keyword only: if set, dict_path is a CUI->[surfaces] dict (umls_dict.txt)
+                        merged with this overlay through graphcorag.dict_snapshot (more dictionary
+                        phrases feed the expansion and phrase boost, so scores differ from the
+                        legacy positional call)
         """
         self.docs: Dict[str, str] = {}                 # doc_id -> raw lowercased text (chunk or full)
         self.doc_len: Dict[str, int] = {}              # doc_id -> token count
@@ -58,6 +71,7 @@ class TextRetriever:
         # --- legacy positional args compatibility ---
         # Old runner calls: TextRetriever(corpus_path, dict_path, overlay_path)
         # so our 'chunk_size' param may actually be a string dict_path.
+        cui_keyed = overlay_path is not None
         if isinstance(chunk_size, str):
             if dict_path is None and len(chunk_size) > 0:
                 dict_path = chunk_size
@@ -74,6 +88,9 @@ class TextRetriever:
         self.dict_path = dict_path
         self.dict: Dict[str, str] = {}
         self.cui2surfaces: Dict[str, List[str]] = {}
+        self._lexicon = None
+        self._dict_matcher = None
+        self._surface_rank: Dict[str, int] = {}
         self.dict_expansion_weight = float(dict_expansion_weight)
         self.phrase_boost = float(phrase_boost)
 
@@ -83,19 +100,27 @@ class TextRetriever:
         self.rm3_orig_weight = float(rm3_orig_weight)
 
         if self.dict_path:
-            self._load_dict(self.dict_path)
+            self._load_dict(self.dict_path, overlay_path, cui_keyed)
 
         self._load_corpus(corpus_path)
 
     # ------------------------------ loaders ------------------------------
-    def _load_dict(self, path: str) -> None:
-        with open(path, "r", encoding="utf-8-sig") as f:
-            raw = json.load(f)
-            self.dict = {str(k).strip().lower(): str(v).strip().upper() for k, v in raw.items()}
+    def _load_dict(self, path: str, overlay_path: Optional[str] = None, cui_keyed: bool = False) -> None:
+        if cui_keyed or path.endswith(".dictsnap"):
+            # merged dict + overlay (compiled snapshot when fresh); its automaton is reused for matching
+            from graphcorag.dict_snapshot import load_lexicon
+            self._lexicon = load_lexicon(path, overlay_path)
+            self.dict = {s: cuis[0].strip().upper() for s, cuis in self._lexicon.surface_index().items()}
+        else:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                raw = json.load(f)
+                self.dict = {str(k).strip().lower(): str(v).strip().upper() for k, v in raw.items()}
         for s, cui in self.dict.items():
             self.cui2surfaces.setdefault(cui, []).append(s)
         for cui in self.cui2surfaces:
             self.cui2surfaces[cui].sort(key=len, reverse=True)
+        # CUI-then-length order of the surfaces, the order the phrase boost lists them in
+        self._surface_rank = {s: i for i, s in enumerate(s for ss in self.cui2surfaces.values() for s in ss)}
         print(f"[TextRetriever] Loaded dict surfaces: {len(self.dict)} (CUIs: {len(self.cui2surfaces)})", file=sys.stderr)
 
     def _add_postings(self, doc_id: str, text: str) -> None:
@@ -165,6 +190,16 @@ class TextRetriever:
         return math.log((self.N - df + 0.5) / (df + 0.5) + 1.0)
 
     # ------------------------------ query expansion ------------------------------
+    def _dict_surfaces(self, text_lc: str) -> List[str]:
+        """Dictionary surfaces occurring in lowercased text (one Aho-Corasick pass), in cui2surfaces order."""
+        if self._dict_matcher is None:
+            if self._lexicon is not None:
+                self._dict_matcher = self._lexicon.matcher()
+            else:
+                from graphcorag.matcher import Matcher
+                self._dict_matcher = Matcher(self.dict)
+        return sorted(self._dict_matcher.find(text_lc), key=self._surface_rank.__getitem__)
+
     def _expand_query_from_dict(self, query_raw: str) -> Dict[str, float]:
         q_lower = (query_raw or "").lower()
         base_terms = _tok(q_lower)
@@ -175,10 +210,8 @@ class TextRetriever:
         if not self.cui2surfaces or not self.dict:
             return weights
 
-        present_cuis = set()
-        for surface, cui in self.dict.items():
-            if surface in q_lower:
-                present_cuis.add(cui)
+        # ordered (not a set): the weights' insertion order, and so the float sums, must not depend on the hash seed
+        present_cuis = dict.fromkeys(self.dict[s] for s in self._dict_surfaces(q_lower))
 
         for cui in present_cuis:
             for s in self.cui2surfaces.get(cui, []):
@@ -211,30 +244,45 @@ class TextRetriever:
         if self.N == 0:
             return []
 
-        if self.cui2surfaces:
-            term_w = self._expand_query_from_dict(query)
-        else:
-            term_w = {t: 1.0 for t in _tok(query)}
+        with stage("bm25.expand"):
+            if self.cui2surfaces:
+                term_w = self._expand_query_from_dict(query)
+            else:
+                term_w = {t: 1.0 for t in _tok(query)}
+        count("bm25.query_terms", len(term_w))
 
         scores: Dict[str, float] = {}
-        for qt, w in term_w.items():
-            posting = self.inverted.get(qt)
-            if not posting:
-                continue
-            idf = self._idf(qt)
-            for doc_id, tf in posting.items():
-                dl = self.doc_len.get(doc_id, 0)
-                contrib = idf * ((tf * (k1 + 1.0)) / (tf + k1 * (1.0 - b + b * (dl / (self.avgdl + 1e-9))) + 1e-9))
-                scores[doc_id] = scores.get(doc_id, 0.0) + (w * contrib)
+        with stage("bm25.score"):
+            for qt, w in term_w.items():
+                posting = self.inverted.get(qt)
+                if not posting:
+                    continue
+                count("bm25.postings_scanned", len(posting))
+                idf = self._idf(qt)
+                for doc_id, tf in posting.items():
+                    dl = self.doc_len.get(doc_id, 0)
+                    contrib = idf * ((tf * (k1 + 1.0)) / (tf + k1 * (1.0 - b + b * (dl / (self.avgdl + 1e-9))) + 1e-9))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + (w * contrib)
+        count("bm25.candidates", len(scores))
 
         # Phrase boost (exact substring of multiword phrases)
+        with stage("bm25.phrase"):
+            self._phrase_boost(query, scores)
+
+        with stage("bm25.sort"):
+            ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if not self.use_rm3 or not ranked:
+            return ranked[:max(0, int(topk))]
+
+        with stage("bm25.rm3"):
+            ranked = self._rm3_rescore(ranked, term_w, k1, b)
+        return ranked[:max(0, int(topk))]
+
+    def _phrase_boost(self, query: str, scores: Dict[str, float]) -> None:
         if self.phrase_boost > 0.0:
             phrases = _phrase_spans(query)
             if self.cui2surfaces:
-                for cui, ss in self.cui2surfaces.items():
-                    for s in ss:
-                        if " " in s and s in (query or "").lower():
-                            phrases.append(s.lower())
+                phrases.extend(s for s in self._dict_surfaces((query or "").lower()) if " " in s)
             phrases = list(dict.fromkeys([p for p in phrases if len(p) >= 5]))
             if phrases:
                 for doc_id in list(scores.keys()):
@@ -246,10 +294,8 @@ class TextRetriever:
                     if add:
                         scores[doc_id] += add
 
-        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
-        if not self.use_rm3 or not ranked:
-            return ranked[:max(0, int(topk))]
-
+    def _rm3_rescore(self, ranked: List[Tuple[str, float]], term_w: Dict[str, float],
+                     k1: float, b: float) -> List[Tuple[str, float]]:
         # RM3 second pass
         prf = self._rm3_terms(ranked, self.rm3_fb_docs, self.rm3_fb_terms)
         if prf:
@@ -273,7 +319,7 @@ class TextRetriever:
                     scores2[doc_id] = scores2.get(doc_id, 0.0) + (w * contrib)
             ranked = sorted(scores2.items(), key=lambda kv: kv[1], reverse=True)
 
-        return ranked[:max(0, int(topk))]
+        return ranked
 
 # ---------------- Backward-compat alias ----------------
 try:
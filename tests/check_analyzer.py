@@ -1,4 +1,7 @@
-import json, sys, collections, pathlib
+import json, os, sys, collections, pathlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from graphcorag.evaluation import analyzer_accuracy
 
 # Adjust if your project path changes
 proj = pathlib.Path(r"F:\graph-corag-clean")
@@ -26,36 +29,23 @@ def safe_rel(x):
 def acc(d):
     return 100.0*d["correct"]/max(1,d["total"])
 
+# per-query columns (intent_ok / relation_ok / has_head), scored in one pass
+cols = analyzer_accuracy([pred.get(i, {}) for i in gold], list(gold.values()))
+n = len(gold)
 stats = {
-    "intent": {"correct":0,"total":0},
-    "relation": {"correct":0,"total":0},
-    "head_cui_coverage": {"have":0,"total":0}
+    "intent": {"correct": int(cols["intent_ok"].sum()), "total": n},
+    "relation": {"correct": int(cols["relation_ok"].sum()), "total": n},
+    "head_cui_coverage": {"have": int(cols["has_head"].sum()), "total": n}
 }
 
 miss = []
-
-for idx, g in gold.items():
+for row, (idx, g) in enumerate(gold.items()):
     p = pred.get(idx, {})
-
-    # intent
-    stats["intent"]["total"] += 1
-    if p.get("intent") == g.get("intent"):
-        stats["intent"]["correct"] += 1
-    else:
+    if not cols["intent_ok"][row]:
         miss.append((idx, "intent", g.get("intent"), p.get("intent")))
-
-    # relation (just check the first relation label for now)
-    stats["relation"]["total"] += 1
-    if safe_rel(p) == g.get("relation"):
-        stats["relation"]["correct"] += 1
-    else:
+    if not cols["relation_ok"][row]:
         miss.append((idx, "relation", g.get("relation"), safe_rel(p)))
-
-    # head_cui coverage
-    stats["head_cui_coverage"]["total"] += 1
-    if p.get("head_cui"):
-        stats["head_cui_coverage"]["have"] += 1
-    else:
+    if not cols["has_head"][row]:
         miss.append((idx, "head_cui", "non-empty", p.get("head_cui")))
 
 print("\n=== Analyzer sanity report ===")
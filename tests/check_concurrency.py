@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Sequential vs concurrent run check (plain script, like check_import_time.py).
+
+Builds a small synthetic corpus and query set from the KG, runs Pipeline.run()
+once with concurrency=1 and once with --concurrency N on the same warm pipeline
+(text mode: BM25 + KG verdicts + paths, no model stack needed) and fails unless
+scrape_run_verbose.log, hybrid.outputs.jsonl and rl_eval.tsv are byte-identical.
+
+  python tests/check_concurrency.py [--kg data/kg_edges.merged.csv] [--dict ... --overlay ...]
+                                    [--n_queries 200] [--concurrency 4] [-v]
+"""
+import argparse, hashlib, json, os, random, sys, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from graphcorag.kg_snapshot import iter_kg_edges
+from graphcorag.pipeline import Pipeline
+
+OUTPUTS = ("log", "out", "rl")
+
+def _words(node):
+    return node.split("_", 1)[-1].replace("_", " ")
+
+def write_inputs(kg_path, tmp, n_queries, seed):
+    """corpus.jsonl (one sentence per sampled edge) and queries.jsonl (head/tail pairs, some a path apart)."""
+    edges = sorted(set(iter_kg_edges(kg_path)))
+    rng = random.Random(seed)
+    out = {}
+    for h, r, t in edges:
+        out.setdefault(h, []).append((r, t))
+    corpus = os.path.join(tmp, "corpus.jsonl")
+    with open(corpus, "w", encoding="utf-8") as f:
+        for i, (h, r, t) in enumerate(rng.sample(edges, min(len(edges), 4000))):
+            f.write(json.dumps({"id": f"d{i}", "text": f"{_words(h)} {r.lower().replace('_', ' ')} {_words(t)}"}) + "\n")
+    heads = sorted(out)
+    queries = os.path.join(tmp, "queries.jsonl")
+    with open(queries, "w", encoding="utf-8") as f:
+        for i in range(n_queries):
+            h = rng.choice(heads)
+            r1, mid = rng.choice(out[h])
+            # two-hop target when the middle node continues, else a random head
+            r, t = (rng.choice(out[mid]) if mid in out else (r1, rng.choice(heads)))
+            f.write(json.dumps({"qid": f"Q{i + 1}", "text": f"does {_words(h)} cause {_words(t)}?",
+                                "head_cui": h, "tail_cui": t, "relations": [r1]}) + "\n")
+    return corpus, queries
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--kg", default=os.path.join(ROOT, "data", "kg_edges.merged.csv"))
+    ap.add_argument("--dict", default=os.path.join(ROOT, "config", "umls_dict.txt"))
+    ap.add_argument("--overlay", default=os.path.join(ROOT, "config", "umls_dict.overlay.json"))
+    ap.add_argument("--n_queries", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--path_budget_ms", type=float, default=0.0, help="as in run_hybrid (>0 makes outputs load-dependent)")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus, queries = write_inputs(args.kg, tmp, args.n_queries, args.seed)
+        pipe = Pipeline(corpus, args.kg, dict_path=args.dict, overlay_path=args.overlay, mode="text",
+                        path_budget_ms=args.path_budget_ms)
+        runs = {}
+        for c in (1, args.concurrency):
+            rows = [json.loads(line) for line in open(queries, encoding="utf-8")]
+            paths = pipe.run(rows, os.path.join(tmp, f"c{c}"), concurrency=c)
+            runs[c] = {k: _digest(paths[k]) for k in OUTPUTS}
+            if args.verbose:
+                print(f"concurrency={c}: {runs[c]}")
+
+        seq, conc = runs[1], runs[args.concurrency]
+        failures = [k for k in OUTPUTS if seq[k] != conc[k]]
+        for k in failures:
+            print(f"FAIL  {k}: concurrency=1 {seq[k]} != concurrency={args.concurrency} {conc[k]}")
+    print(f"[concurrency] {len(OUTPUTS) - len(failures)}/{len(OUTPUTS)} outputs identical "
+          f"(1 vs {args.concurrency} workers, {args.n_queries} queries)")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
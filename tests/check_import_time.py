@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time budget check (plain script, like check_analyzer.py).
+
+Each target runs in a fresh interpreter; it fails if the wall time exceeds its
+budget or if a heavy ML module (torch, sentence_transformers, faiss, nmslib,
+transformers) got imported where it should not be.
+
+  python tests/check_import_time.py [--budget_s 1.0] [-v]
+"""
+import argparse, json, os, subprocess, sys, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+HEAVY = ("torch", "sentence_transformers", "faiss", "nmslib", "transformers")
+
+# (label, python code) -- the code prints the heavy modules it ended up importing
+_PROBE = "import sys, json; {body}; print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))"
+
+MODULE_TARGETS = [
+    "graphcorag",
+    "graphcorag.kg_loader",
+    "graphcorag.kg_paths",
+    "graphcorag.text_retriever",
+    "graphcorag.dense_retriever",
+    "graphcorag.neural_reranker",
+    "graphcorag.service",
+    "graphcorag.fusion",
+    "graphcorag.retrieval_cache",
+    "graphcorag.pipeline",
+    "graphcorag.matcher",
+    "graphcorag.evaluation",
+    "graphcorag.fileio",
+    "graphcorag.dict_snapshot",
+    "graphcorag.alias_store",
+    "graphcorag.kg_bloom",
+    "graphcorag.kg_rank",
+    "graphcorag.cues",
+    "graphcorag.rules",
+    "graphcorag.intent_router",
+]
+
+SCRIPT_TARGETS = [
+    ["scripts/run_hybrid.py", "--help"],
+    ["scripts/link_with_sapbert.py", "--help"],
+    ["scripts/build_sapbert_index.py", "--help"],
+    ["scripts/pre_analyze_raw.py", "--help"],
+    ["scripts/00_end2end_from_raw.py", "--help"],
+    ["-m", "graphcorag", "--help"],
+]
+
+def _run(cmd, env):
+    t0 = time.perf_counter()
+    p = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    return time.perf_counter() - t0, p
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--budget_s", type=float, default=1.0, help="per-target wall-clock budget")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC + os.pathsep + env.get("PYTHONPATH", "")
+    # baseline interpreter start, subtracted so the budget is about our imports
+    base, _ = _run([sys.executable, "-c", "pass"], env)
+    failures = 0
+
+    for mod in MODULE_TARGETS:
+        code = _PROBE.format(body=f"import {mod}", heavy=HEAVY)
+        dt, p = _run([sys.executable, "-c", code], env)
+        dt -= base
+        if p.returncode != 0:
+            print(f"FAIL  import {mod}: {(p.stderr.strip().splitlines() or ['error'])[-1]}")
+            failures += 1
+            continue
+        heavy = json.loads(p.stdout.strip().splitlines()[-1])
+        ok = dt <= args.budget_s and not heavy
+        failures += not ok
+        if args.verbose or not ok:
+            print(f"{'ok  ' if ok else 'FAIL'}  import {mod:<28} {dt * 1000:8.1f} ms  heavy={heavy}")
+
+    for script in SCRIPT_TARGETS:
+        dt, p = _run([sys.executable] + script, env)
+        dt -= base
+        ok = p.returncode == 0 and dt <= args.budget_s
+        failures += not ok
+        if args.verbose or not ok:
+            why = "" if p.returncode == 0 else "  " + (p.stderr.strip().splitlines() or ["error"])[-1]
+            print(f"{'ok  ' if ok else 'FAIL'}  {' '.join(script):<40} {dt * 1000:8.1f} ms{why}")
+
+    total = len(MODULE_TARGETS) + len(SCRIPT_TARGETS)
+    print(f"[import-time] {total - failures}/{total} within {args.budget_s:.2f}s without heavy imports")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+KG Bloom filter check (plain script, like check_concurrency.py).
+
+On a copy of the KG CSV it checks that
+  - every KG.edge_set member passes the filters (no false negatives), in memory
+    and after a save / load round trip of the .kgbloom file
+  - the loaded filters are bit-identical to the built ones
+  - KG(..., bloom=True).has_edges agrees with the exact check on edges and non-edges
+  - the false-positive rate on random non-edges stays near the target
+  - a stale filter file is ignored and closed
+
+  python tests/check_kg_bloom.py [--kg data/kg_edges.merged.csv] [--n_probes 20000] [-v]
+"""
+import argparse, os, random, shutil, sys, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+import numpy as np
+from graphcorag.kg_bloom import EdgeBloom, bloom_path_for, open_bloom
+from graphcorag.kg_loader import KG
+
+def non_edges(kg, n, seed):
+    """n random (head, relation, tail) triples of existing nodes / relations that are not KG edges."""
+    rng = random.Random(seed)
+    nodes = sorted({h for h, _, _ in kg.edge_set} | {t for _, _, t in kg.edge_set})
+    rels = sorted(kg.relations)
+    out = []
+    while len(out) < n:
+        tr = (rng.choice(nodes), rng.choice(rels), rng.choice(nodes))
+        if tr not in kg.edge_set:
+            out.append(tr)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--kg", default=os.path.join(ROOT, "data", "kg_edges.merged.csv"))
+    ap.add_argument("--n_probes", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    checks = []
+    def check(name, ok, detail=""):
+        checks.append(ok)
+        if not ok or args.verbose:
+            print(f"{'ok  ' if ok else 'FAIL'}  {name}{'  ' + detail if detail else ''}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kg_path = os.path.join(tmp, os.path.basename(args.kg))
+        shutil.copy2(args.kg, kg_path)
+        kg = KG(kg_path)
+        edges = sorted(kg.edge_set)
+        absent = non_edges(kg, args.n_probes, args.seed)
+
+        built = EdgeBloom.build(kg.edge_set)
+        check("built: every edge passes", bool(built.might_contain_many(edges).all()), f"{len(edges)} edges")
+
+        built.save(bloom_path_for(kg_path), kg_path)
+        loaded = open_bloom(kg_path)
+        check("round trip: file opens as fresh", loaded is not None)
+        if loaded is not None:
+            check("round trip: every edge passes", bool(loaded.might_contain_many(edges).all()))
+            same = set(loaded.filters) == set(built.filters) and all(
+                np.array_equal(loaded.filters[r].bits, built.filters[r].bits)
+                and loaded.filters[r].n_hashes == built.filters[r].n_hashes for r in built.filters)
+            check("round trip: filters bit-identical", same, f"{len(built.filters)} relations")
+            fpr = float(loaded.might_contain_many(absent).mean())
+            check("false-positive rate near target", fpr <= 3 * loaded.fpr,
+                  f"{fpr:.4f} on {len(absent)} non-edges (target {loaded.fpr})")
+            loaded.close()
+
+        kgb = KG(kg_path, bloom=True)
+        check("KG(bloom=True) uses the filters", kgb.bloom is not None)
+        probes = edges[:args.n_probes] + absent
+        # raw-cased strings too: the filters must normalize like the exact check
+        probes += [(h.upper(), r.lower(), t.upper()) for h, r, t in edges[:1000]]
+        exact = np.asarray(kg.has_edges(probes))
+        check("has_edges: bloom == exact", bool(np.array_equal(np.asarray(kgb.has_edges(probes)), exact)),
+              f"{len(probes)} probes")
+        check("might_have_edges: no false negatives", bool(kgb.might_have_edges(probes)[exact].all()))
+        kgb.bloom.close()
+
+        os.utime(kg_path, ns=(1, 1))  # the CSV changed: the file is stale
+        closed = []
+        close = EdgeBloom.close
+        EdgeBloom.close = lambda self: (closed.append(self._mm is not None), close(self))[1]
+        try:
+            stale = open_bloom(kg_path)
+        finally:
+            EdgeBloom.close = close
+        check("stale file ignored and closed", stale is None and closed == [True])
+
+    print(f"[kg_bloom] {sum(checks)}/{len(checks)} checks passed")
+    sys.exit(0 if all(checks) else 1)
+
+if __name__ == "__main__":
+    main()
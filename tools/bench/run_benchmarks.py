@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the retrieval / linking / KG-validation hot paths.
+
+Every (benchmark, scale) pair runs in its own child process so peak RSS is
+attributable; results (throughput, p50/p95/p99 latency, setup time, peak RSS)
+are written as one JSON document per run, tagged with the git commit, e.g.
+
+  python tools/bench/run_benchmarks.py --scales 10k,100k
+  python tools/bench/run_benchmarks.py --scales 10k --bench retrieve,kg_has_edge --compare out/bench/<old>.json
+
+Benchmarks:
+  retrieve          TextRetriever.retrieve(query, topk)
+  expand            TextRetriever._expand_query_from_dict(query)
+  extract_surfaces  rules.extract_surfaces(surface2cui, query)
+  kg_has_edge       KG.has_edge over present / absent triples
+  kg_neighbors      KG.neighbors(head, relation)
+  find_mentions     link_with_sapbert.find_mentions(query, matcher)
+  hybrid            run_hybrid.py query loop (--mode text), per-query totals from --profile
+"""
+import argparse, datetime, importlib.util, json, os, platform, random, subprocess, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, HERE)
+
+from graphcorag.profiling import percentile
+import synth
+
+BENCHES = ["retrieve", "expand", "extract_surfaces", "kg_has_edge", "kg_neighbors", "find_mentions", "hybrid"]
+
+def _peak_rss_mb():
+    try:
+        import resource
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(r / (1024.0 * 1024.0) if sys.platform == "darwin" else r / 1024.0, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mi = psutil.Process().memory_info()
+        return round(getattr(mi, "peak_wset", mi.rss) / 1048576.0, 1)
+    except ImportError:
+        return None
+
+def _load_script(rel_path, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, rel_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def _queries(d, n):
+    out = []
+    with open(os.path.join(d, "queries.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            out.append(json.loads(line))
+            if len(out) >= n:
+                break
+    return out
+
+def _timed_loop(fn, items, max_seconds):
+    lat = []
+    t_end = time.perf_counter() + max_seconds
+    for it in items:
+        t0 = time.perf_counter()
+        fn(it)
+        t1 = time.perf_counter()
+        lat.append(t1 - t0)
+        if t1 > t_end:
+            break
+    return lat
+
+# ------------------------------ benchmarks ------------------------------
+def bench_retrieve(d, qs, opts):
+    from graphcorag.text_retriever import TextRetriever
+    tr = TextRetriever(os.path.join(d, "corpus.jsonl"), dict_path=os.path.join(d, "surf2cui.json"))
+    return lambda q: tr.retrieve(q["text"], topk=opts.topk), qs
+
+def bench_expand(d, qs, opts):
+    from graphcorag.text_retriever import TextRetriever
+    tr = TextRetriever.__new__(TextRetriever)  # dict only; skip indexing the corpus
+    tr.dict, tr.cui2surfaces, tr.dict_expansion_weight = {}, {}, 0.7
+    tr._lexicon, tr._dict_matcher, tr._surface_rank = None, None, {}
+    tr._load_dict(os.path.join(d, "surf2cui.json"))
+    return lambda q: tr._expand_query_from_dict(q["text"]), qs
+
+def bench_extract_surfaces(d, qs, opts):
+    from graphcorag.rules import extract_surfaces
+    with open(os.path.join(d, "surf2cui.json"), "r", encoding="utf-8") as f:
+        s2c = json.load(f)
+    return lambda q: extract_surfaces(s2c, q["text"]), qs
+
+def _kg_probes(qs, n):
+    rng = random.Random(7)
+    heads = [q["head_cui"] for q in qs]
+    tails = [q["tail_cui"] for q in qs]
+    probes = []
+    for i in range(n):
+        q = qs[i % len(qs)]
+        if i % 2 == 0:
+            probes.append((q["head_cui"], q["relations"][0], q["tail_cui"]))
+        else:
+            probes.append((rng.choice(heads), q["relations"][0], rng.choice(tails)))
+    return probes
+
+def bench_kg_has_edge(d, qs, opts):
+    from graphcorag.kg_loader import KG
+    kg = KG(os.path.join(d, "kg.csv"))
+    probes = _kg_probes(qs, opts.kg_probes)
+    # batches of 1000 probes per timed op; latency reported per probe
+    batches = [probes[i:i + 1000] for i in range(0, len(probes), 1000)]
+    def run(batch):
+        for h, r, t in batch:
+            kg.has_edge(h, r, t)
+    return run, batches, 1000
+
+def bench_kg_neighbors(d, qs, opts):
+    from graphcorag.kg_loader import KG
+    kg = KG(os.path.join(d, "kg.csv"))
+    probes = [(h, r) for h, r, _ in _kg_probes(qs, opts.kg_probes)]
+    batches = [probes[i:i + 1000] for i in range(0, len(probes), 1000)]
+    def run(batch):
+        for h, r in batch:
+            kg.neighbors(h, r)
+    return run, batches, 1000
+
+def bench_find_mentions(d, qs, opts):
+    from graphcorag.dict_snapshot import load_lexicon
+    lws = _load_script(os.path.join("scripts", "link_with_sapbert.py"), "bench_link_with_sapbert")
+    matcher = load_lexicon(os.path.join(d, "cui2surfaces.json"), os.path.join(d, "overlay.json")).matcher()
+    return lambda q: lws.find_mentions(q["text"], matcher), qs
+
+def run_hybrid_bench(d, qs, opts):
+    """Runs the whole script once; per-query latencies come from its hybrid.profile.json."""
+    import tempfile
+    rh = _load_script(os.path.join("scripts", "run_hybrid.py"), "bench_run_hybrid")
+    with tempfile.TemporaryDirectory() as tmp:
+        qpath = os.path.join(tmp, "q.jsonl")
+        with open(qpath, "w", encoding="utf-8") as f:
+            for q in qs:
+                f.write(json.dumps(q) + "\n")
+        out = os.path.join(tmp, "out")
+        argv = ["run_hybrid.py", "--corpus", os.path.join(d, "corpus.jsonl"), "--kg", os.path.join(d, "kg.csv"),
+                "--dict", os.path.join(d, "surf2cui.json"), "--overlay", os.path.join(d, "overlay.json"),
+                "--schema", os.path.join(ROOT, "config", "relation_schema.json"), "--queries", qpath,
+                "--out", out, "--mode", "text", "--topk", str(opts.topk), "--profile",
+                "--bm25_mod_path", os.path.join(ROOT, "src", "graphcorag", "text_retriever.py"),
+                "--dense_mod_path", os.path.join(ROOT, "src", "graphcorag", "dense_retriever.py"),
+                # dense is never queried in text mode; the fresh cache keeps it from being built
+                "--retrieval_cache", os.path.join(tmp, "rc.sqlite")]
+        saved, sys.argv = sys.argv, argv
+        t0 = time.perf_counter()
+        try:
+            rh.main()
+        finally:
+            sys.argv = saved
+        wall = time.perf_counter() - t0
+        with open(os.path.join(out, "hybrid.profile.json"), "r", encoding="utf-8") as f:
+            prof = json.load(f)
+    # the first queries pay for building the BM25 index lazily; count them as setup
+    lat = [q["total_ms"] / 1000.0 for q in prof["queries"]]
+    return lat[opts.warmup:] if len(lat) > opts.warmup else lat, wall
+
+def run_one(bench, scale_name, n, opts):
+    d = synth.generate(scale_name, n, opts.data, seed=opts.seed, n_queries=max(opts.queries, 1000))
+    qs = _queries(d, opts.queries)
+    t0 = time.perf_counter()
+    per_op = 1
+    if bench == "hybrid":
+        lat, wall = run_hybrid_bench(d, qs, opts)
+        setup_s = wall - sum(lat)
+    else:
+        made = globals()[f"bench_{bench}"](d, qs, opts)
+        fn, items = made[0], made[1]
+        per_op = made[2] if len(made) > 2 else 1
+        setup_s = time.perf_counter() - t0
+        for it in items[:opts.warmup]:
+            fn(it)
+        lat = _timed_loop(fn, items, opts.max_seconds)
+    total = sum(lat)
+    ops = len(lat) * per_op
+    v = sorted(x * 1000.0 / per_op for x in lat)
+    return {
+        "bench": bench, "scale": scale_name, "n": n, "ops": ops,
+        "ops_per_s": round(ops / total, 2) if total > 0 else None,
+        "mean_ms": round(total * 1000.0 / ops, 4) if ops else None,
+        "p50_ms": round(percentile(v, 50), 4), "p95_ms": round(percentile(v, 95), 4),
+        "p99_ms": round(percentile(v, 99), 4),
+        "setup_s": round(setup_s, 3), "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(new, old_path):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["bench"], r["scale"]): r for r in json.load(f)["results"]}
+    print(f"{'bench':<18}{'scale':>7}{'p50 old':>11}{'p50 new':>11}{'ratio':>8}{'rss old':>9}{'rss new':>9}")
+    for r in new["results"]:
+        o = old.get((r["bench"], r["scale"]))
+        if not o or "error" in r or "error" in o:
+            continue
+        ratio = (r["p50_ms"] / o["p50_ms"]) if o["p50_ms"] else float("nan")
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{r['bench']:<18}{r['scale']:>7}{o['p50_ms']:>11.4f}{r['p50_ms']:>11.4f}{ratio:>8.2f}"
+              f"{str(o.get('peak_rss_mb')):>9}{str(r.get('peak_rss_mb')):>9}{flag}")
+
+def main():
+    ap = argparse.ArgumentParser(description="graphcorag hot-path benchmarks")
+    ap.add_argument("--scales", default="10k,100k", help="comma list of 10k,100k,1m,10m or integers")
+    ap.add_argument("--bench", default=",".join(BENCHES), help="comma list of " + ",".join(BENCHES))
+    ap.add_argument("--data", default=os.path.join(ROOT, "out", "bench", "data"))
+    ap.add_argument("--out", default=None, help="result JSON (default out/bench/bench-<commit>-<time>.json)")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--topk", type=int, default=80)
+    ap.add_argument("--kg_probes", type=int, default=100000)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--max_seconds", type=float, default=30.0, help="cap per timed loop")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--compare", default=None, help="previous result JSON to diff against")
+    ap.add_argument("--one", nargs=2, metavar=("BENCH", "SCALE"), help=argparse.SUPPRESS)
+    opts = ap.parse_args()
+
+    if opts.one:
+        name, n = synth.parse_scale(opts.one[1])
+        print(json.dumps(run_one(opts.one[0], name, n, opts)))
+        return
+
+    results = []
+    for s in opts.scales.split(","):
+        name, n = synth.parse_scale(s)
+        synth.generate(name, n, opts.data, seed=opts.seed, n_queries=max(opts.queries, 1000))
+        for b in opts.bench.split(","):
+            b = b.strip()
+            if b not in BENCHES:
+                raise SystemExit(f"unknown benchmark: {b}")
+            cmd = [sys.executable, os.path.abspath(__file__), "--one", b, s,
+                   "--data", opts.data, "--queries", str(opts.queries), "--topk", str(opts.topk),
+                   "--kg_probes", str(opts.kg_probes), "--warmup", str(opts.warmup),
+                   "--max_seconds", str(opts.max_seconds), "--seed", str(opts.seed)]
+            p = subprocess.run(cmd, capture_output=True, text=True)
+            if p.returncode != 0:
+                err = (p.stderr.strip().splitlines() or ["failed"])[-1]
+                print(f"[bench] {b}@{name}: {err}", file=sys.stderr)
+                results.append({"bench": b, "scale": name, "n": n, "error": err})
+                continue
+            r = json.loads(p.stdout.strip().splitlines()[-1])
+            print(f"[bench] {b:<16} {name:>5}  {r['ops_per_s']:>12} ops/s  p50={r['p50_ms']}ms "
+                  f"p95={r['p95_ms']}ms p99={r['p99_ms']}ms  rss={r['peak_rss_mb']}MB", file=sys.stderr)
+            results.append(r)
+
+    commit = _git_commit()
+    doc = {"meta": {"commit": commit, "time": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "queries": opts.queries, "seed": opts.seed},
+           "results": results}
+    out = opts.out or os.path.join(ROOT, "out", "bench",
+                                   f"bench-{commit or 'nogit'}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+    print(f"Wrote {out}")
+    if opts.compare:
+        compare(doc, opts.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic synthetic benchmark data at a given scale.
+
+  <out>/<scale>/corpus.jsonl        N docs   {"id", "text"}
+  <out>/<scale>/kg.csv              N edges  head,relation,tail (zipf heads -> hubs)
+  <out>/<scale>/surf2cui.json       surface -> CUI     (TextRetriever / rules format)
+  <out>/<scale>/cui2surfaces.json   CUI -> [surfaces]  (umls_dict.txt format)
+  <out>/<scale>/overlay.json        {}                 (overlay placeholder)
+  <out>/<scale>/queries.jsonl       templated questions with relations / head_cui / tail_cui
+
+Entities are max(1000, N // 10) drug_/disease_ CUIs with 1-3 surfaces each. Files are
+reused when <scale>/manifest.json matches (scale, seed, generator version).
+
+  python tools/bench/synth.py --scales 10k,100k --out out/bench/data
+"""
+import argparse, itertools, json, os, random, sys, time
+
+GEN_VERSION = 1
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+RELATIONS = [("INTERACTS_WITH", 0.45), ("ADVERSE_EFFECT", 0.35), ("TREATS", 0.2)]
+DOC_LEN = 40
+_SYL = ["ra", "zo", "mi", "tek", "lor", "vin", "dax", "pra", "sul", "fen", "nol", "ta", "cor", "bi", "xel", "mu"]
+
+def parse_scale(s):
+    s = s.strip().lower()
+    if s in SCALES:
+        return s, SCALES[s]
+    return s, int(float(s))
+
+def _zipf_cum(n, a=1.1):
+    acc, out = 0.0, []
+    for i in range(1, n + 1):
+        acc += 1.0 / (i ** a)
+        out.append(acc)
+    return out
+
+def _word(rng, lo=2, hi=4):
+    return "".join(rng.choice(_SYL) for _ in range(rng.randint(lo, hi)))
+
+def generate(scale_name, n, out_root, seed=13, n_queries=1000):
+    d = os.path.join(out_root, scale_name)
+    man_path = os.path.join(d, "manifest.json")
+    want = {"scale": n, "seed": seed, "version": GEN_VERSION, "queries": n_queries}
+    if os.path.exists(man_path):
+        with open(man_path, "r", encoding="utf-8") as f:
+            if json.load(f) == want:
+                return d
+    os.makedirs(d, exist_ok=True)
+    t0 = time.perf_counter()
+    rng = random.Random(seed)
+
+    # vocabulary (zipf) and entities
+    vocab = list(dict.fromkeys(_word(rng) for _ in range(20000)))
+    vcum = _zipf_cum(len(vocab))
+    n_ent = max(1000, n // 10)
+    drugs = [f"drug_e{i}" for i in range(n_ent // 2)]
+    diseases = [f"disease_e{i}" for i in range(n_ent - len(drugs))]
+    cui2surfs, surf2cui = {}, {}
+    for cui in itertools.chain(drugs, diseases):
+        surfs = []
+        for _ in range(rng.randint(1, 3)):
+            s = " ".join(_word(rng, 3, 5) for _ in range(rng.randint(1, 2)))
+            if s not in surf2cui:
+                surf2cui[s] = cui.upper()
+                surfs.append(s)
+        cui2surfs[cui] = surfs or [cui.split("_", 1)[1]]
+    with open(os.path.join(d, "cui2surfaces.json"), "w", encoding="utf-8") as f:
+        json.dump(cui2surfs, f)
+    with open(os.path.join(d, "surf2cui.json"), "w", encoding="utf-8") as f:
+        json.dump(surf2cui, f)
+    with open(os.path.join(d, "overlay.json"), "w", encoding="utf-8") as f:
+        f.write("{}")
+
+    # corpus: zipf words + 1-2 entity mentions per doc
+    all_ents = drugs + diseases
+    with open(os.path.join(d, "corpus.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(n):
+            toks = rng.choices(vocab, cum_weights=vcum, k=DOC_LEN)
+            for _ in range(rng.randint(1, 2)):
+                e = rng.choice(all_ents)
+                toks.insert(rng.randrange(len(toks)), rng.choice(cui2surfs[e]))
+            f.write(json.dumps({"id": f"D{i}", "text": " ".join(toks)}) + "\n")
+
+    # KG: zipf over heads so a few hubs carry many edges
+    hcum = _zipf_cum(len(drugs), 0.9)
+    rels, rcum = zip(*RELATIONS)
+    rcum = list(itertools.accumulate(rcum))
+    edges = []
+    with open(os.path.join(d, "kg.csv"), "w", encoding="utf-8", newline="") as f:
+        f.write("head,relation,tail\n")
+        for _ in range(n):
+            h = rng.choices(drugs, cum_weights=hcum)[0]
+            r = rng.choices(rels, cum_weights=rcum)[0]
+            t = rng.choice(drugs) if r == "INTERACTS_WITH" else rng.choice(diseases)
+            f.write(f"{h},{r},{t}\n")
+            if len(edges) < 4 * n_queries:
+                edges.append((h, r, t))
+
+    # queries grounded in existing edges (so KG lookups hit)
+    with open(os.path.join(d, "queries.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(n_queries):
+            h, r, t = edges[rng.randrange(len(edges))]
+            hs, ts = rng.choice(cui2surfs[h]), rng.choice(cui2surfs[t])
+            if r == "INTERACTS_WITH":
+                text = f"Does {hs} interact with {ts} when co-administered?"
+            elif r == "ADVERSE_EFFECT":
+                text = f"Is {ts} an adverse effect associated with {hs}?"
+            else:
+                text = f"Is {hs} used to treat {ts}?"
+            f.write(json.dumps({"qid": f"B{i}", "text": text, "relations": [r],
+                                "head_cui": h, "tail_cui": t}) + "\n")
+
+    with open(man_path, "w", encoding="utf-8") as f:
+        json.dump(want, f)
+    print(f"[synth] {scale_name}: {n} docs/edges, {n_ent} entities in {time.perf_counter() - t0:.1f}s -> {d}",
+          file=sys.stderr)
+    return d
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate synthetic benchmark corpora / dicts / KGs")
+    ap.add_argument("--scales", default="10k,100k", help="comma list of 10k,100k,1m,10m or integers")
+    ap.add_argument("--out", default=os.path.join("out", "bench", "data"))
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--queries", type=int, default=1000)
+    args = ap.parse_args()
+    for s in args.scales.split(","):
+        name, n = parse_scale(s)
+        generate(name, n, args.out, seed=args.seed, n_queries=args.queries)
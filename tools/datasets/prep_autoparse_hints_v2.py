@@ -1,15 +1,20 @@
 ﻿# -*- coding: utf-8 -*-
 import json, re, csv, io, os, sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from graphcorag.cues import CueEngine
+
 # Build a head-node resolver from both: KG nodes and (optionally) dict
 # We expect KG ids like "drug_tamoxifen", "drug_fluoxetine" etc.
 
-AE_PAT  = re.compile(r"(adverse|side[- ]?effect|safety|harm|untoward|complication|toxicit|unfavorable|untoward)", re.I)
-DDI_PAT = re.compile(r"(interact|co[- ]?prescrib|contraindicat|avoid(ed)? with|clash|co[- ]?medicat|serotonin syndrome|qt prolong)", re.I)
+AE_PAT  = r"(adverse|side[- ]?effect|safety|harm|untoward|complication|toxicit|unfavorable|untoward)"
+DDI_PAT = r"(interact|co[- ]?prescrib|contraindicat|avoid(ed)? with|clash|co[- ]?medicat|serotonin syndrome|qt prolong)"
+CUES = CueEngine({"INTERACTS_WITH": [DDI_PAT], "ADVERSE_EFFECT": [AE_PAT]})
 
 def infer_relation(q):
-    if DDI_PAT.search(q): return "INTERACTS_WITH"
-    if AE_PAT.search(q):  return "ADVERSE_EFFECT"
+    sig = CUES.scan(q)
+    if "INTERACTS_WITH" in sig: return "INTERACTS_WITH"
+    if "ADVERSE_EFFECT" in sig: return "ADVERSE_EFFECT"
     # fallback
     return "ADVERSE_EFFECT"
 
@@ -1,21 +1,12 @@
-﻿import json, sys
+﻿import json, os, sys
 from pathlib import Path
 
-base, overlay, out_node2surfs, out_surf2cui = sys.argv[1:]
-data = {}
-if Path(base).exists():
-    data = json.loads(Path(base).read_text(encoding="utf-8"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from graphcorag.dict_snapshot import load_lexicon
 
-if Path(overlay).exists():
-    over = json.loads(Path(overlay).read_text(encoding="utf-8"))
-    for cui, surfs in (over or {}).items():
-        lst = data.setdefault(cui, [])
-        seen = { (s or "").strip().lower() for s in lst }
-        for s in (surfs or []):
-            s = (s or "").strip()
-            if s and s.lower() not in seen:
-                lst.append(s)
-                seen.add(s.lower())
+base, overlay, out_node2surfs, out_surf2cui = sys.argv[1:]
+# merged dict + overlay (compiled snapshot when present); missing files are skipped
+data = load_lexicon(base if Path(base).exists() else None, overlay).cui2surfaces()
 
 # write merged node->surfaces (nice to keep)
 Path(out_node2surfs).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -1,44 +1,136 @@
-﻿import csv, json, re, os
+﻿# -*- coding: utf-8 -*-
+"""
+Alias variants for every KG node, e.g. drug_mmp_13 -> "mmp 13", "mmp-13", "mmp13", "mmp 13s".
 
-inp = r"C:\\Users\\abder\\Desktop\\new experiment with Kg2c dataset\\data\\kg_edges.CANON.csv"    # kg_edges.CANON.csv
-out = r"C:\\Users\\abder\\Desktop\\new experiment with Kg2c dataset\\config\\aliases.extra.json"  # aliases.extra.json
+Nodes are streamed from the KG (compiled .kgsnap snapshot or CSV, any size), variants are
+generated in worker processes, and every alias claimed by several nodes is resolved
+deterministically: the node for which it is the plain surface wins over hyphen/space swaps,
+then digit joins/splits, then plurals; remaining ties go to the smallest node id. Collisions
+are listed in an optional ambiguity report.
 
-def variants(canon_id):
-    m = re.match(r'^(drug|disease|gene|protein|chemical|metabolite|pathway|anatomy|cell|organism|exon|intron|rna|dna|enzyme|receptor|antibody|antigen)_(.+)$', canon_id)
-    base = m.group(2) if m else canon_id
-    surf = base.replace("_", " ")
-    cands = set([surf])
+  python tools/dict_builder/make_alias_overlay.py --kg data/kg_edges.merged.csv \
+      --out config/aliases.extra.json --report out/aliases.ambiguous.tsv --workers 8
 
-    # hyphen/space swaps
-    cands.add(surf.replace(" ", "-"))
-    cands.add(surf.replace("-", " "))
-    # naive plural
+Output (compact JSON, .gz / .zst by extension):
+  --format alias2id  {alias: node}, usable as KG(surf2cui_path=...)  (default)
+  --format overlay   {node: [aliases it won]}, usable as a dictionary overlay / compile-dict input
+"""
+import argparse, csv, itertools, os, re, sys, time
+from multiprocessing import Pool
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from graphcorag.fileio import dumps, open_text
+from graphcorag.kg_snapshot import iter_kg_nodes
+
+TYPE_PREFIXES = frozenset("drug disease gene protein chemical metabolite pathway anatomy cell organism "
+                          "exon intron rna dna enzyme receptor antibody antigen".split())
+# variant kinds in precedence order (lower wins a collision)
+KINDS = ("surface", "hyphen", "digits", "plural")
+_JOIN_DIGITS = re.compile(r"(\b[a-zA-Z]+)\s+(\d+)\b")   # "mmp 13" -> "mmp13"
+_SPLIT_DIGITS = re.compile(r"(\b[a-zA-Z]+)(\d+)\b")     # "mmp13" -> "mmp 13"
+_HAS_DIGIT = re.compile(r"\d").search
+
+def variants(node_id, min_len=3):
+    """{alias: kind index} for one node id; aliases are lowercased, shorter than min_len dropped."""
+    prefix, sep, rest = node_id.partition("_")
+    surf = (rest if sep and rest and prefix in TYPE_PREFIXES else node_id).replace("_", " ")
+    low = surf.lower()
+    # candidates in KINDS order, so the first occurrence of an alias carries its best kind
+    cands = [(low, 0), (low.replace(" ", "-"), 1), (low.replace("-", " "), 1)]
+    if _HAS_DIGIT(surf):
+        cands.append((_JOIN_DIGITS.sub(r"\1\2", surf).lower(), 2))
+        cands.append((_SPLIT_DIGITS.sub(r"\1 \2", surf).lower(), 2))
     if not surf.endswith("s"):
-        cands.add(surf + "s")
-    # "mmp 13" <-> "mmp13"
-    cands.add(re.sub(r'(\b[a-zA-Z]+)\s+(\d+)\b', r'\1\2', surf))
-    cands.add(re.sub(r'(\b[a-zA-Z]+)(\d+)\b', r'\1 \2', surf))
-
-    cands = {c.lower() for c in cands}
-    cands = {c for c in cands if len(c) >= 3}
-    return cands
-
-nodes = set()
-with open(inp, newline="", encoding="utf-8") as f:
-    r = csv.reader(f)
-    for row in r:
-        if not row or len(row) < 3:
+        cands.append((low + "s", 3))
+    out = {}
+    for alias, kind in cands:
+        if alias not in out and len(alias) >= min_len:
+            out[alias] = kind
+    return out
+
+def _chunk_variants(job):
+    nodes, min_len = job
+    return len(nodes), [(alias, kind, nid) for nid in nodes for alias, kind in variants(nid, min_len).items()]
+
+def _chunks(it, size, min_len):
+    it = iter(it)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk, min_len
+
+def resolve(triples, owner, rank, clashes):
+    """Fold (alias, kind, node) triples into owner/rank; clashes[alias] lists every claimant."""
+    for alias, kind, nid in triples:
+        cur = owner.get(alias)
+        if cur is None:
+            owner[alias] = nid
+            rank[alias] = kind
+            continue
+        if cur == nid:
             continue
-        h, rel, t = [x.strip().strip('"') for x in row[:3]]
-        nodes.add(h); nodes.add(t)
+        lst = clashes.get(alias)
+        if lst is None:
+            lst = clashes[alias] = [(rank[alias], cur)]
+        lst.append((kind, nid))
+        if (kind, nid) < (rank[alias], cur):
+            owner[alias] = nid
+            rank[alias] = kind
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate alias variants for KG nodes")
+    ap.add_argument("--kg", default=os.path.join(ROOT, "data", "kg_edges.merged.csv"),
+                    help="KG edges CSV or compiled .kgsnap")
+    ap.add_argument("--out", default=os.path.join(ROOT, "config", "aliases.extra.json"))
+    ap.add_argument("--format", choices=["alias2id", "overlay"], default="alias2id")
+    ap.add_argument("--report", default=None, help="TSV of aliases claimed by more than one node")
+    ap.add_argument("--min_len", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk", type=int, default=20000, help="nodes per worker task")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    owner, rank, clashes = {}, {}, {}
+    jobs = _chunks(iter_kg_nodes(args.kg), max(1, args.chunk), args.min_len)
+    pool = Pool(args.workers) if args.workers > 1 else None
+    # ordered imap: the output order follows the KG, whatever the scheduling
+    results = pool.imap(_chunk_variants, jobs) if pool is not None else map(_chunk_variants, jobs)
+    n_nodes = 0
+    try:
+        for n, triples in results:
+            n_nodes += n
+            resolve(triples, owner, rank, clashes)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if args.format == "overlay":
+        data = {}
+        for alias, nid in owner.items():
+            data.setdefault(nid, []).append(alias)
+        for v in data.values():
+            v.sort()
+    else:
+        data = owner
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open_text(args.out, "w") as f:
+        f.write(dumps(data, compact=True))
 
-alias2id = {}
-for nid in nodes:
-    for s in variants(nid):
-        alias2id.setdefault(s, nid)  # first-come wins
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open_text(args.report, "w", newline="") as f:
+            w = csv.writer(f, delimiter="\t", lineterminator="\n")
+            w.writerow(["alias", "chosen", "chosen_kind", "n_candidates", "candidates"])
+            for alias in sorted(clashes):
+                cands = sorted(clashes[alias])
+                w.writerow([alias, owner[alias], KINDS[rank[alias]], len(cands),
+                            ";".join(f"{nid}:{KINDS[k]}" for k, nid in cands)])
 
-os.makedirs(os.path.dirname(out), exist_ok=True)
-with open(out, "w", encoding="utf-8") as fo:
-    json.dump(alias2id, fo, ensure_ascii=False, indent=2)
+    print(f"nodes: {n_nodes}  aliases: {len(owner)}  ambiguous: {len(clashes)}  "
+          f"-> {args.out} ({time.perf_counter() - t0:.1f}s)")
 
-print("aliases:", len(alias2id))
+if __name__ == "__main__":
+    main()